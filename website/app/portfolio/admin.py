@@ -1,6 +1,11 @@
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.utils import timezone
 from django.utils.html import format_html
-from . import models
+from simple_history.admin import SimpleHistoryAdmin
+from . import caching, models, tasks
+from .api import throttling
+from .api.urls import router
 
 
 class ProjectImageInline(admin.TabularInline):
@@ -16,7 +21,7 @@ class ProjectImageInline(admin.TabularInline):
 
 
 @admin.register(models.Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(SimpleHistoryAdmin):
 	list_display = ('title', 'status', 'featured', 'category', 'published_at', 'order')
 	list_filter = ('status', 'featured', 'category', 'tags')
 	search_fields = ('title', 'summary', 'description')
@@ -34,24 +39,27 @@ class ProjectAdmin(admin.ModelAdmin):
 
 	@admin.action(description="Publish selected projects")
 	def make_published(self, request, queryset):
-		for obj in queryset:
-			obj.publish()
+		count = queryset.publish(user=request.user)
+		self.message_user(request, f"Published {count} item(s).")
 
 	@admin.action(description="Move selected to draft")
 	def make_draft(self, request, queryset):
-		queryset.update(status=models.Project.DRAFT)
+		count = queryset.unpublish(user=request.user)
+		self.message_user(request, f"Moved {count} item(s) to draft.")
 
 	@admin.action(description="Mark as featured")
 	def mark_featured(self, request, queryset):
-		queryset.update(featured=True)
+		count = queryset.bulk_set(user=request.user, featured=True)
+		self.message_user(request, f"Marked {count} item(s) as featured.")
 
 	@admin.action(description="Unmark featured")
 	def unmark_featured(self, request, queryset):
-		queryset.update(featured=False)
+		count = queryset.bulk_set(user=request.user, featured=False)
+		self.message_user(request, f"Unmarked {count} featured item(s).")
 
 
 @admin.register(models.BlogPost)
-class BlogPostAdmin(admin.ModelAdmin):
+class BlogPostAdmin(SimpleHistoryAdmin):
 	list_display = ('title', 'status', 'category', 'published_at')
 	list_filter = ('status', 'category', 'tags')
 	search_fields = ('title', 'excerpt', 'content')
@@ -66,16 +74,17 @@ class BlogPostAdmin(admin.ModelAdmin):
 
 	@admin.action(description="Publish selected posts")
 	def make_published(self, request, queryset):
-		for obj in queryset:
-			obj.publish()
+		count = queryset.publish(user=request.user)
+		self.message_user(request, f"Published {count} item(s).")
 
 	@admin.action(description="Move selected to draft")
 	def make_draft(self, request, queryset):
-		queryset.update(status=models.BlogPost.DRAFT)
+		count = queryset.unpublish(user=request.user)
+		self.message_user(request, f"Moved {count} item(s) to draft.")
 
 
 @admin.register(models.NewsItem)
-class NewsItemAdmin(admin.ModelAdmin):
+class NewsItemAdmin(SimpleHistoryAdmin):
 	list_display = ('title', 'status', 'important', 'category', 'published_at')
 	list_filter = ('status', 'important', 'category')
 	search_fields = ('title', 'summary', 'content')
@@ -89,24 +98,27 @@ class NewsItemAdmin(admin.ModelAdmin):
 
 	@admin.action(description="Publish selected news")
 	def make_published(self, request, queryset):
-		for obj in queryset:
-			obj.publish()
+		count = queryset.publish(user=request.user)
+		self.message_user(request, f"Published {count} item(s).")
 
 	@admin.action(description="Move selected to draft")
 	def make_draft(self, request, queryset):
-		queryset.update(status=models.NewsItem.DRAFT)
+		count = queryset.unpublish(user=request.user)
+		self.message_user(request, f"Moved {count} item(s) to draft.")
 
 	@admin.action(description="Mark important")
 	def mark_important(self, request, queryset):
-		queryset.update(important=True)
+		count = queryset.bulk_set(user=request.user, important=True)
+		self.message_user(request, f"Marked {count} item(s) as important.")
 
 	@admin.action(description="Unmark important")
 	def unmark_important(self, request, queryset):
-		queryset.update(important=False)
+		count = queryset.bulk_set(user=request.user, important=False)
+		self.message_user(request, f"Unmarked {count} important item(s).")
 
 
 @admin.register(models.Skill)
-class SkillAdmin(admin.ModelAdmin):
+class SkillAdmin(SimpleHistoryAdmin):
 	list_display = ('name', 'category', 'proficiency', 'order')
 	list_editable = ('proficiency', 'order')
 	search_fields = ('name', 'category')
@@ -114,27 +126,27 @@ class SkillAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.Experience)
-class ExperienceAdmin(admin.ModelAdmin):
+class ExperienceAdmin(SimpleHistoryAdmin):
 	list_display = ('role', 'company', 'start_date', 'end_date', 'is_current')
 	list_filter = ('company', 'is_current')
 	search_fields = ('role', 'company', 'description')
 
 
 @admin.register(models.Education)
-class EducationAdmin(admin.ModelAdmin):
+class EducationAdmin(SimpleHistoryAdmin):
 	list_display = ('degree', 'institution', 'start_year', 'end_year')
 	search_fields = ('degree', 'institution', 'field_of_study')
 
 
 @admin.register(models.MediaAsset)
-class MediaAssetAdmin(admin.ModelAdmin):
+class MediaAssetAdmin(SimpleHistoryAdmin):
 	list_display = ('title', 'file_type', 'file', 'created_at')
 	list_filter = ('file_type',)
 	search_fields = ('title', 'alt_text', 'description', 'file')
 
 
 @admin.register(models.SocialLink)
-class SocialLinkAdmin(admin.ModelAdmin):
+class SocialLinkAdmin(SimpleHistoryAdmin):
 	list_display = ('platform', 'url', 'order')
 	list_editable = ('order',)
 	search_fields = ('platform', 'url')
@@ -142,7 +154,7 @@ class SocialLinkAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.SiteSetting)
-class SiteSettingAdmin(admin.ModelAdmin):
+class SiteSettingAdmin(SimpleHistoryAdmin):
 	fieldsets = (
 		(None, {"fields": ("site_name", "tagline", "logo", "favicon")}),
 		("Meta", {"fields": ("meta_description", "google_analytics_id")}),
@@ -157,8 +169,8 @@ class SiteSettingAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.ContactMessage)
-class ContactMessageAdmin(admin.ModelAdmin):
-	list_display = ('subject', 'name', 'email', 'created_at', 'is_read')
+class ContactMessageAdmin(SimpleHistoryAdmin):
+	list_display = ('subject', 'name', 'email', 'created_at', 'is_read', 'notified_at')
 	list_filter = ('is_read', 'created_at')
 	search_fields = ('name', 'email', 'subject', 'message')
 	actions = ['mark_read']
@@ -174,3 +186,33 @@ class CategoryAdmin(admin.ModelAdmin):
 	search_fields = ('name',)
 	list_display = ('name', 'slug')
 
+
+@admin.register(models.Task)
+class TaskAdmin(admin.ModelAdmin):
+	list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'started_at', 'finished_at', 'locked_by')
+	list_filter = ('status', 'name')
+	search_fields = ('name', 'key', 'last_error')
+	readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+	actions = ['retry_now']
+
+	@admin.action(description="Retry selected tasks now")
+	def retry_now(self, request, queryset):
+		queryset.exclude(status=models.Task.RUNNING).update(
+			status=models.Task.QUEUED, run_at=timezone.now(), attempts=0, finished_at=None,
+		)
+
+	def changelist_view(self, request, extra_context=None):
+		extra_context = {**(extra_context or {}), 'queue_stats': tasks.queue_stats()}
+		return super().changelist_view(request, extra_context=extra_context)
+
+
+def metrics_view(request):
+	"""Cache and throttle counters as this server process sees them (wrapped in ``admin_view`` in the URLConf)."""
+	basenames = [basename for _, _, basename in router.registry]
+	context = {
+		**admin.site.each_context(request),
+		'title': "Cache and throttle counters",
+		'cache_stats': caching.cache_stats(basenames),
+		'throttle_stats': throttling.throttle_stats(basenames),
+	}
+	return TemplateResponse(request, 'admin/portfolio/metrics.html', context)
@@ -0,0 +1,115 @@
+"""Helpers for the async views and the ASGI entry point.
+
+Under ASGI the async views in ``views.py`` are routed through
+``PORTFOLIO_ASGI_URLCONF``. They evaluate independent querysets
+concurrently with :func:`gather`: each runs in its own worker thread (and so
+on its own database connection) instead of queueing behind the others on
+the single thread Django uses for sync code. Set
+``PORTFOLIO_ASYNC_CONCURRENT_QUERIES = False`` to run them one after another
+on that thread instead, e.g. inside a test transaction.
+
+Templates are still rendered with :func:`render`, on the sync thread, since
+they may touch the session or lazy relations. A cached page never gets that
+far: :func:`caching.cache_public_page` answers it on the event loop.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import close_old_connections
+from django.shortcuts import render as render_sync
+from django.utils.module_loading import import_string
+
+render = sync_to_async(render_sync)
+
+
+def _concurrent():
+	return getattr(settings, 'PORTFOLIO_ASYNC_CONCURRENT_QUERIES', True)
+
+
+def _evaluate_in_worker(func, *args):
+	try:
+		return func(*args)
+	finally:
+		# Worker threads outlive the request; apply CONN_MAX_AGE to their connections.
+		close_old_connections()
+
+
+async def run(func, *args):
+	"""Run blocking ``func(*args)`` (ORM work) off the event loop."""
+	if _concurrent():
+		return await sync_to_async(_evaluate_in_worker, thread_sensitive=False)(func, *args)
+	return await sync_to_async(func)(*args)
+
+
+async def gather(*querysets):
+	"""Evaluate ``querysets`` (with their prefetches) concurrently; returns lists."""
+	return await asyncio.gather(*(run(list, queryset) for queryset in querysets))
+
+
+class PortfolioASGIHandler(ASGIHandler):
+	"""ASGI handler that resolves requests against ``PORTFOLIO_ASGI_URLCONF``.
+
+	It also loads ``MIDDLEWARE`` with the substitutions of
+	``PORTFOLIO_ASGI_MIDDLEWARE``, so WSGI keeps the stock classes.
+	"""
+
+	def load_middleware(self, is_async=False):
+		substitutes = getattr(settings, 'PORTFOLIO_ASGI_MIDDLEWARE', {})
+		self.load_middleware_paths([substitutes.get(path, path) for path in settings.MIDDLEWARE], is_async)
+
+	def load_middleware_paths(self, middleware_paths, is_async=False):
+		"""``BaseHandler.load_middleware`` for an explicit list instead of ``settings.MIDDLEWARE``."""
+		self._view_middleware = []
+		self._template_response_middleware = []
+		self._exception_middleware = []
+
+		get_response = self._get_response_async if is_async else self._get_response
+		handler = convert_exception_to_response(get_response)
+		handler_is_async = is_async
+		for middleware_path in reversed(middleware_paths):
+			middleware = import_string(middleware_path)
+			middleware_can_sync = getattr(middleware, 'sync_capable', True)
+			middleware_can_async = getattr(middleware, 'async_capable', False)
+			if not middleware_can_sync and not middleware_can_async:
+				raise RuntimeError(
+					f"Middleware {middleware_path} must have at least one of sync_capable/async_capable set to True."
+				)
+			elif not handler_is_async and middleware_can_sync:
+				middleware_is_async = False
+			else:
+				middleware_is_async = middleware_can_async
+			try:
+				adapted_handler = self.adapt_method_mode(
+					middleware_is_async, handler, handler_is_async,
+					debug=settings.DEBUG, name=f'middleware {middleware_path}',
+				)
+				mw_instance = middleware(adapted_handler)
+			except MiddlewareNotUsed:
+				continue
+			handler = adapted_handler
+			if mw_instance is None:
+				raise ImproperlyConfigured(f"Middleware factory {middleware_path} returned None.")
+			if hasattr(mw_instance, 'process_view'):
+				self._view_middleware.insert(0, self.adapt_method_mode(is_async, mw_instance.process_view))
+			if hasattr(mw_instance, 'process_template_response'):
+				self._template_response_middleware.append(
+					self.adapt_method_mode(is_async, mw_instance.process_template_response),
+				)
+			if hasattr(mw_instance, 'process_exception'):
+				# Django still runs the exception stack synchronously.
+				self._exception_middleware.append(self.adapt_method_mode(False, mw_instance.process_exception))
+			handler = convert_exception_to_response(mw_instance)
+			handler_is_async = middleware_is_async
+
+		# Assigned last: Django treats it as the "initialised" flag.
+		self._middleware_chain = self.adapt_method_mode(is_async, handler, handler_is_async)
+
+	async def get_response_async(self, request):
+		urlconf = getattr(settings, 'PORTFOLIO_ASGI_URLCONF', None)
+		if urlconf:
+			request.urlconf = urlconf
+		return await super().get_response_async(request)
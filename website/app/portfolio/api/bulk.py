@@ -0,0 +1,198 @@
+"""Bulk upsert endpoint shared by the content viewsets.
+
+``POST <collection>/bulk/`` takes a JSON array. Items are matched to existing
+rows by the viewset's ``bulk_natural_key`` with one query, validated with the
+viewset's serializer (partially for existing rows), then written with
+``bulk_create``/``bulk_update`` plus bulk history rows inside one
+transaction. Tags for the whole batch are assigned with a handful of
+queries. Invalid items are reported by index and skipped; the valid ones are
+still saved.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+from taggit.models import Tag
+
+from ..models import PublishableModel, RenderedMarkupModel
+from ..signals import content_bulk_changed
+
+LOOKUP_CHUNK = 200
+
+
+class BulkUpsertMixin:
+	bulk_natural_key = ()
+	bulk_max_items = 1000
+	bulk_batch_size = 200
+
+	@action(detail=False, methods=['post'], url_path='bulk')
+	def bulk_upsert(self, request):
+		items = request.data
+		if not isinstance(items, list):
+			raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+		if len(items) > self.bulk_max_items:
+			raise ValidationError({'non_field_errors': [f'At most {self.bulk_max_items} items per request.']})
+		model = self.queryset.model
+		results = [None] * len(items)
+		keys = {}
+		for index, item in enumerate(items):
+			try:
+				keys[index] = self.get_bulk_key(item)
+			except ValidationError as exc:
+				results[index] = {'index': index, 'status': 'error', 'errors': exc.detail}
+
+		with transaction.atomic():
+			existing = self.get_bulk_existing(set(keys.values()))
+			serializer_class = self.get_serializer_class()
+			context = {**self.get_serializer_context(), 'related_objects': self.get_bulk_related(serializer_class, items)}
+			to_create, to_update, tags, seen = [], [], {}, set()
+			now = timezone.now()
+			for index, key in keys.items():
+				if key in seen:
+					results[index] = {'index': index, 'status': 'error', 'errors': {'non_field_errors': ['Duplicate of an earlier item.']}}
+					continue
+				seen.add(key)
+				instance = existing.get(key)
+				serializer = serializer_class(instance, data=items[index], partial=instance is not None, context=context)
+				if not serializer.is_valid():
+					results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+					continue
+				data = dict(serializer.validated_data)
+				item_tags = data.pop('tags', None)
+				obj = instance or model(**dict(zip(self.bulk_natural_key, key)))
+				for name, value in data.items():
+					setattr(obj, name, value)
+				self.prepare_bulk_instance(obj, now)
+				(to_update if instance else to_create).append((index, obj))
+				if item_tags is not None:
+					tags[index] = item_tags
+
+			user = request.user if request.user.is_authenticated else None
+			if to_create:
+				created = bulk_create_with_history(
+					[obj for _, obj in to_create], model, batch_size=self.bulk_batch_size, default_user=user,
+				)
+				to_create = [(index, obj) for (index, _), obj in zip(to_create, created)]
+			if to_update:
+				fields = [
+					field.name for field in model._meta.concrete_fields
+					if not field.primary_key and field.name != 'created_at'
+				]
+				bulk_update_with_history(
+					[obj for _, obj in to_update], model, fields, batch_size=self.bulk_batch_size, default_user=user,
+				)
+			objects = dict(to_create + to_update)
+			if tags:
+				set_tags_bulk(model, {objects[index].pk: names for index, names in tags.items()})
+			for index, obj in to_create:
+				results[index] = {'index': index, 'status': 'created', 'id': obj.pk}
+			for index, obj in to_update:
+				results[index] = {'index': index, 'status': 'updated', 'id': obj.pk}
+			changed = [obj.pk for obj in objects.values()]
+			if changed:
+				transaction.on_commit(lambda: content_bulk_changed.send(sender=model, pks=changed))
+
+		errors = sum(1 for result in results if result['status'] == 'error')
+		body = {'created': len(to_create), 'updated': len(to_update), 'errors': errors, 'results': results}
+		return Response(body, status=status.HTTP_400_BAD_REQUEST if items and errors == len(items) else status.HTTP_200_OK)
+
+	def get_bulk_key(self, item):
+		"""Natural key tuple of a raw item; slug fields default to the slugified title."""
+		if not isinstance(item, dict):
+			raise ValidationError({'non_field_errors': ['Expected an object.']})
+		opts = self.queryset.model._meta
+		key, missing = [], []
+		for name in self.bulk_natural_key:
+			field = opts.get_field(name)
+			value = item.get(name)
+			if value in (None, '') and name == 'slug':
+				value = slugify(item.get('title') or '')
+			if value in (None, '') and not field.blank:
+				missing.append(name)
+				continue
+			try:
+				key.append(field.to_python(value if value is not None else ''))
+			except Exception:
+				raise ValidationError({name: ['Invalid value.']})
+		if missing:
+			raise ValidationError({name: ['This field is required.'] for name in missing})
+		return tuple(key)
+
+	def get_bulk_existing(self, keys):
+		"""Existing rows by natural key, a query per ``LOOKUP_CHUNK`` keys."""
+		keys = list(keys)
+		found = {}
+		for start in range(0, len(keys), LOOKUP_CHUNK):
+			condition = Q()
+			for key in keys[start:start + LOOKUP_CHUNK]:
+				condition |= Q(**dict(zip(self.bulk_natural_key, key)))
+			for obj in self.queryset.model._default_manager.filter(condition):
+				found[tuple(getattr(obj, name) for name in self.bulk_natural_key)] = obj
+		return found
+
+	def get_bulk_related(self, serializer_class, items):
+		"""Objects referenced by writable pk fields, one ``in_bulk`` query per field."""
+		related = {}
+		for name, field in serializer_class().fields.items():
+			if not isinstance(field, PrimaryKeyRelatedField) or field.read_only:
+				continue
+			model = field.queryset.model
+			pks = set()
+			for item in items:
+				if isinstance(item, dict) and item.get(name) is not None:
+					try:
+						pks.add(model._meta.pk.to_python(item[name]))
+					except Exception:
+						pass
+			related.setdefault(model, {}).update(field.queryset.in_bulk(pks))
+		return related
+
+	def prepare_bulk_instance(self, obj, now):
+		"""Apply what ``save()`` would: timestamps, slug and publication date."""
+		if hasattr(obj, 'updated_at'):
+			obj.updated_at = now
+		if hasattr(obj, 'slug') and not obj.slug:
+			obj.slug = slugify(obj.title)
+		if isinstance(obj, PublishableModel) and obj.status == obj.PUBLISHED and not obj.published_at:
+			obj.published_at = now
+		if isinstance(obj, RenderedMarkupModel):
+			obj.render_markup()
+
+
+def set_tags_bulk(model, tags_by_pk):
+	"""``instance.tags.set(names)`` for many objects of ``model`` with a fixed number of queries."""
+	through = model._meta.get_field('tags').through
+	names = {name for tag_names in tags_by_pk.values() for name in tag_names}
+	tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+	for name in names - tags.keys():
+		# New tags are rare; Tag.save() picks a unique slug.
+		tags[name] = Tag.objects.create(name=name)
+	content_type = ContentType.objects.get_for_model(model)
+	current = {}
+	for object_id, tag_id in (
+		through.objects.filter(content_type=content_type, object_id__in=tags_by_pk)
+		.values_list('object_id', 'tag_id')
+	):
+		current.setdefault(object_id, set()).add(tag_id)
+	stale = Q()
+	new_rows = []
+	for pk, tag_names in tags_by_pk.items():
+		wanted = [tags[name].pk for name in dict.fromkeys(tag_names)]
+		existing = current.get(pk, set())
+		removed = existing - set(wanted)
+		if removed:
+			stale |= Q(object_id=pk, tag_id__in=removed)
+		new_rows += [
+			through(content_type=content_type, object_id=pk, tag_id=tag_id)
+			for tag_id in wanted if tag_id not in existing
+		]
+	if stale:
+		through.objects.filter(stale, content_type=content_type).delete()
+	through.objects.bulk_create(new_rows)
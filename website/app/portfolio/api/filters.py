@@ -0,0 +1,22 @@
+from rest_framework import filters
+
+from .. import search
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+	"""``SearchFilter`` backed by the FTS index, ranking results by relevance.
+
+	Place after ``OrderingFilter`` in ``filter_backends``: results are ordered
+	by rank unless the client asked for an explicit ``ordering``.
+	"""
+
+	def filter_queryset(self, request, queryset, view):
+		if search.get_index(queryset.model) is None or not search.is_available():
+			return super().filter_queryset(request, queryset, view)
+		text = request.query_params.get(self.search_param, '').strip()
+		if not text:
+			return queryset
+		results = search.search(queryset, text)
+		if request.query_params.get(filters.OrderingFilter.ordering_param):
+			results = results.order_by(*queryset.query.order_by)
+		return results
@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from ..pagination import InvalidCursor, KeysetPaginator
+
+
+class KeysetPagination(BasePagination):
+	"""Cursor pagination over the (filtered) queryset ordering, without COUNT/OFFSET."""
+
+	cursor_query_param = 'cursor'
+	page_size = api_settings.PAGE_SIZE
+	page_size_query_param = 'page_size'
+	max_page_size = 100
+
+	def get_page_size(self, request):
+		try:
+			size = int(request.query_params[self.page_size_query_param])
+		except (KeyError, ValueError):
+			return self.page_size
+		return min(max(size, 1), self.max_page_size)
+
+	def paginate_queryset(self, queryset, request, view=None):
+		self.request = request
+		paginator = KeysetPaginator(queryset, self.get_page_size(request))
+		try:
+			self.page = paginator.page(request.query_params.get(self.cursor_query_param))
+		except InvalidCursor:
+			raise NotFound('Invalid cursor')
+		return self.page.object_list
+
+	def get_link(self, cursor):
+		if cursor is None:
+			return None
+		url = self.request.build_absolute_uri()
+		return replace_query_param(url, self.cursor_query_param, cursor)
+
+	def get_next_link(self):
+		return self.get_link(self.page.next_cursor)
+
+	def get_previous_link(self):
+		return self.get_link(self.page.previous_cursor)
+
+	def get_paginated_response(self, data):
+		return Response(OrderedDict([
+			('next', self.get_next_link()),
+			('previous', self.get_previous_link()),
+			('results', data),
+		]))
+
+	def get_paginated_response_schema(self, schema):
+		return {
+			'type': 'object',
+			'required': ['results'],
+			'properties': {
+				'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+				'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+				'results': schema,
+			},
+		}
@@ -1,10 +1,130 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
-from .. import models
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+from .. import models, search
+
+
+class SearchSnippetMixin:
+	"""Adds a highlighted ``search_snippet`` to results of a full-text search."""
+
+	def to_representation(self, instance):
+		data = super().to_representation(instance)
+		snippet = getattr(instance, 'search_snippet', None)
+		if snippet:
+			data['search_snippet'] = str(search.highlight(snippet))
+		return data
+
+
+class ValuesReadMixin:
+	"""Read path building the ``to_representation`` output from ``.values()`` rows.
+
+	No model instances are created: each declared field formats its raw
+	column value with its own ``to_representation``, tags and nested
+	``many=True`` serializers are fetched with one query per page. Tags are
+	sorted by name and nested rows follow the child model's ordering, as on
+	the instance path, so both paths render byte-identical JSON.
+	"""
+
+	@classmethod
+	def _plan(cls, context=None):
+		serializer = cls(context=context or {})
+		model = cls.Meta.model
+		plan = []
+		for field in serializer._readable_fields:
+			if isinstance(field, TagListField):
+				plan.append((field.field_name, 'tags', None, field))
+			elif isinstance(field, serializers.ListSerializer):
+				relation = model._meta.get_field(field.source)
+				plan.append((field.field_name, 'many', relation, field.child))
+			else:
+				model_field = model._meta.get_field(field.source)
+				if isinstance(field, PrimaryKeyRelatedField):
+					plan.append((field.field_name, 'pk', model_field.attname, field))
+				elif isinstance(field, serializers.FileField):
+					plan.append((field.field_name, 'file', model_field, field))
+				else:
+					plan.append((field.field_name, 'value', model_field.attname, field))
+		return plan
+
+	@classmethod
+	def values_queryset(cls, queryset, extra=()):
+		"""``queryset`` as ``.values()`` rows carrying every column the read path needs."""
+		if '_values_columns' not in cls.__dict__:
+			# Building the declared fields is costly; the columns never change.
+			cls._values_columns = {
+				target.attname if kind == 'file' else target
+				for _, kind, target, _ in cls._plan() if kind in ('value', 'pk', 'file')
+			}
+		columns = {'pk', *extra, *cls._values_columns}
+		for term in queryset.query.order_by:
+			if isinstance(term, str) and term.lstrip('-') not in queryset.query.extra_select:
+				columns.add(term.lstrip('-'))
+		return queryset.prefetch_related(None).values(*sorted(columns), *queryset.query.extra_select)
+
+	@classmethod
+	def serialize_rows(cls, rows, context=None):
+		rows = list(rows)
+		plan = cls._plan(context)
+		pks = [row['pk'] for row in rows]
+		related = {}
+		for name, kind, target, field in plan:
+			if kind == 'tags':
+				related[name] = _tag_names(cls.Meta.model, pks)
+			elif kind == 'many':
+				related[name] = _nested_rows(target, field, pks, context)
+		data = []
+		for row in rows:
+			item = {}
+			for name, kind, target, field in plan:
+				if kind == 'value':
+					value = row[target]
+					item[name] = None if value is None else field.to_representation(value)
+				elif kind == 'pk':
+					value = row[target]
+					item[name] = None if value is None else field.to_representation(PKOnlyObject(pk=value))
+				elif kind == 'file':
+					value = row[target.attname]
+					item[name] = field.to_representation(target.attr_class(None, target, value)) if value else None
+				else:
+					item[name] = related[name].get(row['pk'], [])
+			if issubclass(cls, SearchSnippetMixin) and row.get('search_snippet'):
+				item['search_snippet'] = str(search.highlight(row['search_snippet']))
+			data.append(item)
+		return data
+
+
+def _tag_names(model, pks):
+	# Sorted by name like ``TagListField``: the join order of a prefetch is not stable.
+	through = model._meta.get_field('tags').through
+	names = defaultdict(list)
+	rows = (
+		through.objects.filter(content_type=ContentType.objects.get_for_model(model), object_id__in=pks)
+		.order_by().values_list('object_id', 'tag__name')
+	)
+	for object_id, name in rows:
+		names[object_id].append(name)
+	for tag_names in names.values():
+		tag_names.sort()
+	return names
+
+
+def _nested_rows(relation, child, pks, context):
+	fk_name = relation.field.attname
+	queryset = relation.related_model._default_manager.filter(**{f'{fk_name}__in': pks})
+	rows = list(child.values_queryset(queryset, extra=(fk_name,)))
+	grouped = defaultdict(list)
+	for row, item in zip(rows, child.serialize_rows(rows, context)):
+		grouped[row[fk_name]].append(item)
+	return grouped
 
 
 class TagListField(serializers.Field):
+	"""Tag names, sorted so the output never depends on query order."""
+
 	def to_representation(self, value):
-		return [t.name for t in value.all()]
+		return sorted(t.name for t in value.all())
 
 	def to_internal_value(self, data):
 		if isinstance(data, list):
@@ -12,19 +132,36 @@ class TagListField(serializers.Field):
 		raise serializers.ValidationError('Tags must be a list of strings')
 
 
-class ProjectImageSerializer(serializers.ModelSerializer):
+class ContextPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+	"""Resolves pks from ``context['related_objects']`` (filled by bulk writes) before querying."""
+
+	def to_internal_value(self, data):
+		model = self.get_queryset().model
+		objects = self.context.get('related_objects', {}).get(model)
+		if objects:
+			try:
+				obj = objects.get(model._meta.pk.to_python(data))
+			except Exception:
+				obj = None
+			if obj is not None:
+				return obj
+		return super().to_internal_value(data)
+
+
+class ProjectImageSerializer(ValuesReadMixin, serializers.ModelSerializer):
 	class Meta:
 		model = models.ProjectImage
 		fields = ['id', 'image', 'caption', 'order']
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(ValuesReadMixin, SearchSnippetMixin, serializers.ModelSerializer):
 	tags = TagListField(required=False)
 	images = ProjectImageSerializer(many=True, read_only=True)
+	serializer_related_field = ContextPrimaryKeyRelatedField
 
 	class Meta:
 		model = models.Project
-		fields = ['id', 'title', 'slug', 'summary', 'description', 'hero_image', 'repository_url', 'live_url', 'category', 'tags', 'order', 'featured', 'status', 'published_at', 'seo_title', 'seo_description', 'images']
+		fields = ['id', 'title', 'slug', 'summary', 'description', 'hero_image', 'repository_url', 'live_url', 'category', 'tags', 'order', 'featured', 'status', 'published_at', 'seo_title', 'seo_description', 'images', 'word_count', 'reading_time']
 		read_only_fields = ['slug', 'published_at']
 
 	def create(self, validated_data):
@@ -42,29 +179,29 @@ class ProjectSerializer(serializers.ModelSerializer):
 		return project
 
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class BlogPostSerializer(ValuesReadMixin, SearchSnippetMixin, serializers.ModelSerializer):
 	tags = TagListField(required=False)
 
 	class Meta:
 		model = models.BlogPost
-		fields = ['id', 'title', 'slug', 'excerpt', 'content', 'cover_image', 'category', 'tags', 'status', 'published_at', 'seo_title', 'seo_description']
+		fields = ['id', 'title', 'slug', 'excerpt', 'content', 'cover_image', 'category', 'tags', 'status', 'published_at', 'seo_title', 'seo_description', 'word_count', 'reading_time']
 		read_only_fields = ['slug', 'published_at']
 
 
-class NewsItemSerializer(serializers.ModelSerializer):
+class NewsItemSerializer(ValuesReadMixin, SearchSnippetMixin, serializers.ModelSerializer):
 	class Meta:
 		model = models.NewsItem
-		fields = ['id', 'title', 'slug', 'summary', 'content', 'category', 'link', 'important', 'status', 'published_at']
+		fields = ['id', 'title', 'slug', 'summary', 'content', 'category', 'link', 'important', 'status', 'published_at', 'word_count', 'reading_time']
 		read_only_fields = ['slug', 'published_at']
 
 
-class ExperienceSerializer(serializers.ModelSerializer):
+class ExperienceSerializer(ValuesReadMixin, serializers.ModelSerializer):
 	class Meta:
 		model = models.Experience
 		fields = ['id', 'role', 'company', 'location', 'start_date', 'end_date', 'is_current', 'description']
 
 
-class SkillSerializer(serializers.ModelSerializer):
+class SkillSerializer(ValuesReadMixin, serializers.ModelSerializer):
 	class Meta:
 		model = models.Skill
 		fields = ['id', 'name', 'category', 'proficiency', 'order']
@@ -0,0 +1,87 @@
+"""Token-bucket API throttling with separate read and query budgets.
+
+Every client gets one bucket per endpoint (viewset basename) and budget.
+Requests with a ``search`` or ``ordering`` parameter draw from the ``query``
+budget: they scan the table (LIKE or FTS plus a sort) and are cheap to
+generate from a scraper. Everything else draws from the ``read`` budget.
+Rates come from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``; a
+``'<budget>.<basename>'`` entry overrides ``'<budget>'`` for one endpoint, and
+a missing or ``None`` rate leaves that budget unthrottled. Staff are never
+throttled. Signed-in users are keyed by user, anonymous clients by
+:func:`~app.portfolio.throttling.client_ip`. Behind a reverse proxy that
+needs ``PORTFOLIO_TRUSTED_PROXY_COUNT`` (DRF's ``NUM_PROXIES`` is not used),
+or every anonymous client draws from the same budget.
+
+Buckets live in the default cache (see :mod:`app.portfolio.throttling`), so
+with the local-memory cache each process keeps its own budget. DRF turns
+:meth:`TokenBucketThrottle.wait` into the ``Retry-After`` header of the 429.
+Every decision is counted as ``api_throttle.<basename>.<budget>.allowed`` or
+``.throttled``; ``manage.py throttle_stats`` and ``admin/metrics/`` show them.
+"""
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .. import metrics
+from ..throttling import TokenBucket, client_ip
+
+BUDGETS = ('read', 'query')
+
+
+def metric_names(basenames):
+	return [
+		f'api_throttle.{basename}.{budget}.{outcome}'
+		for basename in basenames for budget in BUDGETS for outcome in ('allowed', 'throttled')
+	]
+
+
+def throttle_stats(basenames):
+	"""Allowed/throttled counts per endpoint and budget, as shown by ``throttle_stats`` and the admin."""
+	counts = metrics.get_counts(metric_names(basenames))
+	stats = []
+	for basename in basenames:
+		for budget in BUDGETS:
+			allowed = counts[f'api_throttle.{basename}.{budget}.allowed']
+			throttled = counts[f'api_throttle.{basename}.{budget}.throttled']
+			stats.append({
+				'label': f'api:{basename}:{budget}', 'allowed': allowed, 'throttled': throttled,
+				'throttled_rate': metrics.ratio(throttled, allowed),
+			})
+	return stats
+
+
+class TokenBucketThrottle(BaseThrottle):
+	query_params = (SearchFilter.search_param, OrderingFilter.ordering_param)
+
+	def __init__(self):
+		self.retry_after = None
+
+	def get_budget(self, request):
+		if any(request.query_params.get(param) for param in self.query_params):
+			return 'query'
+		return 'read'
+
+	def get_rate(self, budget, basename):
+		rates = api_settings.DEFAULT_THROTTLE_RATES
+		return rates.get(f'{budget}.{basename}', rates.get(budget))
+
+	def get_ident(self, request):
+		if request.user and request.user.is_authenticated:
+			return f'user:{request.user.pk}'
+		return f'ip:{client_ip(request)}'
+
+	def allow_request(self, request, view):
+		if request.user and request.user.is_staff:
+			return True
+		basename = getattr(view, 'basename', None) or view.__class__.__name__
+		budget = self.get_budget(request)
+		rate = self.get_rate(budget, basename)
+		if rate is None:
+			return True
+		bucket = TokenBucket(f'api:{basename}:{budget}', rate)
+		allowed, self.retry_after = bucket.consume(self.get_ident(request))
+		metrics.incr(f"api_throttle.{basename}.{budget}.{'allowed' if allowed else 'throttled'}")
+		return allowed
+
+	def wait(self):
+		return self.retry_after
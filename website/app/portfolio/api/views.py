@@ -1,6 +1,14 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
 from rest_framework import viewsets, permissions, filters
-from .. import models
+from rest_framework.response import Response
+from .. import caching, conditional, metrics, models
 from . import serializers
+from .bulk import BulkUpsertMixin
+from .filters import FullTextSearchFilter
 
 
 class StaffOrReadOnly(permissions.BasePermission):
@@ -10,47 +18,180 @@ class StaffOrReadOnly(permissions.BasePermission):
 		return request.user and request.user.is_staff
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
-	queryset = models.Project.objects.all().select_related('category').prefetch_related('tags')
+class ConditionalGetMixin:
+	"""ETag/Last-Modified on list and retrieve, answering 304 before serializing.
+
+	Lists use a collection validator (max ``updated_at`` and row count of the
+	filtered queryset); detail responses use the row's ``updated_at``.
+	"""
+	conditional_related = ()
+
+	def list(self, request, *args, **kwargs):
+		queryset = self.filter_queryset(self.get_queryset())
+		etag, last_modified = conditional.collection_validators(
+			queryset, related=self.conditional_related,
+			extra=(request.get_full_path(), request.accepted_renderer.format),
+		)
+		return self._conditional(request, etag, last_modified, super().list, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+		queryset = self.filter_queryset(self.get_queryset()).filter(
+			**{self.lookup_field: kwargs[lookup_url_kwarg]}
+		)
+		etag, last_modified = conditional.object_validators(
+			queryset, related=self.conditional_related,
+			extra=(request.accepted_renderer.format,),
+		)
+		return self._conditional(request, etag, last_modified, super().retrieve, *args, **kwargs)
+
+	def _conditional(self, request, etag, last_modified, action, *args, **kwargs):
+		if etag is not None:
+			response = conditional.not_modified_response(request, etag, last_modified)
+			if response is not None:
+				return response
+		response = action(request, *args, **kwargs)
+		if etag is not None and response.status_code == 200:
+			conditional.set_validators(response, etag, last_modified)
+		return response
+
+
+class ValuesListMixin:
+	"""List through the serializer's ``.values()`` read path when it has one.
+
+	Output is identical to the regular serializer path; see
+	``serializers.ValuesReadMixin``.
+	"""
+
+	def list(self, request, *args, **kwargs):
+		serializer_class = self.get_serializer_class()
+		if not hasattr(serializer_class, 'serialize_rows'):
+			return super().list(request, *args, **kwargs)
+		queryset = serializer_class.values_queryset(self.filter_queryset(self.get_queryset()))
+		page = self.paginate_queryset(queryset)
+		data = serializer_class.serialize_rows(queryset if page is None else page, self.get_serializer_context())
+		if page is not None:
+			return self.get_paginated_response(data)
+		return Response(data)
+
+
+class ResponseCacheMixin:
+	"""Serve list/retrieve from cached, already-rendered response bodies.
+
+	Keys combine the full path (search, ordering and cursor included), the
+	renderer format and the versions of the viewset's model plus
+	``cache_dependencies``. Writes through the API bump the model version
+	once the object and its tags are saved; admin saves bump it through the
+	signal receivers. A hit never reaches the ORM or the serializers. Only
+	``cache_formats`` are cached: the browsable API renders per-user forms.
+	"""
+	cache_dependencies = ()
+	cache_formats = ('json',)
+
+	def get_cache_labels(self):
+		return [self.queryset.model._meta.label, *self.cache_dependencies]
+
+	def list(self, request, *args, **kwargs):
+		return self._cached(request, super().list, *args, **kwargs)
+
+	def retrieve(self, request, *args, **kwargs):
+		return self._cached(request, super().retrieve, *args, **kwargs)
+
+	def _cached(self, request, action, *args, **kwargs):
+		if request.method not in ('GET', 'HEAD') or request.accepted_renderer.format not in self.cache_formats:
+			return action(request, *args, **kwargs)
+		key = caching.api_cache_key(self.basename, request, self.get_cache_labels())
+		cached = cache.get(key)
+		if cached is not None:
+			metrics.incr(f'api_cache.{self.basename}.hit')
+			return self._cached_response(request, *cached)
+		metrics.incr(f'api_cache.{self.basename}.miss')
+		self.response_cache_key = key
+		return action(request, *args, **kwargs)
+
+	def _cached_response(self, request, content, content_type, etag, last_modified):
+		not_modified = get_conditional_response(
+			request, etag=etag, last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+		)
+		response = not_modified or HttpResponse(content, content_type=content_type)
+		if etag:
+			response.headers['ETag'] = etag
+		if last_modified:
+			response.headers['Last-Modified'] = last_modified
+		return response
+
+	def finalize_response(self, request, response, *args, **kwargs):
+		response = super().finalize_response(request, response, *args, **kwargs)
+		key = getattr(self, 'response_cache_key', None)
+		if key and isinstance(response, Response) and response.status_code == 200:
+			response.render()
+			timeout = getattr(settings, 'PORTFOLIO_API_CACHE_TIMEOUT', 3600)
+			cache.set(key, (
+				response.content, response['Content-Type'],
+				response.get('ETag'), response.get('Last-Modified'),
+			), timeout)
+		return response
+
+	def perform_create(self, serializer):
+		super().perform_create(serializer)
+		caching.bump_model_version(self.queryset.model)
+
+	def perform_update(self, serializer):
+		super().perform_update(serializer)
+		caching.bump_model_version(self.queryset.model)
+
+	def perform_destroy(self, instance):
+		super().perform_destroy(instance)
+		caching.bump_model_version(self.queryset.model)
+
+
+class ProjectViewSet(BulkUpsertMixin, ResponseCacheMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
+	queryset = models.Project.objects.all().select_related('category').prefetch_related('tags', 'images')
 	serializer_class = serializers.ProjectSerializer
+	conditional_related = ('images', 'tags')
+	cache_dependencies = ('portfolio.ProjectImage',)
+	bulk_natural_key = ('slug',)
 	permission_classes = [StaffOrReadOnly]
-	filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+	filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
 	search_fields = ['title', 'summary', 'description']
 	ordering_fields = ['published_at', 'order', 'title']
 	ordering = ['order', '-published_at']
 
 
-class BlogPostViewSet(viewsets.ModelViewSet):
+class BlogPostViewSet(ResponseCacheMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
 	queryset = models.BlogPost.objects.all().select_related('category').prefetch_related('tags')
 	serializer_class = serializers.BlogPostSerializer
+	conditional_related = ('tags',)
 	permission_classes = [StaffOrReadOnly]
-	filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+	filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
 	search_fields = ['title', 'excerpt', 'content']
 	ordering_fields = ['published_at', 'title']
 	ordering = ['-published_at']
 
 
-class NewsItemViewSet(viewsets.ModelViewSet):
+class NewsItemViewSet(ResponseCacheMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
 	queryset = models.NewsItem.objects.all().select_related('category')
 	serializer_class = serializers.NewsItemSerializer
 	permission_classes = [StaffOrReadOnly]
-	filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+	filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
 	search_fields = ['title', 'summary', 'content']
 	ordering_fields = ['published_at', 'important']
 	ordering = ['-published_at']
 
 
-class ExperienceViewSet(viewsets.ModelViewSet):
+class ExperienceViewSet(BulkUpsertMixin, ResponseCacheMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
 	queryset = models.Experience.objects.all()
 	serializer_class = serializers.ExperienceSerializer
+	bulk_natural_key = ('company', 'role', 'start_date')
 	permission_classes = [StaffOrReadOnly]
 	filter_backends = [filters.OrderingFilter]
 	ordering = ['-start_date']
 
 
-class SkillViewSet(viewsets.ModelViewSet):
+class SkillViewSet(BulkUpsertMixin, ResponseCacheMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
 	queryset = models.Skill.objects.all()
 	serializer_class = serializers.SkillSerializer
+	bulk_natural_key = ('name', 'category')
 	permission_classes = [StaffOrReadOnly]
 	filter_backends = [filters.OrderingFilter]
 	ordering = ['order']
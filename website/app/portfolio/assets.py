@@ -0,0 +1,247 @@
+"""Static asset pipeline: minify, hash and precompress at ``collectstatic`` time.
+
+:class:`CompressedManifestStaticFilesStorage` extends Django's manifest
+storage. Before files are hashed, the project's own CSS and JS (those found
+in ``STATICFILES_DIRS``) are minified in ``STATIC_ROOT``, so the hash covers
+the bytes that are served. Third-party app assets ship minified already and
+are left alone. Every text asset then gets ``.gz`` and ``.br`` siblings
+(``.br`` only when the ``brotli`` package is installed), and the sizes at
+each stage are written to ``REPORT_NAME`` for ``manage.py static_report``.
+
+The minifiers are deliberately conservative: strings, template literals and
+regular expression literals are copied verbatim, and JavaScript keeps its
+line breaks so automatic semicolon insertion behaves as before.
+"""
+import gzip
+import json
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+	import brotli
+except ImportError:  # pragma: no cover - optional dependency
+	brotli = None
+
+REPORT_NAME = 'staticfiles-report.json'
+
+COMPRESSIBLE = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.webmanifest')
+# Files smaller than this gain nothing from a compressed variant.
+MIN_COMPRESS_SIZE = 256
+
+# (extension, Content-Encoding) in order of preference.
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+ENCODINGS_BY_EXTENSION = dict(ENCODINGS)
+
+
+def _skip_string(text, start):
+	"""Index just past the string literal opening at ``start``."""
+	quote = text[start]
+	index = start + 1
+	while index < len(text):
+		char = text[index]
+		if char == '\\':
+			index += 2
+			continue
+		index += 1
+		if char == quote:
+			break
+	return index
+
+
+def _squeeze_css(code):
+	code = re.sub(r'\s+', ' ', code)
+	code = re.sub(r' ?([{};,>]) ?', r'\1', code)
+	return code.replace(': ', ':').replace(';}', '}')
+
+
+def minify_css(text):
+	"""Strip comments and redundant whitespace; ``/*! ... */`` comments are kept."""
+	out, code = [], []
+	index = 0
+	while index < len(text):
+		char = text[index]
+		if char in '"\'' or text.startswith('/*!', index):
+			if char in '"\'':
+				end = _skip_string(text, index)
+			else:
+				end = text.find('*/', index)
+				end = len(text) if end < 0 else end + 2
+			out.append(_squeeze_css(''.join(code)))
+			out.append(text[index:end])
+			code = []
+			index = end
+		elif text.startswith('/*', index):
+			end = text.find('*/', index + 2)
+			index = len(text) if end < 0 else end + 2
+			code.append(' ')
+		else:
+			code.append(char)
+			index += 1
+	out.append(_squeeze_css(''.join(code)))
+	return ''.join(out).strip() + '\n'
+
+
+# A ``/`` after one of these (or at the start) opens a regular expression literal.
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'yield', 'await')
+
+
+def _starts_regex(out):
+	previous = ''.join(out).rstrip()
+	if not previous or previous[-1] in _REGEX_PRECEDERS:
+		return True
+	word = re.search(r'[A-Za-z_$]+$', previous)
+	return bool(word) and word.group() in _REGEX_KEYWORDS
+
+
+def _skip_regex(text, start):
+	index = start + 1
+	in_class = False
+	while index < len(text):
+		char = text[index]
+		if char == '\\':
+			index += 2
+			continue
+		if char == '\n':
+			break
+		index += 1
+		if char == '[':
+			in_class = True
+		elif char == ']':
+			in_class = False
+		elif char == '/' and not in_class:
+			break
+	while index < len(text) and text[index].isalpha():
+		index += 1
+	return index
+
+
+def minify_js(text):
+	"""Strip comments, indentation and blank lines; ``/*! ... */`` comments are kept.
+
+	Literals are swapped for placeholders while lines are stripped, so the
+	line breaks inside template literals survive.
+	"""
+	out, literals = [], []
+	index = 0
+	while index < len(text):
+		char = text[index]
+		if char in '"\'`':
+			end = _skip_string(text, index)
+			out.append(f'\x00{len(literals)}\x00')
+			literals.append(text[index:end])
+			index = end
+		elif text.startswith('//', index):
+			end = text.find('\n', index)
+			index = len(text) if end < 0 else end
+		elif text.startswith('/*', index):
+			end = text.find('*/', index + 2)
+			end = len(text) if end < 0 else end + 2
+			comment = text[index:end]
+			if comment.startswith('/*!'):
+				out.append(comment)
+			else:
+				out.append('\n' if '\n' in comment else ' ')
+			index = end
+		elif char == '/' and _starts_regex(out[-20:]):
+			end = _skip_regex(text, index)
+			out.append(f'\x00{len(literals)}\x00')
+			literals.append(text[index:end])
+			index = end
+		else:
+			out.append(char)
+			index += 1
+	lines = []
+	for line in ''.join(out).split('\n'):
+		line = line.strip()
+		if line:
+			lines.append(line)
+	code = '\n'.join(lines) + '\n'
+	return re.sub(r'\x00(\d+)\x00', lambda match: literals[int(match.group(1))], code)
+
+
+MINIFIERS = {
+	'.css': minify_css,
+	'.js': minify_js,
+}
+
+
+def _minifier(name):
+	if '.min.' in os.path.basename(name):
+		return None
+	return MINIFIERS.get(os.path.splitext(name)[1].lower())
+
+
+def compress(data):
+	"""``{extension: bytes}`` of the precompressed variants worth keeping for ``data``."""
+	variants = {}
+	if len(data) < MIN_COMPRESS_SIZE:
+		return variants
+	gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+	if len(gzipped) < len(data):
+		variants['.gz'] = gzipped
+	if brotli is not None:
+		compressed = brotli.compress(data, quality=11)
+		if len(compressed) < len(data):
+			variants['.br'] = compressed
+	return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+	"""Manifest storage that minifies project assets and writes ``.gz``/``.br`` siblings."""
+
+	def post_process(self, paths, dry_run=False, **options):
+		if dry_run:
+			return
+		report = {}
+		own_dirs = {os.path.realpath(str(path)) for path in _staticfiles_dirs()}
+		for name, (storage, path) in paths.items():
+			entry = report[name] = {'source': storage.size(path)}
+			minifier = _minifier(name)
+			if minifier is None or os.path.realpath(getattr(storage, 'location', '')) not in own_dirs:
+				continue
+			with self.open(name) as handle:
+				source = handle.read().decode('utf-8')
+			minified = minifier(source).encode('utf-8')
+			self.delete(name)
+			self._save(name, ContentFile(minified))
+			entry['minified'] = len(minified)
+		# Hash from the (minified) copies in STATIC_ROOT rather than the sources.
+		yield from super().post_process({name: (self, name) for name in paths}, dry_run, **options)
+		for name, entry in report.items():
+			hashed = self.hashed_files.get(self.hash_key(self.clean_name(name)), name)
+			entry['hashed'] = hashed
+			if not name.lower().endswith(COMPRESSIBLE):
+				continue
+			for target in dict.fromkeys((name, hashed)):
+				with self.open(target) as handle:
+					variants = compress(handle.read())
+				for extension, data in variants.items():
+					if self.exists(target + extension):
+						self.delete(target + extension)
+					self._save(target + extension, ContentFile(data))
+					entry[ENCODINGS_BY_EXTENSION[extension]] = len(data)
+		self._save_report(report)
+
+	def _save_report(self, report):
+		if self.exists(REPORT_NAME):
+			self.delete(REPORT_NAME)
+		self._save(REPORT_NAME, ContentFile(json.dumps(report, indent=1, sort_keys=True).encode()))
+
+	def load_report(self):
+		"""The sizes recorded by the last ``collectstatic``, or ``{}``."""
+		try:
+			with self.open(REPORT_NAME) as handle:
+				return json.loads(handle.read().decode())
+		except FileNotFoundError:
+			return {}
+
+
+def _staticfiles_dirs():
+	for entry in getattr(settings, 'STATICFILES_DIRS', ()):
+		# Entries may be (prefix, path) pairs.
+		yield entry[1] if isinstance(entry, (list, tuple)) else entry
@@ -0,0 +1,198 @@
+"""Per-model content versions and the anonymous page cache built on them.
+
+Every cacheable page declares the models it renders. Cache keys embed the
+current version of each of those models, and the signal receivers in
+``signals.py`` bump a model's version when it is saved or deleted, so a
+change only invalidates the pages that actually show that model.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.http import HttpResponse
+
+from . import metrics
+
+VERSION_PREFIX = 'portfolio:version:'
+PAGE_PREFIX = 'portfolio:page:'
+API_PREFIX = 'portfolio:api:'
+
+# View name -> model labels whose changes must invalidate the cached page.
+PAGE_DEPENDENCIES = {
+	'index': ['portfolio.Project', 'portfolio.BlogPost', 'portfolio.NewsItem', 'portfolio.Category'],
+	'project_list': ['portfolio.Project', 'portfolio.Category'],
+	'blog_list': ['portfolio.BlogPost', 'portfolio.Category'],
+	'news': ['portfolio.NewsItem', 'portfolio.Category'],
+	'experience': ['portfolio.Experience', 'portfolio.Skill'],
+}
+
+# Models every page renders through base.html (context_processors.site).
+SITE_DEPENDENCIES = ['portfolio.SiteSetting', 'portfolio.SocialLink']
+
+# Query parameters that switch a page into a staff-only mode.
+STAFF_PARAMS = ('all', 'preview')
+
+
+def _initial_version():
+	# Seeding from the clock means an evicted counter never restarts at a
+	# value that earlier cache keys were built with.
+	return int(time.time() * 1000)
+
+
+def get_versions(labels):
+	keys = [VERSION_PREFIX + label for label in labels]
+	found = cache.get_many(keys)
+	versions = []
+	for label, key in zip(labels, keys):
+		version = found.get(key)
+		if version is None:
+			cache.add(key, _initial_version(), None)
+			version = cache.get(key)
+		versions.append(version)
+	return versions
+
+
+def bump_version(label):
+	key = VERSION_PREFIX + label
+	try:
+		cache.incr(key)
+	except ValueError:
+		cache.set(key, _initial_version(), None)
+
+
+def bump_model_version(model):
+	bump_version(model._meta.label)
+
+
+def page_metric_names():
+	return [f'page_cache.{name}.{outcome}' for name in PAGE_DEPENDENCIES for outcome in ('hit', 'miss')]
+
+
+def api_metric_names(names):
+	return [f'api_cache.{name}.{outcome}' for name in names for outcome in ('hit', 'miss')]
+
+
+def cache_stats(basenames):
+	"""Hit/miss counts per cached page view and API endpoint, as shown by ``cache_stats`` and the admin."""
+	counts = metrics.get_counts(page_metric_names() + api_metric_names(basenames))
+	rows = [('page_cache', name, name) for name in PAGE_DEPENDENCIES]
+	rows += [('api_cache', name, f'api:{name}') for name in basenames]
+	stats = []
+	for kind, name, label in rows:
+		hits = counts[f'{kind}.{name}.hit']
+		misses = counts[f'{kind}.{name}.miss']
+		stats.append({'label': label, 'hits': hits, 'misses': misses, 'hit_rate': metrics.ratio(hits, misses)})
+	return stats
+
+
+def api_cache_key(name, request, labels):
+	"""Key for a rendered API response: full path (query included), format and model versions."""
+	versions = get_versions(labels)
+	raw = '|'.join([request.get_full_path(), request.accepted_renderer.format, *map(str, versions)])
+	digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+	return f'{API_PREFIX}{name}:{digest}'
+
+
+def _is_public_request(request):
+	if request.method not in ('GET', 'HEAD'):
+		return False
+	if any(param in request.GET for param in STAFF_PARAMS):
+		return False
+	if 'messages' in request.COOKIES:
+		return False
+	return True
+
+
+def _is_cacheable_request(request):
+	if not _is_public_request(request):
+		return False
+	# Only look up the user (a session query) when a session cookie is present.
+	if settings.SESSION_COOKIE_NAME in request.COOKIES and request.user.is_authenticated:
+		return False
+	return True
+
+
+async def _ais_cacheable_request(request):
+	if not _is_public_request(request):
+		return False
+	if settings.SESSION_COOKIE_NAME in request.COOKIES:
+		user = await request.auser()
+		return not user.is_authenticated
+	return True
+
+
+def _is_cacheable_response(response):
+	return response.status_code == 200 and not response.cookies and not response.streaming
+
+
+def _page_key(view_name, request):
+	versions = get_versions(PAGE_DEPENDENCIES[view_name] + SITE_DEPENDENCIES)
+	raw = '|'.join([request.build_absolute_uri(), *map(str, versions)])
+	digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+	return f'{PAGE_PREFIX}{view_name}:{digest}'
+
+
+async def _call_cache(func, *args):
+	"""Call ``func`` from the event loop; only a database-backed cache needs a thread."""
+	if isinstance(caches[DEFAULT_CACHE_ALIAS], DatabaseCache):
+		return await sync_to_async(func)(*args)
+	return func(*args)
+
+
+def _lookup_page(view_name, request):
+	"""``(key, HttpResponse or None)`` for the cached page, counting the hit or miss."""
+	key = _page_key(view_name, request)
+	cached = cache.get(key)
+	if cached is None:
+		metrics.incr(f'page_cache.{view_name}.miss')
+		return key, None
+	metrics.incr(f'page_cache.{view_name}.hit')
+	content, content_type = cached
+	return key, HttpResponse(content, content_type=content_type)
+
+
+def _store_page(key, response):
+	if _is_cacheable_response(response):
+		timeout = getattr(settings, 'PORTFOLIO_PAGE_CACHE_TIMEOUT', 3600)
+		cache.set(key, (response.content, response['Content-Type']), timeout)
+
+
+def cache_public_page(view_name):
+	"""Cache the rendered response of ``view_name`` for anonymous visitors.
+
+	Async views are wrapped with an async wrapper that serves hits on the
+	event loop, with no thread hop unless the cache is database-backed.
+	"""
+	if view_name not in PAGE_DEPENDENCIES:
+		raise ValueError(f'No page dependencies declared for {view_name!r}')
+
+	def decorator(view):
+		if iscoroutinefunction(view):
+			@wraps(view)
+			async def async_wrapper(request, *args, **kwargs):
+				if not await _ais_cacheable_request(request):
+					return await view(request, *args, **kwargs)
+				key, response = await _call_cache(_lookup_page, view_name, request)
+				if response is not None:
+					return response
+				response = await view(request, *args, **kwargs)
+				await _call_cache(_store_page, key, response)
+				return response
+			return async_wrapper
+
+		@wraps(view)
+		def wrapper(request, *args, **kwargs):
+			if not _is_cacheable_request(request):
+				return view(request, *args, **kwargs)
+			key, response = _lookup_page(view_name, request)
+			if response is not None:
+				return response
+			response = view(request, *args, **kwargs)
+			_store_page(key, response)
+			return response
+		return wrapper
+	return decorator
@@ -0,0 +1,106 @@
+"""ETag / Last-Modified validators computed from ``updated_at``.
+
+Validators are derived from narrow ``values_list`` queries so a conditional
+request answered with ``304 Not Modified`` never loads the large text
+columns. ``related`` names extra data folded into the validators:
+``'images'`` (a reverse relation with its own ``updated_at``) and
+``'tags'`` (taggit tags, which carry no timestamp and only affect the ETag).
+``fields`` are extra lookups (e.g. ``'category__name'``) whose values are
+mixed into the ETag.
+"""
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _digest(parts):
+	raw = '|'.join(str(part) for part in parts)
+	return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _latest(*values):
+	values = [value for value in values if value is not None]
+	return max(values) if values else None
+
+
+def object_validators(queryset, related=(), fields=(), extra=()):
+	"""Return ``(etag, last_modified)`` for the single row in ``queryset``.
+
+	Returns ``(None, None)`` when the row does not exist so the caller can
+	fall through to its normal 404 handling.
+	"""
+	row = queryset.order_by().values_list('pk', 'updated_at', *fields).first()
+	if row is None:
+		return None, None
+	pk, last_modified = row[:2]
+	model = queryset.model
+	parts = [model._meta.label, *row, *extra]
+	if 'images' in related:
+		stats = model(pk=pk).images.aggregate(latest=Max('updated_at'), count=Count('pk'))
+		last_modified = _latest(last_modified, stats['latest'])
+		parts += [stats['count'], stats['latest']]
+	if 'tags' in related:
+		parts += list(model(pk=pk).tags.order_by('name').values_list('name', flat=True))
+	return _digest(parts), last_modified
+
+
+def collection_validators(queryset, related=(), extra=()):
+	"""Validators for a whole (filtered) collection: max(updated_at) and row count.
+
+	Tags are not tracked here: adding or removing a tag moves the owning
+	row's ``updated_at`` (see ``signals.bump_tagged_content_version``).
+	"""
+	aggregates = {'latest': Max('updated_at'), 'count': Count('pk', distinct=True)}
+	if 'images' in related:
+		aggregates['images_latest'] = Max('images__updated_at')
+	stats = queryset.order_by().aggregate(**aggregates)
+	last_modified = _latest(stats['latest'], stats.get('images_latest'))
+	parts = [queryset.model._meta.label, stats['count'], last_modified, *extra]
+	return _digest(parts), last_modified
+
+
+def not_modified_response(request, etag, last_modified):
+	"""Return a 304/412 response if the request's preconditions allow it, else None."""
+	return get_conditional_response(
+		request, etag=quote_etag(etag) if etag else None,
+		last_modified=_timestamp(last_modified),
+	)
+
+
+def set_validators(response, etag, last_modified):
+	if etag and not response.has_header('ETag'):
+		response.headers['ETag'] = quote_etag(etag)
+	if last_modified and not response.has_header('Last-Modified'):
+		response.headers['Last-Modified'] = http_date(_timestamp(last_modified))
+	return response
+
+
+def _timestamp(value):
+	return timegm(value.utctimetuple()) if value else None
+
+
+def conditional_view(validators_func):
+	"""Decorate a view with validators computed once per request.
+
+	``validators_func(request, *args, **kwargs)`` returns ``(etag, last_modified)``.
+	"""
+	def decorator(view):
+		@wraps(view)
+		def wrapper(request, *args, **kwargs):
+			if request.method not in ('GET', 'HEAD'):
+				return view(request, *args, **kwargs)
+			etag, last_modified = validators_func(request, *args, **kwargs)
+			if etag is None:
+				return view(request, *args, **kwargs)
+			response = not_modified_response(request, etag, last_modified)
+			if response is None:
+				response = view(request, *args, **kwargs)
+				if response.status_code == 200:
+					set_validators(response, etag, last_modified)
+			return response
+		return wrapper
+	return decorator
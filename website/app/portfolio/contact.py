@@ -0,0 +1,186 @@
+"""Contact form ingestion: throttling, buffered writes and digest emails.
+
+A submission never waits on the database or on SMTP. The view checks the
+client's token bucket (cache only), validates, and hands the cleaned data to
+:data:`buffer`. A background thread writes buffered messages in one
+transaction per ``PORTFOLIO_CONTACT_BATCH_SIZE`` rows or every
+``PORTFOLIO_CONTACT_FLUSH_INTERVAL`` seconds. A burst of submissions then
+costs SQLite a handful of short write transactions instead of one each.
+A batch whose write fails (e.g. "database is locked") goes back into the
+buffer and is retried after the interval, up to
+``PORTFOLIO_CONTACT_WRITE_ATTEMPTS`` times; failures are counted as
+``contact.write_failed`` and dropped messages as ``contact.dropped``.
+Messages still in the buffer when the process dies are lost. With an
+interval of 0 each submission is written immediately.
+
+Each flush queues ``portfolio.send_contact_digest`` with a coalescing key and
+``PORTFOLIO_CONTACT_DIGEST_DELAY``. All messages received until it runs go
+out to ``SiteSetting.contact_email`` in a single email.
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import metrics, tasks
+from .models import ContactMessage, SiteSetting
+from .throttling import TokenBucket, client_ip
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = '5/h'
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_WRITE_ATTEMPTS = 5
+DEFAULT_DIGEST_DELAY = 5 * 60
+DEFAULT_DIGEST_LIMIT = 200
+
+
+def throttle(request):
+	"""Take a token from the client's bucket; returns ``(allowed, retry_after)``."""
+	bucket = TokenBucket('contact', getattr(settings, 'PORTFOLIO_CONTACT_RATE', DEFAULT_RATE))
+	return bucket.consume(client_ip(request))
+
+
+def write(messages):
+	"""Insert cleaned ``messages`` (dicts) with their history and queue a digest."""
+	if not messages:
+		return []
+	now = timezone.now()
+	rows = [ContactMessage(**message) for message in messages]
+	with transaction.atomic():
+		ContactMessage.objects.bulk_create(rows)
+		ContactMessage.history.bulk_history_create(rows, default_date=now)
+		schedule_digest()
+	metrics.incr('contact.stored', len(rows))
+	return rows
+
+
+class MessageBuffer:
+	"""Per-process queue of submissions, drained by a daemon thread.
+
+	Items are ``(message, failed writes)`` pairs.
+	"""
+
+	def __init__(self):
+		self._items = []
+		self._condition = threading.Condition()
+		self._thread = None
+
+	def __len__(self):
+		return len(self._items)
+
+	def add(self, message):
+		interval = getattr(settings, 'PORTFOLIO_CONTACT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+		if not interval:
+			write([message])
+			return
+		with self._condition:
+			self._items.append((message, 0))
+			if self._thread is None or not self._thread.is_alive():
+				self._thread = threading.Thread(target=self._run, name='contact-buffer', daemon=True)
+				self._thread.start()
+			if len(self._items) >= self.batch_size():
+				self._condition.notify()
+
+	def batch_size(self):
+		return getattr(settings, 'PORTFOLIO_CONTACT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+	def take(self):
+		with self._condition:
+			items, self._items = self._items[:self.batch_size()], self._items[self.batch_size():]
+			return items
+
+	def requeue(self, items):
+		"""Put a batch whose write failed back in front, minus messages out of attempts."""
+		attempts = getattr(settings, 'PORTFOLIO_CONTACT_WRITE_ATTEMPTS', DEFAULT_WRITE_ATTEMPTS)
+		retry, dropped = [], []
+		for message, failures in items:
+			(retry if failures + 1 < attempts else dropped).append((message, failures + 1))
+		if dropped:
+			metrics.incr('contact.dropped', len(dropped))
+			logger.error(
+				"Dropping %s contact message(s) after %s failed writes: %r",
+				len(dropped), attempts, [message for message, _ in dropped],
+			)
+		with self._condition:
+			self._items[:0] = retry
+
+	def flush(self):
+		"""Write everything buffered now, on the calling thread; returns the rows.
+
+		A failed batch is requeued and the error raised.
+		"""
+		rows = []
+		while items := self.take():
+			try:
+				rows += write([message for message, _ in items])
+			except Exception:
+				metrics.incr('contact.write_failed')
+				self.requeue(items)
+				raise
+		return rows
+
+	def _run(self):
+		interval = getattr(settings, 'PORTFOLIO_CONTACT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+		while True:
+			with self._condition:
+				self._condition.wait_for(lambda: len(self._items) >= self.batch_size(), timeout=interval)
+			try:
+				self.flush()
+			except Exception:
+				logger.exception("Writing buffered contact messages failed; retrying in %ss", interval)
+				# A requeued full batch would otherwise be retried at once.
+				time.sleep(interval)
+			finally:
+				close_old_connections()
+
+
+buffer = MessageBuffer()
+atexit.register(buffer.flush)
+
+
+def submit(cleaned_data):
+	"""Accept a validated submission for writing."""
+	buffer.add({field: cleaned_data[field] for field in ('name', 'email', 'subject', 'message')})
+	metrics.incr('contact.accepted')
+
+
+def schedule_digest():
+	delay = getattr(settings, 'PORTFOLIO_CONTACT_DIGEST_DELAY', DEFAULT_DIGEST_DELAY)
+	return tasks.send_contact_digest.enqueue(key='digest', delay=timedelta(seconds=delay))
+
+
+def send_digest():
+	"""Email every message not yet notified in one digest; returns the number sent."""
+	recipient = SiteSetting.objects.values_list('contact_email', flat=True).first()
+	if not recipient:
+		logger.info("No SiteSetting.contact_email; contact digest not sent")
+		return 0
+	limit = getattr(settings, 'PORTFOLIO_CONTACT_DIGEST_LIMIT', DEFAULT_DIGEST_LIMIT)
+	pending = list(ContactMessage.objects.filter(notified_at__isnull=True).order_by('created_at', 'pk')[:limit + 1])
+	if not pending:
+		return 0
+	messages, more = pending[:limit], len(pending) > limit
+	site_name = SiteSetting.objects.values_list('site_name', flat=True).first()
+	subject = f"[{site_name}] {len(messages)} new contact message{'s' if len(messages) != 1 else ''}"
+	body = '\n\n'.join(
+		f"From: {message.name} <{message.email}>\nSubject: {message.subject}\n"
+		f"Received: {message.created_at:%Y-%m-%d %H:%M %Z}\n\n{message.message}"
+		for message in messages
+	)
+	email = EmailMessage(
+		subject, body, to=[recipient],
+		reply_to=[messages[0].email] if len(messages) == 1 else None,
+	)
+	email.send()
+	ContactMessage.objects.filter(pk__in=[message.pk for message in messages]).update(notified_at=timezone.now())
+	if more:
+		tasks.send_contact_digest.enqueue(key='digest')
+	return len(messages)
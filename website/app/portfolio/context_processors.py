@@ -0,0 +1,78 @@
+"""Site-wide branding (``SiteSetting``) and ``SocialLink`` rows for every template.
+
+Both change a few times a year and are read on every render, so they are
+served from three tiers:
+
+1. A per-process copy, trusted for ``PORTFOLIO_SITE_CONTEXT_TTL`` seconds.
+2. The shared cache, under a key built from the content versions of both
+   models (see :mod:`app.portfolio.caching`). After the TTL a process
+   compares versions, one cache read, and keeps its copy if they match.
+3. The database, only when the versions moved and no process has stored the
+   new data yet.
+
+Saving or deleting either model bumps both versions once the transaction
+commits and drops this process's copy. Other processes pick the change up
+within the TTL. The versions are also part of every page cache key, so
+cached pages never show stale branding.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import caching
+from .models import SiteSetting, SocialLink
+
+KEY_PREFIX = 'portfolio:site:'
+DEFAULT_TTL = 5
+
+# (monotonic check time, versions, context dict)
+_local = None
+
+
+def _key(versions):
+	return KEY_PREFIX + ':'.join(map(str, versions))
+
+
+def _query():
+	return {
+		'site_settings': SiteSetting.objects.first(),
+		'social_links': list(SocialLink.objects.order_by('order', 'pk')),
+	}
+
+
+def load():
+	"""The ``site_settings`` / ``social_links`` context; no query when cached."""
+	global _local
+	now = time.monotonic()
+	local = _local
+	ttl = getattr(settings, 'PORTFOLIO_SITE_CONTEXT_TTL', DEFAULT_TTL)
+	if local is not None and now - local[0] < ttl:
+		return local[2]
+	versions = caching.get_versions(caching.SITE_DEPENDENCIES)
+	if local is not None and local[1] == versions:
+		_local = (now, versions, local[2])
+		return local[2]
+	key = _key(versions)
+	data = cache.get(key)
+	if data is None:
+		data = _query()
+		cache.set(key, data, None)
+	_local = (now, versions, data)
+	return data
+
+
+def clear_local():
+	global _local
+	_local = None
+
+
+def invalidate():
+	"""Publish a change to every process; called after ``SiteSetting``/``SocialLink`` writes commit."""
+	for label in caching.SITE_DEPENDENCIES:
+		caching.bump_version(label)
+	clear_local()
+
+
+def site(request):
+	return load()
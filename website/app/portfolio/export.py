@@ -0,0 +1,359 @@
+"""Static export of the public site (``manage.py export_static``).
+
+Pages are rendered through the full WSGI stack as an anonymous visitor with
+the cache disabled, and written under ``PORTFOLIO_EXPORT_ROOT`` as
+``<path>/index.html``. Any file server can serve them. Paginated lists are
+followed to the end. Each later page is written to ``<list>/page/<n>/`` and
+the ``?cursor=`` links are rewritten to point there. Static and media files
+are not copied; serve ``STATIC_ROOT`` and ``MEDIA_ROOT`` alongside.
+
+While a page renders, a ``post_init`` receiver records every tracked row it
+loaded (``'portfolio.Category:3'``). Lists and feeds also depend on their
+whole models (``caching.PAGE_DEPENDENCIES``, ``syndication.FEEDS``). The
+dependency map is saved in ``.export-manifest.json`` with a snapshot of the
+tracked models. The snapshot holds ``updated_at`` per row, or a digest of
+the row for models without one, such as ``Category``, plus the tag names of
+tagged rows (``tags.add()`` does not touch ``updated_at``). An incremental
+build diffs that snapshot against the database. It then re-renders only:
+
+* pages that loaded a changed row,
+* pages that depend on a changed model,
+* objects that are newly published.
+
+Pages of objects that are gone are deleted. Every page shows ``SiteSetting``
+and ``SocialLink`` (:data:`SITE_WIDE`), so a change to either re-renders
+everything. Template changes are not detected; run a full build after them.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.models.signals import post_init
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from . import caching, syndication
+
+MANIFEST_NAME = '.export-manifest.json'
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# URL name -> models whose every change re-renders the page.
+LIST_PAGES = {
+	'portfolio_landing': caching.PAGE_DEPENDENCIES['index'],
+	**{f'portfolio:{name}': labels for name, labels in caching.PAGE_DEPENDENCIES.items()},
+}
+PAGINATED = ('portfolio:project_list', 'portfolio:blog_list', 'portfolio:news')
+
+# Detail URL name -> model; one page per published row, keyed by slug.
+DETAIL_PAGES = {
+	'portfolio:project_detail': 'portfolio.Project',
+	'portfolio:blog_detail': 'portfolio.BlogPost',
+	'portfolio:news_detail': 'portfolio.NewsItem',
+}
+
+# Re-rendered on every build: it depends on static files, not content.
+ALWAYS = ('service_worker',)
+
+# Rendered on every page (base.html); any change re-renders the whole site.
+SITE_WIDE = tuple(caching.SITE_DEPENDENCIES)
+
+TRACKED = sorted({
+	*(label for labels in LIST_PAGES.values() for label in labels),
+	*DETAIL_PAGES.values(),
+	*(label for label, *_ in syndication.FEEDS.values()),
+	*SITE_WIDE,
+})
+
+# The rel="prev"/"next" links of includes/pagination.html.
+PAGE_LINK = re.compile(r'href="\?cursor=([^"&]+)"([^>]*\brel="(prev|next)")')
+
+_recording = ContextVar('portfolio_export_recording', default=None)
+_worker = None
+
+
+class ExportError(Exception):
+	pass
+
+
+def get_root():
+	return Path(getattr(settings, 'PORTFOLIO_EXPORT_ROOT', Path(settings.BASE_DIR) / 'var' / 'export'))
+
+
+def get_site_url():
+	return getattr(settings, 'PORTFOLIO_SITE_URL', 'http://localhost:8000').rstrip('/')
+
+
+def file_for(path):
+	name = path.lstrip('/')
+	if not name or name.endswith('/'):
+		name += 'index.html'
+	return name
+
+
+def page_path(path, number):
+	return path if number == 1 else f'{path}page/{number}/'
+
+
+def discover():
+	"""``{path: spec}`` for every page the export should contain right now."""
+	pages = {}
+	for name, labels in LIST_PAGES.items():
+		pages[reverse(name)] = {'models': list(labels), 'paginated': name in PAGINATED}
+	for name, label in DETAIL_PAGES.items():
+		model = apps.get_model(label)
+		for slug in model._default_manager.filter(status=model.PUBLISHED).values_list('slug', flat=True):
+			pages[reverse(name, kwargs={'slug': slug})] = {'models': []}
+	for name, (label, *_) in syndication.FEEDS.items():
+		for kind in syndication.FEED_FORMATS:
+			pages[reverse(f'portfolio:{name}_feed_{kind}')] = {'models': [label]}
+	for name in ALWAYS:
+		pages[reverse(name)] = {'models': [], 'always': True}
+	return pages
+
+
+def _tag_names(model):
+	"""``{pk: 'a,b'}`` of the sorted tag names of every tagged row of ``model``."""
+	through = model._meta.get_field('tags').through
+	names = defaultdict(list)
+	rows = through.objects.filter(content_type=ContentType.objects.get_for_model(model))
+	for object_id, name in rows.values_list('object_id', 'tag__name'):
+		names[str(object_id)].append(name)
+	return {pk: ','.join(sorted(tag_names)) for pk, tag_names in names.items()}
+
+
+def snapshot():
+	"""``{label: {pk: signature}}`` of every tracked row; a changed signature means a changed row."""
+	result = {}
+	for label in TRACKED:
+		model = apps.get_model(label)
+		manager = model._base_manager
+		if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+			rows = manager.values_list('pk', 'updated_at')
+			signatures = {str(pk): updated.isoformat() for pk, updated in rows}
+		else:
+			fields = [field.attname for field in model._meta.concrete_fields]
+			signatures = {
+				str(row[0]): hashlib.md5(repr(row).encode(), usedforsecurity=False).hexdigest()
+				for row in manager.values_list('pk', *fields)
+			}
+		if any(field.name == 'tags' for field in model._meta.get_fields()):
+			tags = _tag_names(model)
+			signatures = {pk: f"{signature}|{tags.get(pk, '')}" for pk, signature in signatures.items()}
+		result[label] = signatures
+	return result
+
+
+def diff(old, new):
+	"""``(changed objects, changed models)`` between two snapshots."""
+	objects, models = set(), set()
+	for label in TRACKED:
+		before, after = old.get(label, {}), new.get(label, {})
+		for pk in before.keys() | after.keys():
+			if before.get(pk) != after.get(pk):
+				objects.add(f'{label}:{pk}')
+				models.add(label)
+	return objects, models
+
+
+def _write(root, name, content):
+	path = root / name
+	path.parent.mkdir(parents=True, exist_ok=True)
+	handle, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+	with os.fdopen(handle, 'wb') as stream:
+		stream.write(content)
+	os.replace(tmp, path)
+
+
+def _record_instance(sender, instance, **kwargs):
+	objects = _recording.get()
+	if objects is not None and sender._meta.label in TRACKED:
+		objects.add(f'{sender._meta.label}:{instance.pk}')
+
+
+def _link_pages(content, path, number):
+	"""Point the cursor links of page ``number`` at the exported pages; returns the next cursor too."""
+	next_cursor = None
+
+	def replace(match):
+		nonlocal next_cursor
+		cursor, rest, rel = match.groups()
+		if rel == 'next':
+			next_cursor = cursor
+		return f'href="{page_path(path, number + 1 if rel == "next" else number - 1)}"{rest}'
+
+	return PAGE_LINK.sub(replace, content), next_cursor
+
+
+class Renderer:
+	"""Renders pages in this process and writes them under ``root``."""
+
+	def __init__(self, root, site_url):
+		self.root = Path(root)
+		parts = urlsplit(site_url)
+		self.host = parts.netloc
+		self.secure = parts.scheme == 'https'
+		self.handler = WSGIHandler()
+		self.overrides = override_settings(
+			CACHES=NO_CACHE, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, parts.hostname],
+		)
+		post_init.connect(_record_instance, dispatch_uid='portfolio_export')
+
+	def get(self, url):
+		environ = RequestFactory(HTTP_HOST=self.host).get(url, secure=self.secure).environ
+		statuses = []
+		response = self.handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+		try:
+			content = b''.join(response)
+		finally:
+			response.close()
+		return int(statuses[0].split()[0]), content
+
+	def render(self, path, spec):
+		"""Write ``path`` (every page of it, when paginated); returns its manifest entry."""
+		objects = set()
+		token = _recording.set(objects)
+		files, url, number = [], path, 1
+		try:
+			while True:
+				status, content = self.get(url)
+				if status != 200:
+					raise ExportError(f'{url} returned {status}')
+				next_cursor = None
+				if spec.get('paginated'):
+					text, next_cursor = _link_pages(content.decode(), path, number)
+					content = text.encode()
+				name = file_for(page_path(path, number))
+				_write(self.root, name, content)
+				files.append(name)
+				if not next_cursor:
+					break
+				number += 1
+				url = f'{path}?cursor={next_cursor}'
+		finally:
+			_recording.reset(token)
+		return {**spec, 'files': files, 'objects': sorted(objects)}
+
+	def render_many(self, items):
+		"""``[(path, entry or None, error or None)]`` for ``items`` of ``(path, spec)``."""
+		results = []
+		with self.overrides:
+			for path, spec in items:
+				try:
+					results.append((path, self.render(path, spec), None))
+				except Exception as exc:
+					results.append((path, None, str(exc)))
+		return results
+
+
+def _init_worker(root, site_url):
+	global _worker
+	django.setup()
+	_worker = Renderer(root, site_url)
+
+
+def _render_in_worker(items):
+	return _worker.render_many(items)
+
+
+def _load_manifest(root):
+	try:
+		return json.loads((root / MANIFEST_NAME).read_text())
+	except (FileNotFoundError, ValueError):
+		return None
+
+
+def _remove_files(root, names):
+	for name in names:
+		path = root / name
+		try:
+			path.unlink()
+		except FileNotFoundError:
+			continue
+		for parent in path.parents:
+			if parent == root or not parent.is_relative_to(root):
+				break
+			try:
+				parent.rmdir()
+			except OSError:
+				break
+
+
+def build(root=None, full=False, jobs=1, site_url=None):
+	"""Export the site to ``root``; incremental unless ``full`` or there is no usable manifest.
+
+	Full builds with ``jobs > 1`` render in a process pool. Returns a summary
+	dict; failed pages are listed in ``errors`` and retried on the next build.
+	"""
+	started = time.perf_counter()
+	root = Path(root or get_root())
+	site_url = (site_url or get_site_url()).rstrip('/')
+	root.mkdir(parents=True, exist_ok=True)
+	manifest = None if full else _load_manifest(root)
+	if manifest is not None and manifest.get('site_url') != site_url:
+		# Absolute URLs (canonical links, feeds) are baked into every page.
+		manifest = None
+	previous = manifest['pages'] if manifest else {}
+	current = discover()
+	state = snapshot()
+	if manifest is not None:
+		changed_objects, changed_models = diff(manifest['snapshot'], state)
+		if changed_models.intersection(SITE_WIDE):
+			manifest = None
+	if manifest is None:
+		work = list(current.items())
+	else:
+		work = [
+			(path, spec) for path, spec in current.items()
+			if path not in previous or spec.get('always')
+			or changed_models.intersection(spec['models'])
+			or changed_objects.intersection(previous[path]['objects'])
+		]
+
+	if manifest is None and jobs > 1 and len(work) > 1:
+		# Workers open their own connections; forked copies of ours must not be shared.
+		connections.close_all()
+		chunks = [work[start::jobs * 4] for start in range(min(len(work), jobs * 4))]
+		with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(root, site_url)) as pool:
+			results = [result for chunk in pool.map(_render_in_worker, chunks) for result in chunk]
+	else:
+		results = Renderer(root, site_url).render_many(work)
+
+	pages = {path: entry for path, entry in previous.items() if path in current}
+	errors = {}
+	for path, entry, error in results:
+		if error is None:
+			pages[path] = entry
+		else:
+			errors[path] = error
+			pages.pop(path, None)
+	kept = {name for entry in pages.values() for name in entry['files']}
+	stale = sorted({name for entry in previous.values() for name in entry['files']} - kept)
+	_remove_files(root, stale)
+
+	data = json.dumps({'site_url': site_url, 'snapshot': state, 'pages': pages}, separators=(',', ':'))
+	_write(root, MANIFEST_NAME, data.encode())
+	return {
+		'mode': 'full' if manifest is None else 'incremental',
+		'pages': len(current),
+		'rendered': len(results) - len(errors),
+		'files': sum(len(entry['files']) for path, entry, error in results if error is None),
+		'removed': len(stale),
+		'errors': errors,
+		'seconds': round(time.perf_counter() - started, 2),
+	}
+
@@ -0,0 +1,23 @@
+from django import forms
+
+from .models import ContactMessage
+
+SUBJECT_CHOICES = (
+	('', 'Select a topic'),
+	('collaboration', 'Collaboration Opportunity'),
+	('consultation', 'Technical Consultation'),
+	('project', 'Project Discussion'),
+	('speaking', 'Speaking Engagement'),
+	('mentoring', 'Mentoring Request'),
+	('general', 'General Inquiry'),
+	('other', 'Other'),
+)
+
+
+class ContactForm(forms.ModelForm):
+	subject = forms.ChoiceField(choices=SUBJECT_CHOICES)
+
+	class Meta:
+		model = ContactMessage
+		fields = ('name', 'email', 'subject', 'message')
+
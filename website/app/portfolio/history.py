@@ -0,0 +1,285 @@
+"""Retention and compaction for ``simple_history`` tables.
+
+Every save stores a full copy of the row, including large text columns. Versions
+that fall outside the retention policy (``PORTFOLIO_HISTORY_RETENTION``) keep
+their small columns but have their text columns replaced by a line-based delta
+against the next newer version of the same object, stored in ``history_delta``.
+The newest version of an object is never compacted, so any version can be
+rebuilt by walking forward to a full one.
+
+Compaction is invisible to readers: :class:`CompactingHistoricalQuerySet`
+restores the text of compacted rows as they are fetched, so ``instance``,
+``diff_against``, ``values()`` and the admin history pages see full versions
+(see the class for what it cannot restore).
+"""
+import difflib
+import json
+from datetime import timedelta
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import QuerySet
+from django.db.models.query import BaseIterable, ModelIterable
+from django.db.models.utils import create_namedtuple_class
+from django.utils import timezone
+from simple_history.manager import HistoricalQuerySet
+
+DEFAULT_RETENTION = {'keep': 10, 'days': 30}
+
+
+def compacted_fields(history_model):
+	"""The tracked text columns that compaction replaces with deltas."""
+	return [field.attname for field in history_model.tracked_fields if isinstance(field, models.TextField)]
+
+
+def encode_delta(old, new):
+	"""Describe ``old`` in terms of ``new``: ``[start, end]`` copies lines of ``new``, strings are literal."""
+	old_lines = (old or '').splitlines(keepends=True)
+	new_lines = (new or '').splitlines(keepends=True)
+	ops = []
+	matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+	for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+		if tag == 'equal':
+			ops.append([i1, i2])
+		elif j2 > j1:
+			ops.append(''.join(old_lines[j1:j2]))
+	return ops
+
+
+def apply_delta(ops, new):
+	new_lines = (new or '').splitlines(keepends=True)
+	return ''.join(op if isinstance(op, str) else ''.join(new_lines[op[0]:op[1]]) for op in ops)
+
+
+def _versions(history_model, object_ids):
+	"""Yield ``(object_id, rows)`` with each object's rows newest first (as dicts)."""
+	id_attr = history_model.instance_type._meta.pk.attname
+	rows = (
+		QuerySet(history_model)
+		.filter(**{f'{id_attr}__in': object_ids})
+		.order_by(id_attr, '-history_date', '-history_id')
+		.values('history_id', id_attr, 'history_date', 'history_delta', *compacted_fields(history_model))
+	)
+	current, batch = None, []
+	for row in rows:
+		if batch and row[id_attr] != current:
+			yield current, batch
+			batch = []
+		current = row[id_attr]
+		batch.append(row)
+	if batch:
+		yield current, batch
+
+
+def _expanded(rows, fields):
+	"""Yield ``(row, values)`` newest first with the full text of every version."""
+	newer = None
+	for row in rows:
+		delta = row['history_delta'] or {}
+		values = {
+			name: apply_delta(delta[name], newer[name]) if name in delta and newer is not None else row[name]
+			for name in fields
+		}
+		yield row, values
+		newer = values
+
+
+def _expand(history_model, items):
+	"""Restore, in place, the text columns of the compacted rows among ``items``."""
+	compacted = [item for item in items if item.history_delta]
+	if not compacted:
+		return
+	id_attr = history_model.instance_type._meta.pk.attname
+	fields = compacted_fields(history_model)
+	wanted = {item.history_id: item for item in compacted}
+	object_ids = {getattr(item, id_attr) for item in compacted}
+	for _, rows in _versions(history_model, object_ids):
+		for row, values in _expanded(rows, fields):
+			item = wanted.get(row['history_id'])
+			if item is not None:
+				for name, value in values.items():
+					setattr(item, name, value)
+
+
+class ExpandingIterable(ModelIterable):
+	"""Historical records with compacted rows restored, one chunk at a time under ``iterator()``."""
+
+	def __iter__(self):
+		items = super().__iter__()
+		size = self.chunk_size if self.chunked_fetch else None
+		while chunk := list(islice(items, size)):
+			_expand(self.queryset.model, chunk)
+			yield from chunk
+
+
+class ExpandedValuesIterable(BaseIterable):
+	"""``values()`` rows read from expanded records rather than the raw columns."""
+
+	def __iter__(self):
+		queryset = self.queryset
+		opts = queryset.model._meta
+		attnames = [opts.pk.attname if name == 'pk' else opts.get_field(name).attname for name in queryset._fields]
+		for item in ExpandingIterable(queryset, self.chunked_fetch, self.chunk_size):
+			yield self.row(queryset._fields, [getattr(item, attname) for attname in attnames])
+
+	def row(self, names, values):
+		return dict(zip(names, values))
+
+
+class ExpandedValuesListIterable(ExpandedValuesIterable):
+	def row(self, names, values):
+		return tuple(values)
+
+
+class ExpandedNamedValuesListIterable(ExpandedValuesIterable):
+	def row(self, names, values):
+		return create_namedtuple_class(*names)._make(values)
+
+
+class ExpandedFlatValuesListIterable(ExpandedValuesIterable):
+	def row(self, names, values):
+		return values[0]
+
+
+class CompactingHistoricalQuerySet(HistoricalQuerySet):
+	"""Restores the text columns of compacted rows when results are fetched.
+
+	Model instances (``list()``, ``iterator()``, ``get()``...) are always
+	expanded. ``values()`` and ``values_list()`` are too when they read a
+	compacted column, but then only plain field names are accepted: lookups
+	across relations and expressions raise ``TypeError``, since the text has
+	to be rebuilt from whole records. Aggregates and lookups over compacted
+	columns (``filter(content__contains=...)``) still see the stored deltas.
+	"""
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self._iterable_class = ExpandingIterable
+
+	def values(self, *fields, **expressions):
+		if expressions or not self._reads_compacted(fields):
+			return super().values(*fields, **expressions)
+		return self._expanded_values(fields, ExpandedValuesIterable)
+
+	def values_list(self, *fields, flat=False, named=False):
+		if not self._reads_compacted(fields):
+			return super().values_list(*fields, flat=flat, named=named)
+		if flat and named:
+			raise TypeError("'flat' and 'named' can't be used together.")
+		if flat and len(fields) > 1:
+			raise TypeError("'flat' is not valid when values_list is called with more than one field.")
+		if flat:
+			iterable_class = ExpandedFlatValuesListIterable
+		elif named:
+			iterable_class = ExpandedNamedValuesListIterable
+		else:
+			iterable_class = ExpandedValuesListIterable
+		return self._expanded_values(fields, iterable_class)
+
+	def _reads_compacted(self, fields):
+		compacted = set(compacted_fields(self.model))
+		return bool(compacted) and (not fields or any(field in compacted for field in fields))
+
+	def _expanded_values(self, fields, iterable_class):
+		names = fields or tuple(field.attname for field in self.model._meta.concrete_fields)
+		for name in names:
+			if not isinstance(name, str) or (name != 'pk' and name not in self._concrete_names()):
+				raise TypeError(
+					f"values()/values_list() over compacted history columns only accept plain field names, not {name!r}."
+				)
+		clone = self._chain()
+		clone._fields = tuple(names)
+		clone._iterable_class = iterable_class
+		return clone
+
+	def _concrete_names(self):
+		return {
+			name for field in self.model._meta.concrete_fields for name in (field.name, field.attname)
+		}
+
+
+class CompactableHistory(models.Model):
+	"""Base for historical models; holds the deltas of compacted text columns."""
+
+	history_delta = models.JSONField(null=True, blank=True, editable=False)
+
+	objects = CompactingHistoricalQuerySet.as_manager()
+
+	class Meta:
+		abstract = True
+
+
+def get_policy(model):
+	"""``{'keep': n, 'days': d}`` for ``model``; a version is kept whole if either applies."""
+	configured = getattr(settings, 'PORTFOLIO_HISTORY_RETENTION', {})
+	policy = dict(DEFAULT_RETENTION)
+	policy.update(configured.get('default', {}))
+	policy.update(configured.get(model._meta.label, {}))
+	return policy
+
+
+def history_models():
+	"""Historical models that support compaction, as ``(model, history_model)``."""
+	for model in apps.get_models():
+		manager = getattr(model, 'history', None)
+		history_model = getattr(manager, 'model', None)
+		if history_model is not None and issubclass(history_model, CompactableHistory):
+			yield model, history_model
+
+
+def compact(model, batch_size=500, now=None):
+	"""Compact old versions of ``model`` one transaction per batch; yields rows compacted per batch.
+
+	Objects are visited in batches of ``batch_size`` object ids so memory and
+	lock time stay bounded however large the history table is.
+	"""
+	history_model = model.history.model
+	policy = get_policy(model)
+	fields = compacted_fields(history_model)
+	if not fields:
+		return
+	cutoff = (now or timezone.now()) - timedelta(days=policy['days'] or 0)
+	id_attr = model._meta.pk.attname
+	object_ids = list(
+		QuerySet(history_model)
+		.filter(history_delta__isnull=True, history_date__lt=cutoff)
+		.order_by(id_attr).values_list(id_attr, flat=True).distinct()
+	)
+	for start in range(0, len(object_ids), batch_size):
+		with transaction.atomic():
+			updates = []
+			for _, rows in _versions(history_model, object_ids[start:start + batch_size]):
+				updates += _compact_rows(rows, fields, policy['keep'], cutoff)
+			changed = [
+				history_model(
+					history_id=history_id, history_delta=delta,
+					**{name: '' if name in delta else value for name, value in values.items()},
+				)
+				for history_id, delta, values in updates
+			]
+			QuerySet(history_model).bulk_update(changed, ['history_delta', *fields], batch_size=batch_size)
+		yield len(changed)
+
+
+def _compact_rows(rows, fields, keep, cutoff):
+	"""Return ``(history_id, delta, values)`` for every version of one object to compact.
+
+	A column is only delta-encoded when that is smaller than its text; a row
+	whose columns all stay whole is still marked (with an empty delta) so it
+	is not examined again.
+	"""
+	updates = []
+	newer = None
+	for position, (row, values) in enumerate(_expanded(rows, fields)):
+		retained = (keep is not None and position < keep) or row['history_date'] >= cutoff
+		if newer is not None and not retained and row['history_delta'] is None:
+			delta = {}
+			for name in fields:
+				ops = encode_delta(values[name], newer[name])
+				if len(json.dumps(ops)) < len(values[name] or ''):
+					delta[name] = ops
+			updates.append((row['history_id'], delta, values))
+		newer = values
+	return updates
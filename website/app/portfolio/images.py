@@ -0,0 +1,123 @@
+"""Resized WebP/JPEG derivatives for uploaded images.
+
+Derivatives live under ``derivatives/<hash>/`` where the hash is taken from
+the source file name and the encoder settings (:data:`FORMATS`,
+:data:`DERIVATIVE_VERSION`). Storage never reuses a name for a different
+upload and existing derivatives are never rewritten, so a derivative URL
+always refers to the same bytes and can be served with a far-future,
+immutable cache lifetime. To change the output, edit :data:`FORMATS` or bump
+:data:`DERIVATIVE_VERSION`; the new files get new URLs. Widths larger than
+the source are written at the source width rather than upscaled, so every
+configured width always exists once an image has been processed.
+
+Derivatives are written by a background task after upload. Until they
+exist, :func:`is_ready` is false and templates fall back to the original.
+"""
+import hashlib
+import io
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DERIVATIVE_DIR = 'derivatives'
+DERIVATIVE_VERSION = 1
+DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+
+# (extension, Pillow format, save options)
+FORMATS = (
+	('webp', 'WEBP', {'quality': 80, 'method': 4}),
+	('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+# Image fields that get derivatives, as (model label, field name).
+IMAGE_FIELDS = (
+	('portfolio.Project', 'hero_image'),
+	('portfolio.BlogPost', 'cover_image'),
+	('portfolio.ProjectImage', 'image'),
+	('portfolio.SiteSetting', 'logo'),
+)
+
+
+def get_widths():
+	return tuple(getattr(settings, 'PORTFOLIO_IMAGE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def derivative_name(source_name, width, extension):
+	digest = hashlib.sha1(f'{source_name}:{DERIVATIVE_VERSION}:{FORMATS!r}'.encode()).hexdigest()[:16]
+	stem = posixpath.splitext(posixpath.basename(source_name))[0][:40]
+	return f'{DERIVATIVE_DIR}/{digest}/{stem}-{width}w.{extension}'
+
+
+def has_derivatives(source_name, storage=default_storage):
+	# The largest JPEG is written last, so it marks a complete set.
+	widths = get_widths()
+	return storage.exists(derivative_name(source_name, widths[-1], FORMATS[-1][0]))
+
+
+def is_ready(field_file):
+	return bool(field_file) and has_derivatives(field_file.name, field_file.storage)
+
+
+def generate_derivatives(source_name, storage=default_storage, force=False):
+	"""Write the missing width/format derivatives of ``source_name``; returns names written.
+
+	Without ``force`` nothing is done once the set looks complete; ``force``
+	checks every file. Existing files are never overwritten.
+	"""
+	if not force and has_derivatives(source_name, storage):
+		return []
+	missing = {
+		(width, extension) for width in get_widths() for extension, *_ in FORMATS
+		if not storage.exists(derivative_name(source_name, width, extension))
+	}
+	if not missing:
+		return []
+	with storage.open(source_name, 'rb') as source:
+		image = Image.open(source)
+		image.load()
+	image = ImageOps.exif_transpose(image)
+	has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+	written = []
+	for width in get_widths():
+		if all((width, extension) not in missing for extension, *_ in FORMATS):
+			continue
+		resized = image
+		if image.width > width:
+			height = round(image.height * width / image.width)
+			resized = image.resize((width, height), Image.Resampling.LANCZOS)
+		for extension, image_format, options in FORMATS:
+			if (width, extension) not in missing:
+				continue
+			if not has_alpha:
+				frame = resized.convert('RGB')
+			elif image_format == 'WEBP':
+				frame = resized.convert('RGBA')
+			else:
+				frame = _flatten(resized)
+			buffer = io.BytesIO()
+			frame.save(buffer, image_format, **options)
+			name = derivative_name(source_name, width, extension)
+			written.append(storage.save(name, ContentFile(buffer.getvalue())))
+	return written
+
+
+def _flatten(image):
+	background = Image.new('RGB', image.size, (255, 255, 255))
+	background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+	return background
+
+
+def srcset(field_file, extension):
+	return ', '.join(
+		f'{field_file.storage.url(derivative_name(field_file.name, width, extension))} {width}w'
+		for width in get_widths()
+	)
+
+
+def fallback_url(field_file, width=640):
+	widths = get_widths()
+	width = min(widths, key=lambda candidate: abs(candidate - width))
+	return field_file.storage.url(derivative_name(field_file.name, width, FORMATS[-1][0]))
@@ -0,0 +1,115 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from app.portfolio.aio import PortfolioASGIHandler
+
+DEFAULT_PATHS = ('/', '/portfolio/projects/', '/portfolio/experience/')
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+	help = (
+		"Compare WSGI (sync views) and ASGI (async views) throughput under concurrent load, "
+		"driving both handlers in-process so only the application stack is measured."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--requests', type=int, default=200, help="Requests per path and mode.")
+		parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight at once.")
+		parser.add_argument('--path', action='append', help="Path to request (repeatable).")
+		parser.add_argument('--cache', choices=('warm', 'cold', 'both'), default='both',
+			help="warm: page cache enabled; cold: every request renders (dummy cache).")
+
+	def handle(self, *args, **options):
+		hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+		self.host = hosts[0] if hosts else 'localhost'
+		self.requests = options['requests']
+		self.concurrency = options['concurrency']
+		paths = options['path'] or DEFAULT_PATHS
+		cache_modes = ('warm', 'cold') if options['cache'] == 'both' else (options['cache'],)
+		wsgi, asgi = WSGIHandler(), PortfolioASGIHandler()
+		self.stdout.write(f"{self.requests} requests per run, concurrency {self.concurrency}")
+		for cache_mode in cache_modes:
+			for path in paths:
+				results = {}
+				for server, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+					with override_settings(**({'CACHES': NO_CACHE} if cache_mode == 'cold' else {})):
+						run(wsgi if server == 'wsgi' else asgi, path, self.concurrency)  # warm-up
+						elapsed, latencies = run(wsgi if server == 'wsgi' else asgi, path, self.requests)
+					results[server] = self.requests / elapsed
+					latencies.sort()
+					self.stdout.write(
+						f"{cache_mode:<5} {server:<5} {path:<28} {results[server]:8.1f} req/s  "
+						f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+						f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f}ms"
+					)
+				self.stdout.write(f"{'':<11} asgi/wsgi {path:<24} {results['asgi'] / results['wsgi']:8.2f}x")
+
+	def run_wsgi(self, handler, path, count):
+		environ = RequestFactory(HTTP_HOST=self.host).get(path).environ
+
+		def one(_):
+			statuses = []
+			start = time.perf_counter()
+			response = handler(dict(environ), lambda status, headers, exc_info=None: statuses.append(status))
+			try:
+				for _ in response:
+					pass
+			finally:
+				response.close()
+			self.check_status(path, int(statuses[0].split()[0]))
+			return time.perf_counter() - start
+
+		start = time.perf_counter()
+		with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+			latencies = list(executor.map(one, range(count)))
+		return time.perf_counter() - start, latencies
+
+	def run_asgi(self, handler, path, count):
+		scope = {
+			'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+			'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+			'headers': [(b'host', self.host.encode())], 'client': ('127.0.0.1', 0), 'server': (self.host, 80),
+		}
+
+		async def one(semaphore):
+			async with semaphore:
+				done = asyncio.Event()
+				state = {'requested': False}
+
+				async def receive():
+					if not state['requested']:
+						state['requested'] = True
+						return {'type': 'http.request', 'body': b'', 'more_body': False}
+					await done.wait()
+					return {'type': 'http.disconnect'}
+
+				async def send(message):
+					if message['type'] == 'http.response.start':
+						state['status'] = message['status']
+					elif not message.get('more_body'):
+						done.set()
+
+				start = time.perf_counter()
+				await handler(dict(scope), receive, send)
+				self.check_status(path, state['status'])
+				return time.perf_counter() - start
+
+		async def main():
+			semaphore = asyncio.Semaphore(self.concurrency)
+			return await asyncio.gather(*(one(semaphore) for _ in range(count)))
+
+		start = time.perf_counter()
+		latencies = asyncio.run(main())
+		return time.perf_counter() - start, list(latencies)
+
+	def check_status(self, path, status):
+		if status != 200:
+			raise CommandError(f"{path} returned {status}")
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from app.portfolio.api import views
+
+VIEWSETS = {
+	'projects': views.ProjectViewSet,
+	'blog-posts': views.BlogPostViewSet,
+	'news': views.NewsItemViewSet,
+	'experience': views.ExperienceViewSet,
+	'skills': views.SkillViewSet,
+}
+
+
+class Command(BaseCommand):
+	help = "Compare the instance and .values() serializer paths of the API list endpoints."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--sizes', default='20,100,500,1000', help="Comma-separated page sizes.")
+		parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; the best is reported.")
+		parser.add_argument('--endpoint', action='append', choices=sorted(VIEWSETS),
+			help="Endpoint to measure (repeatable); all by default.")
+
+	def handle(self, *args, **options):
+		sizes = [int(size) for size in options['sizes'].split(',')]
+		renderer = JSONRenderer()
+		hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+		request = Request(RequestFactory().get('/portfolio/api/', HTTP_HOST=hosts[0] if hosts else 'localhost'))
+		for endpoint in options['endpoint'] or sorted(VIEWSETS):
+			viewset = VIEWSETS[endpoint]
+			serializer_class = viewset.serializer_class
+			context = {'request': request}
+			queryset = viewset.queryset.order_by(*viewset.ordering, 'pk')
+			total = queryset.count()
+			self.stdout.write(f"{endpoint}: {total} rows")
+			for size in sizes:
+				def instances():
+					rows = list(queryset.all()[:size])
+					return renderer.render(serializer_class(rows, many=True, context=context).data)
+
+				def values():
+					rows = list(serializer_class.values_queryset(queryset)[:size])
+					return renderer.render(serializer_class.serialize_rows(rows, context))
+
+				slow, slow_body = self.measure(instances, options['repeat'])
+				fast, fast_body = self.measure(values, options['repeat'])
+				if slow_body != fast_body:
+					raise CommandError(f"{endpoint}: outputs differ at page size {size}")
+				self.stdout.write(
+					f"  size={size:<5} rows={min(size, total):<5} instances={slow * 1000:8.1f}ms "
+					f"values={fast * 1000:8.1f}ms speedup={slow / fast if fast else 0:5.2f}x"
+				)
+
+	def measure(self, func, repeat):
+		best, body = None, None
+		for _ in range(repeat):
+			start = time.perf_counter()
+			body = func()
+			elapsed = time.perf_counter() - start
+			best = elapsed if best is None else min(best, elapsed)
+		return best, body
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app.portfolio import syndication
+
+
+class Command(BaseCommand):
+	help = "Rebuild the precomputed sitemap shards, sitemap index and RSS/Atom feeds."
+
+	def handle(self, *args, **options):
+		syndication.rebuild()
+		root = syndication.get_root()
+		files = sorted(path.relative_to(root) for path in root.rglob('*') if path.is_file())
+		for name in files:
+			self.stdout.write(str(name))
+		self.stdout.write(self.style.SUCCESS(f"Wrote {len(files)} file(s) to {root}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from app.portfolio import caching, metrics
+from app.portfolio.api.urls import router
+
+
+class Command(BaseCommand):
+	help = "Show page and API cache hit/miss counters per view."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--reset', action='store_true', help="Reset the counters after printing.")
+
+	def handle(self, *args, **options):
+		if not metrics.is_shared():
+			self.stderr.write(self.style.WARNING(
+				"The default cache is per process, so these are this command's own counters. "
+				f"See {reverse('portfolio_metrics')} for the server's."
+			))
+		basenames = [basename for _, _, basename in router.registry]
+		for row in caching.cache_stats(basenames):
+			rate = f"{row['hit_rate']:.1%}" if row['hit_rate'] is not None else "-"
+			self.stdout.write(f"{row['label']:<15} hits={row['hits']:<8} misses={row['misses']:<8} hit rate={rate}")
+		if options['reset']:
+			metrics.reset(caching.page_metric_names() + caching.api_metric_names(basenames))
+			self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.portfolio import history
+
+
+class Command(BaseCommand):
+	help = "Delta-encode historical versions that fall outside PORTFOLIO_HISTORY_RETENTION."
+
+	def add_arguments(self, parser):
+		parser.add_argument('models', nargs='*', help="Model labels (e.g. portfolio.BlogPost); all by default.")
+		parser.add_argument('--batch-size', type=int, default=500, help="Objects whose history is compacted per transaction.")
+
+	def handle(self, *args, **options):
+		available = {model._meta.label_lower: model for model, _ in history.history_models()}
+		labels = [label.lower() for label in options['models']] or sorted(available)
+		unknown = [label for label in labels if label not in available]
+		if unknown:
+			raise CommandError(f"No compactable history for: {', '.join(unknown)}")
+		total = 0
+		for label in labels:
+			compacted = sum(history.compact(available[label], batch_size=options['batch_size']))
+			total += compacted
+			self.stdout.write(f"{label}: {compacted} version(s) compacted")
+		self.stdout.write(self.style.SUCCESS(f"Compacted {total} version(s)."))
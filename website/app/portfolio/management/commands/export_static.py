@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.portfolio import export
+
+
+class Command(BaseCommand):
+	help = (
+		"Pre-render the public site (landing page, lists, published detail pages, feeds and sw.js) "
+		"into a directory any file server can serve. Later runs re-render only the pages affected "
+		"by changed content; pass --full after template changes."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--output', help="Target directory (default: PORTFOLIO_EXPORT_ROOT).")
+		parser.add_argument('--full', action='store_true', help="Re-render every page, ignoring the manifest.")
+		parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+			help="Worker processes for full builds (default: CPU count; 1 renders in this process).")
+		parser.add_argument('--site-url', help="Scheme and host pages are rendered for (default: PORTFOLIO_SITE_URL).")
+
+	def handle(self, *args, **options):
+		if options['jobs'] < 1:
+			raise CommandError("--jobs must be at least 1.")
+		root = options['output'] or export.get_root()
+		result = export.build(root, full=options['full'], jobs=options['jobs'], site_url=options['site_url'])
+		for path, error in sorted(result['errors'].items()):
+			self.stderr.write(f"{path}: {error}")
+		self.stdout.write(
+			f"{result['mode']} build: rendered {result['rendered']} of {result['pages']} page(s) "
+			f"into {result['files']} file(s), removed {result['removed']} stale file(s) "
+			f"in {result['seconds']}s -> {root}"
+		)
+		if result['errors']:
+			raise CommandError(f"{len(result['errors'])} page(s) failed to render.")
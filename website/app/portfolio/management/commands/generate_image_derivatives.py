@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from app.portfolio import images
+
+
+class Command(BaseCommand):
+	help = "Generate responsive image derivatives for every uploaded image that lacks them."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--force', action='store_true', help="Check every derivative file and write any that are missing.")
+
+	def handle(self, *args, **options):
+		total = 0
+		for label, field_name in images.IMAGE_FIELDS:
+			model = apps.get_model(label)
+			names = (
+				model._default_manager.exclude(**{field_name: ''})
+				.exclude(**{f'{field_name}__isnull': True})
+				.values_list(field_name, flat=True)
+			)
+			field = model._meta.get_field(field_name)
+			for name in names.iterator():
+				try:
+					written = images.generate_derivatives(name, field.storage, force=options['force'])
+				except OSError as exc:
+					self.stderr.write(f"{label}.{field_name} {name}: {exc}")
+					continue
+				total += len(written)
+		self.stdout.write(self.style.SUCCESS(f"Wrote {total} derivative files."))
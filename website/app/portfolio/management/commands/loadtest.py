@@ -0,0 +1,291 @@
+import json
+import math
+import statistics
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+from django.urls.resolvers import RoutePattern
+from django.utils import timezone
+
+from app.portfolio.models import BlogPost, NewsItem, Project
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+# Detail views that look their object up by slug, published only.
+SLUG_MODELS = {
+	'project_detail': Project,
+	'blog_detail': BlogPost,
+	'news_detail': NewsItem,
+}
+
+# Routes outside portfolio/urls.py that are part of the public surface.
+EXTRA_ROUTES = ('service_worker',)
+
+PERCENTILES = (50, 95, 99)
+
+
+def _percentile(ordered, percent):
+	"""Nearest-rank percentile of an already sorted list."""
+	if not ordered:
+		return None
+	return ordered[min(len(ordered) - 1, max(math.ceil(percent / 100 * len(ordered)) - 1, 0))]
+
+
+def _url_kwargs(pattern):
+	if isinstance(pattern.pattern, RoutePattern):
+		return set(pattern.pattern.converters)
+	return set(pattern.pattern.regex.groupindex)
+
+
+def _published(queryset):
+	model = queryset.model
+	if hasattr(model, 'PUBLISHED'):
+		return queryset.filter(status=model.PUBLISHED)
+	return queryset
+
+
+def _sample_kwargs(name, pattern, kwargs):
+	"""URL kwargs pointing at an existing published object, or None when there is none."""
+	if not kwargs:
+		return {}
+	viewset = getattr(pattern.callback, 'cls', None)
+	if viewset is not None:
+		lookup_field = viewset.lookup_field
+		lookup_kwarg = viewset.lookup_url_kwarg or lookup_field
+		value = _published(viewset.queryset.all()).values_list(lookup_field, flat=True).first()
+		return None if value is None else {lookup_kwarg: value}
+	model = SLUG_MODELS.get(name)
+	if model is None or kwargs != {'slug'}:
+		return None
+	slug = _published(model.objects.order_by('-published_at', 'pk')).values_list('slug', flat=True).first()
+	return None if slug is None else {'slug': slug}
+
+
+def _walk(patterns):
+	for pattern in patterns:
+		if isinstance(pattern, URLResolver):
+			yield from _walk(pattern.url_patterns)
+		elif pattern.name:
+			yield pattern
+
+
+def discover_routes():
+	"""``(name, path)`` for every route in ``portfolio/urls.py`` (the API router
+	included) and :data:`EXTRA_ROUTES`, plus ``(name, None)`` for detail routes
+	with no published object to point at."""
+	_, resolver = get_resolver().namespace_dict['portfolio']
+	routes, seen = [], set()
+	for pattern in _walk(resolver.url_patterns):
+		kwargs = _url_kwargs(pattern)
+		# The router adds a ".json"-style twin of every route; the plain one is enough.
+		if 'format' in kwargs or pattern.name in seen:
+			continue
+		# Write-only router actions such as bulk upserts.
+		actions = getattr(pattern.callback, 'actions', None)
+		if actions is not None and 'get' not in actions:
+			continue
+		seen.add(pattern.name)
+		sample = _sample_kwargs(pattern.name, pattern, kwargs)
+		name = f'portfolio:{pattern.name}'
+		routes.append((name, None if sample is None else reverse(name, kwargs=sample)))
+	routes += [(name, reverse(name)) for name in EXTRA_ROUTES]
+	return routes
+
+
+def _git_revision():
+	try:
+		return subprocess.run(
+			['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+			capture_output=True, text=True, check=True, timeout=5,
+		).stdout.strip()
+	except (OSError, subprocess.SubprocessError):
+		return None
+
+
+class Command(BaseCommand):
+	help = (
+		"Load-test every route in portfolio/urls.py, the API router and /sw.js, reporting "
+		"latency percentiles, requests per second, SQL queries per request and response size. "
+		"Runs in-process by default; pass --url to drive a running server instead."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--requests', type=int, default=100, help="Requests per route.")
+		parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight at once.")
+		parser.add_argument('--warmup', type=int, default=5, help="Unmeasured requests per route first.")
+		parser.add_argument('--url', help="Base URL of a running server, e.g. http://127.0.0.1:8000. "
+			"SQL queries cannot be counted in this mode.")
+		parser.add_argument('--route', action='append',
+			help="Only routes whose name or path contains this text (repeatable).")
+		parser.add_argument('--cold', action='store_true',
+			help="Disable the cache so every request renders (in-process only).")
+		parser.add_argument('--output', help="Write the results as JSON to this file.")
+		parser.add_argument('--compare', help="JSON results of an earlier run to compare against.")
+		parser.add_argument('--threshold', type=float, default=20.0,
+			help="Percent p95 slowdown that counts as a regression when comparing.")
+		parser.add_argument('--fail-on-regression', action='store_true',
+			help="Exit with an error when --compare finds a regression.")
+
+	def handle(self, *args, **options):
+		if options['requests'] < 1 or options['concurrency'] < 1:
+			raise CommandError("--requests and --concurrency must be at least 1.")
+		self.concurrency = options['concurrency']
+		self.base_url = (options['url'] or '').rstrip('/')
+		hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+		self.host = hosts[0] if hosts else 'localhost'
+		self.handler = None if self.base_url else WSGIHandler()
+
+		routes = discover_routes()
+		if options['route']:
+			routes = [(name, path) for name, path in routes
+				if any(text in name or text in (path or '') for text in options['route'])]
+		report = {
+			'revision': _git_revision(),
+			'started_at': timezone.now().isoformat(),
+			'mode': 'http' if self.base_url else 'in-process',
+			'cache': 'cold' if options['cold'] else 'warm',
+			'requests': options['requests'],
+			'concurrency': self.concurrency,
+			'routes': {},
+		}
+		self.stdout.write(
+			f"{report['mode']}, {report['cache']} cache: {options['requests']} requests per route, "
+			f"concurrency {self.concurrency}"
+		)
+		overrides = {}
+		if not self.base_url:
+			# Every in-process request comes from one address; measure the views, not the API throttle.
+			overrides['REST_FRAMEWORK'] = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+			if options['cold']:
+				overrides['CACHES'] = NO_CACHE
+		with override_settings(**overrides):
+			for name, path in routes:
+				if path is None:
+					self.stdout.write(f"{name:<36} skipped: no published object to request")
+					continue
+				self.run(path, options['warmup'])
+				result = self.run(path, options['requests'])
+				report['routes'][name] = result
+				self.stdout.write(self.format_result(name, result))
+
+		if options['output']:
+			Path(options['output']).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+			self.stdout.write(f"Wrote {options['output']}")
+		if options['compare']:
+			baseline = json.loads(Path(options['compare']).read_text())
+			regressions = self.compare(baseline, report, options['threshold'])
+			if regressions and options['fail_on_regression']:
+				raise CommandError(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+
+	def run(self, path, count):
+		one = self.request_http if self.base_url else self.request_in_process
+		if count < 1:
+			return None
+		start = time.perf_counter()
+		if self.concurrency == 1:
+			# Stay on this thread (and its connection), e.g. inside a test transaction.
+			samples = [one(path) for _ in range(count)]
+		else:
+			with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+				samples = list(executor.map(lambda _: one(path), range(count)))
+		elapsed = time.perf_counter() - start
+		latencies = sorted(sample['latency'] for sample in samples)
+		statuses = Counter(sample['status'] for sample in samples)
+		queries = [sample['queries'] for sample in samples if sample['queries'] is not None]
+		return {
+			'path': path,
+			'requests': count,
+			'errors': sum(n for status, n in statuses.items() if status >= 400),
+			'statuses': {str(status): n for status, n in sorted(statuses.items())},
+			'rps': round(count / elapsed, 1),
+			'latency_ms': {
+				**{f'p{p}': round(_percentile(latencies, p) * 1000, 2) for p in PERCENTILES},
+				'mean': round(statistics.fmean(latencies) * 1000, 2),
+			},
+			'queries': {
+				'mean': round(statistics.fmean(queries), 2), 'max': max(queries),
+			} if queries else None,
+			'bytes': round(statistics.fmean(sample['bytes'] for sample in samples)),
+		}
+
+	def request_in_process(self, path):
+		environ = RequestFactory(HTTP_HOST=self.host).get(path).environ
+		statuses, queries = [], []
+
+		def count_query(execute, sql, params, many, context):
+			queries.append(sql)
+			return execute(sql, params, many, context)
+
+		start = time.perf_counter()
+		with connection.execute_wrapper(count_query):
+			response = self.handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+			try:
+				size = sum(len(chunk) for chunk in response)
+			finally:
+				response.close()
+		return {
+			'latency': time.perf_counter() - start, 'status': int(statuses[0].split()[0]),
+			'queries': len(queries), 'bytes': size,
+		}
+
+	def request_http(self, path):
+		start = time.perf_counter()
+		try:
+			with urllib.request.urlopen(self.base_url + path, timeout=30) as response:
+				status, size = response.status, len(response.read())
+		except urllib.error.HTTPError as exc:
+			status, size = exc.code, len(exc.read())
+		except urllib.error.URLError as exc:
+			raise CommandError(f"{self.base_url}{path}: {exc.reason}")
+		return {'latency': time.perf_counter() - start, 'status': status, 'queries': None, 'bytes': size}
+
+	def format_result(self, name, result):
+		latency, queries = result['latency_ms'], result['queries']
+		return (
+			f"{name:<36} {result['rps']:8.1f} req/s  p50={latency['p50']:7.2f}ms "
+			f"p95={latency['p95']:7.2f}ms p99={latency['p99']:7.2f}ms  "
+			f"sql={queries['mean'] if queries else '-':>5}  {result['bytes']:>7}B"
+			+ (f"  errors={result['errors']}" if result['errors'] else '')
+		)
+
+	def compare(self, baseline, report, threshold):
+		"""Print per-route changes against ``baseline``; returns the names of regressed routes."""
+		self.stdout.write(f"Compared with {baseline.get('revision') or 'baseline'} ({baseline.get('started_at', '?')}):")
+		for key in ('mode', 'cache', 'concurrency'):
+			if baseline.get(key) != report[key]:
+				self.stdout.write(self.style.WARNING(f"  {key} differs: {baseline.get(key)} -> {report[key]}"))
+		regressions = []
+		for name, result in report['routes'].items():
+			before = baseline.get('routes', {}).get(name)
+			if not before:
+				self.stdout.write(f"{name:<36} new route")
+				continue
+			p95_change = (result['latency_ms']['p95'] / before['latency_ms']['p95'] - 1) * 100 \
+				if before['latency_ms']['p95'] else 0.0
+			queries_before = (before.get('queries') or {}).get('mean')
+			queries_after = (result.get('queries') or {}).get('mean')
+			notes = []
+			if p95_change > threshold:
+				notes.append(f"p95 +{p95_change:.0f}%")
+			if queries_before is not None and queries_after is not None and queries_after > queries_before:
+				notes.append(f"sql {queries_before} -> {queries_after}")
+			if result['errors'] > before.get('errors', 0):
+				notes.append(f"errors {before.get('errors', 0)} -> {result['errors']}")
+			if notes:
+				regressions.append(name)
+			self.stdout.write(
+				f"{name:<36} p95 {p95_change:+6.1f}%  rps {result['rps'] - before['rps']:+8.1f}  "
+				f"bytes {result['bytes'] - before['bytes']:+7}" + (f"  REGRESSION: {', '.join(notes)}" if notes else '')
+			)
+		return regressions
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.portfolio import search
+
+
+class Command(BaseCommand):
+	help = "Rebuild the full-text search index for projects, blog posts and news."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--batch-size', type=int, default=1000)
+
+	def handle(self, *args, **options):
+		if not search.is_available():
+			raise CommandError("Full-text search index requires the SQLite backend.")
+		counts = search.rebuild(batch_size=options['batch_size'])
+		for label, total in counts.items():
+			self.stdout.write(f"{label}: {total} rows indexed")
+		self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
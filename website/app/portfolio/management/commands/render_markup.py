@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.portfolio import markup
+from app.portfolio.models import BlogPost, NewsItem, Project
+
+
+class Command(BaseCommand):
+	help = (
+		"Render the Markdown of projects, posts and news items into their stored HTML, word count, "
+		"reading time and excerpt. Only rows rendered by an older markup.RENDERER_VERSION are "
+		"touched unless --all is given."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--all', action='store_true', help="Re-render every row, not only outdated ones.")
+		parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+			help="Rendering processes (default: CPU count; 1 renders in this process).")
+		parser.add_argument('--batch-size', type=int, default=500)
+
+	def handle(self, *args, **options):
+		if options['jobs'] < 1 or options['batch_size'] < 1:
+			raise CommandError("--jobs and --batch-size must be at least 1.")
+		started = time.perf_counter()
+		counts = markup.rerender(
+			[Project, BlogPost, NewsItem], jobs=options['jobs'], batch_size=options['batch_size'], force=options['all'],
+		)
+		for label, count in counts.items():
+			self.stdout.write(f"{label}: {count} row(s)")
+		self.stdout.write(self.style.SUCCESS(
+			f"Rendered {sum(counts.values())} row(s) with renderer version {markup.RENDERER_VERSION} "
+			f"in {time.perf_counter() - started:.1f}s"
+		))
@@ -0,0 +1,78 @@
+import multiprocessing
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from app.portfolio import tasks
+
+
+class Command(BaseCommand):
+	help = "Run background tasks from the database queue."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--processes', type=int, default=1, help="Worker processes to start.")
+		parser.add_argument('--batch', type=int, default=1, help="Tasks claimed per poll.")
+		parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+		parser.add_argument('--stale-after', type=int, default=15 * 60,
+			help="Seconds after which a running task is assumed abandoned and requeued.")
+		parser.add_argument('--burst', action='store_true', help="Exit once no task is due.")
+		parser.add_argument('--max-tasks', type=int, default=0, help="Exit after running this many tasks.")
+
+	def handle(self, *args, **options):
+		if options['processes'] <= 1:
+			self.work(tasks.default_worker_id(), options)
+			return
+		# Children must not inherit the parent's open database connections.
+		connections.close_all()
+		context = multiprocessing.get_context('fork')
+		children = [
+			context.Process(target=self.work_in_child, args=(options,), daemon=False)
+			for _ in range(options['processes'])
+		]
+		for child in children:
+			child.start()
+		try:
+			for child in children:
+				child.join()
+		except KeyboardInterrupt:
+			for child in children:
+				child.terminate()
+
+	def work_in_child(self, options):
+		self.work(tasks.default_worker_id(), options)
+
+	def work(self, worker_id, options):
+		self.stopping = False
+		signal.signal(signal.SIGTERM, self.request_stop)
+		stale_after = timedelta(seconds=options['stale_after'])
+		processed = 0
+		last_reap = 0.0
+		self.stdout.write(f"Worker {worker_id} started")
+		tasks.schedule_sqlite_maintenance()
+		while not self.stopping:
+			close_old_connections()
+			if time.monotonic() - last_reap > 60:
+				requeued = tasks.requeue_stale(stale_after)
+				if requeued:
+					self.stdout.write(f"Requeued {requeued} stale task(s)")
+				last_reap = time.monotonic()
+			claimed = tasks.claim(worker_id, limit=options['batch'])
+			if not claimed:
+				if options['burst']:
+					break
+				time.sleep(options['sleep'])
+				continue
+			for task_row in claimed:
+				ok = tasks.run(task_row)
+				processed += 1
+				self.stdout.write(f"{'done' if ok else 'failed'}: {task_row.name} #{task_row.pk}")
+			if options['max_tasks'] and processed >= options['max_tasks']:
+				break
+		self.stdout.write(f"Worker {worker_id} stopped after {processed} task(s)")
+
+	def request_stop(self, signum, frame):
+		# Finish the current task, then exit the loop.
+		self.stopping = True
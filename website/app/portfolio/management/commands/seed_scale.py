@@ -0,0 +1,324 @@
+import heapq
+import itertools
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from app.portfolio import caching, markup, search, syndication
+from app.portfolio.history import compacted_fields
+from app.portfolio.models import BlogPost, Category, Experience, NewsItem, Project, ProjectImage, Skill
+
+WORDS = (
+	'async', 'cache', 'django', 'python', 'query', 'index', 'latency', 'throughput', 'render', 'template',
+	'sqlite', 'postgres', 'deploy', 'docker', 'worker', 'queue', 'stream', 'signal', 'model', 'view',
+	'api', 'rest', 'graph', 'search', 'feed', 'sitemap', 'image', 'asset', 'static', 'bundle',
+	'profile', 'benchmark', 'metric', 'trace', 'log', 'alert', 'schema', 'migration', 'shard', 'replica',
+	'design', 'layout', 'grid', 'color', 'type', 'motion', 'access', 'mobile', 'offline', 'cloud',
+	'security', 'auth', 'token', 'session', 'cookie', 'header', 'proxy', 'edge', 'cdn', 'compress',
+	'data', 'pipeline', 'batch', 'report', 'export', 'import', 'sync', 'backup', 'restore', 'audit',
+)
+CATEGORY_WORDS = (
+	'Engineering', 'Design', 'Research', 'Open Source', 'Infrastructure', 'Data', 'Frontend', 'Backend',
+	'Performance', 'Security', 'Tooling', 'Mobile', 'Writing', 'Talks', 'Teaching', 'Operations',
+)
+COMPANIES = ('Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark', 'Wayne', 'Wonka', 'Tyrell', 'Cyberdyne')
+ROLES = ('Software Engineer', 'Senior Engineer', 'Staff Engineer', 'Tech Lead', 'Consultant', 'Architect')
+CITIES = ('Berlin', 'London', 'Lisbon', 'Toronto', 'Austin', 'Remote')
+
+# Placeholder media name for gallery rows; no file is written.
+PLACEHOLDER_IMAGE = 'projects/gallery/seed-placeholder.jpg'
+
+
+class Generator:
+	"""Deterministic (given ``seed``) titles, text and tag picks."""
+
+	def __init__(self, seed, tag_count, tag_skew):
+		self.rng = random.Random(seed)
+		self.paragraphs = [self.sentences(self.rng.randint(3, 8)) for _ in range(256)]
+		self.tag_names = self.vocabulary(tag_count)
+		# Zipf-like popularity: the tag at rank r is picked with weight 1 / r**skew.
+		self.tag_weights = [1 / rank ** tag_skew for rank in range(1, tag_count + 1)]
+
+	@staticmethod
+	def vocabulary(count):
+		names = []
+		for word, index in zip(itertools.cycle(WORDS), range(count)):
+			names.append(word if index < len(WORDS) else f'{word}-{index // len(WORDS) + 1}')
+		return names
+
+	def words(self, count):
+		return ' '.join(self.rng.choices(WORDS, k=count))
+
+	def sentences(self, count):
+		return ' '.join(f'{self.words(self.rng.randint(6, 16)).capitalize()}.' for _ in range(count))
+
+	def title(self):
+		return self.words(self.rng.randint(3, 7)).title()
+
+	def text(self, mean_size):
+		"""Paragraphs totalling roughly ``mean_size`` characters (50-150% of it)."""
+		target = self.rng.randint(mean_size // 2, mean_size * 3 // 2) if mean_size > 1 else mean_size
+		parts, size = [], 0
+		while size < target:
+			paragraph = self.rng.choice(self.paragraphs)
+			parts.append(paragraph)
+			size += len(paragraph) + 2
+		return '\n\n'.join(parts)[:max(target, 0)]
+
+	def tag_indexes(self, mean):
+		"""Distinct tag indexes drawn by popularity without replacement (Efraimidis-Spirakis).
+
+		Every tag gets the key ``u ** (1 / weight)`` and the largest keys win,
+		compared as logarithms so tiny weights don't underflow to zero.
+		"""
+		if not self.tag_names or mean <= 0:
+			return set()
+		count = min(self.rng.randint(0, 2 * mean), len(self.tag_names))
+		keys = ((math.log(1.0 - self.rng.random()) / weight, index) for index, weight in enumerate(self.tag_weights))
+		return {index for _, index in heapq.nlargest(count, keys)}
+
+	def chance(self, probability):
+		return self.rng.random() < probability
+
+
+class Command(BaseCommand):
+	help = (
+		"Bulk-generate synthetic projects, posts, news, categories, tags, skills, experience "
+		"and history for scale testing. Rows are added; existing content is left alone."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--projects', type=int, default=100)
+		parser.add_argument('--posts', type=int, default=1000)
+		parser.add_argument('--news', type=int, default=1000)
+		parser.add_argument('--skills', type=int, default=60)
+		parser.add_argument('--experience', type=int, default=15)
+		parser.add_argument('--categories', type=int, default=20, help="Categories shared by all content.")
+		parser.add_argument('--images-per-project', type=int, default=3,
+			help="Gallery rows per project (pointing at a placeholder name; no files are written).")
+		parser.add_argument('--project-size', type=int, default=1500, help="Mean characters of a project description.")
+		parser.add_argument('--post-size', type=int, default=5000, help="Mean characters of a blog post.")
+		parser.add_argument('--news-size', type=int, default=600, help="Mean characters of a news item.")
+		parser.add_argument('--tags', type=int, default=200, help="Distinct tags to draw from.")
+		parser.add_argument('--tags-per-item', type=int, default=4, help="Mean tags per project and post.")
+		parser.add_argument('--tag-skew', type=float, default=1.0,
+			help="Zipf exponent of tag popularity; 0 spreads tags evenly.")
+		parser.add_argument('--history', type=int, default=2,
+			help="Historical versions per project, post and news item (0 for none).")
+		parser.add_argument('--published', type=float, default=0.9, help="Fraction of content that is published.")
+		parser.add_argument('--days', type=int, default=3 * 365, help="Spread publication dates over this many days.")
+		parser.add_argument('--batch-size', type=int, default=2000)
+		parser.add_argument('--seed', type=int, help="Random seed, for repeatable data.")
+		parser.add_argument('--skip-derived', action='store_true',
+			help="Do not render Markdown or rebuild the search index and syndication files afterwards.")
+
+	def handle(self, *args, **options):
+		for name in ('projects', 'posts', 'news', 'skills', 'experience', 'images_per_project', 'history', 'tags'):
+			if options[name] < 0:
+				raise CommandError(f"--{name.replace('_', '-')} cannot be negative.")
+		if options['batch_size'] < 1 or options['days'] < 1:
+			raise CommandError("--batch-size and --days must be at least 1.")
+		self.options = options
+		self.gen = Generator(options['seed'], options['tags'], options['tag_skew'])
+		self.now = timezone.now()
+		self.author_id = get_user_model().objects.filter(is_superuser=True).order_by('pk').values_list('pk', flat=True).first()
+		started = time.perf_counter()
+
+		self.category_ids = self.seed_categories(options['categories'])
+		self.tag_ids = self.seed_tags()
+		self.report('Project', options['projects'], self.seed_content(Project, options['projects'], self.build_project))
+		self.report('BlogPost', options['posts'], self.seed_content(BlogPost, options['posts'], self.build_post))
+		self.report('NewsItem', options['news'], self.seed_content(NewsItem, options['news'], self.build_news))
+		self.report('Skill', options['skills'], self.seed_content(Skill, options['skills'], self.build_skill, versions=1))
+		self.report('Experience', options['experience'],
+			self.seed_content(Experience, options['experience'], self.build_experience, versions=1))
+
+		seeded = (Project, BlogPost, NewsItem, ProjectImage, Skill, Experience, Category)
+		for model in seeded:
+			caching.bump_model_version(model)
+		if not options['skip_derived']:
+			step = time.perf_counter()
+			counts = markup.rerender([Project, BlogPost, NewsItem])
+			if any(counts.values()):
+				self.stdout.write(f"markup: {sum(counts.values())} rows rendered in {time.perf_counter() - step:.1f}s")
+			step = time.perf_counter()
+			counts = search.rebuild(models=[Project, BlogPost, NewsItem])
+			if counts:
+				self.stdout.write(f"search index: {sum(counts.values())} rows in {time.perf_counter() - step:.1f}s")
+			step = time.perf_counter()
+			syndication.rebuild()
+			self.stdout.write(f"syndication files rebuilt in {time.perf_counter() - step:.1f}s")
+		self.stdout.write(self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s"))
+
+	def report(self, label, count, elapsed):
+		if count:
+			self.stdout.write(f"{label}: {count} rows in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f} rows/s)")
+
+	def seed_categories(self, count):
+		names = [
+			name if index < len(CATEGORY_WORDS) else f'{name} {index // len(CATEGORY_WORDS) + 1}'
+			for name, index in zip(itertools.cycle(CATEGORY_WORDS), range(count))
+		]
+		Category.objects.bulk_create(
+			[Category(name=name, slug=slugify(name)) for name in names], ignore_conflicts=True,
+		)
+		return list(Category.objects.filter(name__in=names).values_list('pk', flat=True))
+
+	def seed_tags(self):
+		names = self.gen.tag_names
+		Tag.objects.bulk_create([Tag(name=name, slug=slugify(name)) for name in names], ignore_conflicts=True)
+		ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+		return [ids[name] for name in names]
+
+	def published_at(self):
+		if not self.gen.chance(self.options['published']):
+			return None
+		return self.now - timedelta(seconds=self.gen.rng.randint(0, self.options['days'] * 86400))
+
+	def category_id(self):
+		return self.gen.rng.choice(self.category_ids) if self.category_ids else None
+
+	def slug(self, title, number):
+		return f'{slugify(title)[:200]}-{number}'
+
+	def build_project(self, number):
+		title = self.gen.title()
+		published_at = self.published_at()
+		return Project(
+			title=title, slug=self.slug(title, number), summary=self.gen.sentences(1)[:300],
+			description=self.gen.text(self.options['project_size']),
+			repository_url=f'https://example.com/code/{number}' if self.gen.chance(0.7) else '',
+			live_url=f'https://example.com/demo/{number}' if self.gen.chance(0.4) else '',
+			category_id=self.category_id(), order=self.gen.rng.randint(0, 100), featured=self.gen.chance(0.05),
+			author_id=self.author_id, status=Project.PUBLISHED if published_at else Project.DRAFT,
+			published_at=published_at, seo_title=title[:70],
+		)
+
+	def build_post(self, number):
+		title = self.gen.title()
+		published_at = self.published_at()
+		return BlogPost(
+			title=title, slug=self.slug(title, number), excerpt=self.gen.sentences(2)[:300],
+			content=self.gen.text(self.options['post_size']), category_id=self.category_id(),
+			author_id=self.author_id, status=BlogPost.PUBLISHED if published_at else BlogPost.DRAFT,
+			published_at=published_at, seo_title=title[:70],
+		)
+
+	def build_news(self, number):
+		title = self.gen.title()
+		published_at = self.published_at()
+		return NewsItem(
+			title=title, slug=self.slug(title, number), summary=self.gen.sentences(1)[:300],
+			content=self.gen.text(self.options['news_size']), category_id=self.category_id(),
+			link=f'https://example.com/news/{number}' if self.gen.chance(0.3) else '',
+			important=self.gen.chance(0.05), author_id=self.author_id,
+			status=NewsItem.PUBLISHED if published_at else NewsItem.DRAFT, published_at=published_at,
+		)
+
+	def build_skill(self, number):
+		return Skill(
+			name=f'{self.gen.rng.choice(WORDS).title()} {number}', proficiency=self.gen.rng.randint(30, 100),
+			category=self.gen.rng.choice(CATEGORY_WORDS), order=number,
+		)
+
+	def build_experience(self, number):
+		start = date.today() - timedelta(days=self.gen.rng.randint(180, 20 * 365))
+		is_current = self.gen.chance(0.1)
+		return Experience(
+			role=self.gen.rng.choice(ROLES), company=f'{self.gen.rng.choice(COMPANIES)} {number}',
+			location=self.gen.rng.choice(CITIES), start_date=start, is_current=is_current,
+			end_date=None if is_current else min(start + timedelta(days=self.gen.rng.randint(90, 4 * 365)), date.today()),
+			description=self.gen.text(self.options['project_size']), order=number,
+		)
+
+	def seed_content(self, model, count, build, versions=None):
+		"""Insert ``count`` rows of ``model`` in batches, with their tags, images and history."""
+		if not count:
+			return 0.0
+		started = time.perf_counter()
+		versions = self.options['history'] if versions is None else min(versions, self.options['history'])
+		batch_size = self.options['batch_size']
+		first = (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+		tagged = hasattr(model, 'tags')
+		content_type = ContentType.objects.get_for_model(model) if tagged else None
+		for start in range(0, count, batch_size):
+			objs = [build(first + number) for number in range(start, min(start + batch_size, count))]
+			with transaction.atomic():
+				model.objects.bulk_create(objs, batch_size=batch_size)
+				if tagged:
+					self.add_tags(objs, content_type)
+				if model is Project:
+					self.add_images(objs)
+				self.add_history(model, objs, versions)
+		return time.perf_counter() - started
+
+	def add_tags(self, objs, content_type):
+		"""Through rows for a batch, written with one ``executemany``."""
+		if not self.tag_ids:
+			return
+		rows = [
+			(self.tag_ids[index], content_type.pk, obj.pk)
+			for obj in objs
+			for index in self.gen.tag_indexes(self.options['tags_per_item'])
+		]
+		meta, qn = TaggedItem._meta, connection.ops.quote_name
+		columns = ', '.join(qn(meta.get_field(name).column) for name in ('tag', 'content_type', 'object_id'))
+		with connection.cursor() as cursor:
+			cursor.executemany(f'INSERT INTO {qn(meta.db_table)} ({columns}) VALUES (%s, %s, %s)', rows)
+
+	def add_images(self, objs):
+		rows = [
+			ProjectImage(project_id=obj.pk, image=PLACEHOLDER_IMAGE, caption=self.gen.words(4).capitalize(), order=order)
+			for obj in objs
+			for order in range(self.options['images_per_project'])
+		]
+		ProjectImage.objects.bulk_create(rows, batch_size=self.options['batch_size'])
+
+	def add_history(self, model, objs, versions):
+		"""Copy the batch into the history table ``versions`` times with ``INSERT ... SELECT``.
+
+		Older versions get a prefix of each text column, so history looks like a
+		draft that grew, and are dated a day apart ending at the row's save.
+		"""
+		if not versions:
+			return
+		history_model = model.history.model
+		qn = connection.ops.quote_name
+		tracked = [field.column for field in history_model.tracked_fields]
+		text_columns = {
+			field.column for field in history_model.tracked_fields if field.attname in compacted_fields(history_model)
+		}
+		meta = history_model._meta
+		extra = [meta.get_field(name).column for name in (
+			'history_date', 'history_type', 'history_change_reason', 'history_user',
+		)]
+		pks = [obj.pk for obj in objs]
+		with connection.cursor() as cursor:
+			for version in range(versions):
+				older = version < versions - 1
+				selected = [
+					f'SUBSTR({qn(column)}, 1, LENGTH({qn(column)}) * {version + 1} / {versions})'
+					if older and column in text_columns else qn(column)
+					for column in tracked
+				]
+				history_date = self.now - timedelta(days=versions - 1 - version)
+				cursor.execute(
+					f'INSERT INTO {qn(meta.db_table)} ({", ".join(qn(column) for column in tracked + extra)}) '
+					f'SELECT {", ".join(selected)}, %s, %s, %s, NULL FROM {qn(model._meta.db_table)} '
+					# The batch's rows were just inserted in this transaction, so its pk range holds nothing else.
+					f'WHERE {qn(model._meta.pk.column)} BETWEEN %s AND %s',
+					[
+						connection.ops.adapt_datetimefield_value(history_date), '~' if version else '+',
+						'seed_scale', min(pks), max(pks),
+					],
+				)
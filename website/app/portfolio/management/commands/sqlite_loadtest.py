@@ -0,0 +1,154 @@
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from app.portfolio import sqlite
+from app.portfolio.models import BlogPost
+
+ALIAS = 'sqlite_loadtest'
+
+# DATABASES entries for a file: Django's defaults (rollback journal,
+# synchronous=FULL, deferred transactions) and the production profile.
+PROFILES = {
+	'default': lambda name: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name},
+	'production': sqlite.production_database,
+}
+
+
+def _is_lock_error(exc):
+	return 'locked' in str(exc) or 'busy' in str(exc)
+
+
+class Command(BaseCommand):
+	help = (
+		"Measure SQLite read throughput on the portfolio schema while writers save blog posts with "
+		"history rows, with Django's default settings and with the production profile."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--profile', choices=('default', 'production', 'both'), default='both')
+		parser.add_argument('--duration', type=float, default=5.0, help="Seconds per profile.")
+		parser.add_argument('--readers', type=int, default=4, help="Reader threads.")
+		parser.add_argument('--writers', type=int, default=2, help="Writer threads.")
+		parser.add_argument('--rows', type=int, default=2000, help="Posts seeded before the run.")
+		parser.add_argument('--content-size', type=int, default=4000, help="Bytes of text per post.")
+
+	def handle(self, *args, **options):
+		names = ('default', 'production') if options['profile'] == 'both' else (options['profile'],)
+		self.results = {}
+		for name in names:
+			with tempfile.TemporaryDirectory() as directory:
+				self.add_database(PROFILES[name](str(Path(directory) / 'loadtest.sqlite3')))
+				try:
+					result = self.run_profile(options)
+				finally:
+					self.remove_database()
+			self.results[name] = result
+			latencies = sorted(result['read_latencies']) or [0.0]
+			self.stdout.write(
+				f"{name:<11} reads={result['reads'] / options['duration']:9.1f}/s "
+				f"p50={statistics.median(latencies) * 1000:7.2f}ms "
+				f"p99={latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000:8.2f}ms "
+				f"writes={result['writes'] / options['duration']:7.1f}/s "
+				f"read_errors={result['read_errors']} write_errors={result['write_errors']}"
+			)
+
+	def add_database(self, entry):
+		"""Register ``entry`` as the :data:`ALIAS` connection and migrate it."""
+		connections.settings[ALIAS] = connections.configure_settings({**connections.settings, ALIAS: entry})[ALIAS]
+		call_command('migrate', database=ALIAS, verbosity=0, interactive=False)
+
+	def remove_database(self):
+		connections[ALIAS].close()
+		del connections[ALIAS]
+		del connections.settings[ALIAS]
+
+	def seed(self, options):
+		content = 'x' * options['content_size']
+		BlogPost.objects.using(ALIAS).bulk_create(
+			(
+				BlogPost(
+					title=f'Post {pk}', slug=f'post-{pk}', content=content,
+					status=BlogPost.PUBLISHED if pk % 5 else BlogPost.DRAFT,
+				)
+				for pk in range(1, options['rows'] + 1)
+			),
+			batch_size=500,
+		)
+
+	def run_profile(self, options):
+		self.seed(options)
+		stop = threading.Event()
+		lock = threading.Lock()
+		result = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0, 'read_latencies': []}
+		rows = options['rows']
+		content = 'y' * options['content_size']
+		posts = BlogPost.objects.using(ALIAS)
+		history = BlogPost.history.model.objects.using(ALIAS)
+		tracked = [field.attname for field in BlogPost.history.model.tracked_fields]
+
+		def reader():
+			reads, errors, latencies = 0, 0, []
+			rng = random.Random()
+			while not stop.is_set():
+				start = time.perf_counter()
+				try:
+					# The list and detail queries of the blog pages.
+					list(posts.filter(status=BlogPost.PUBLISHED).defer('content').order_by('-updated_at')[:20])
+					posts.filter(pk=rng.randint(1, rows)).first()
+				except OperationalError as exc:
+					if not _is_lock_error(exc):
+						raise
+					errors += 1
+					continue
+				latencies.append(time.perf_counter() - start)
+				reads += 1
+			connections[ALIAS].close()
+			with lock:
+				result['reads'] += reads
+				result['read_errors'] += errors
+				result['read_latencies'] += latencies
+
+		def writer():
+			writes, errors = 0, 0
+			rng = random.Random()
+			while not stop.is_set():
+				try:
+					# What a save() does here: read, update, history row, one transaction.
+					# The search index and task queue live on the default database,
+					# so save() itself and its signals are not used.
+					with transaction.atomic(using=ALIAS):
+						post = posts.get(pk=rng.randint(1, rows))
+						post.content, post.updated_at = content, timezone.now()
+						posts.filter(pk=post.pk).update(content=post.content, updated_at=post.updated_at)
+						history.create(
+							history_date=post.updated_at, history_type='~',
+							**{name: getattr(post, name) for name in tracked},
+						)
+					writes += 1
+				except OperationalError as exc:
+					if not _is_lock_error(exc):
+						raise
+					errors += 1
+			connections[ALIAS].close()
+			with lock:
+				result['writes'] += writes
+				result['write_errors'] += errors
+
+		threads = [threading.Thread(target=reader) for _ in range(options['readers'])]
+		threads += [threading.Thread(target=writer) for _ in range(options['writers'])]
+		for thread in threads:
+			thread.start()
+		time.sleep(options['duration'])
+		stop.set()
+		for thread in threads:
+			thread.join()
+		return result
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.portfolio import sqlite
+
+
+class Command(BaseCommand):
+	help = "Checkpoint and truncate the SQLite WAL and run PRAGMA optimize."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--database', default='default', help="Database alias.")
+
+	def handle(self, *args, **options):
+		result = sqlite.maintenance(options['database'])
+		if result is None:
+			raise CommandError(f"Database {options['database']!r} is not SQLite.")
+		self.stdout.write(
+			f"wal_frames={result['wal_frames']} checkpointed={result['checkpointed']} busy={result['busy']}"
+		)
@@ -0,0 +1,44 @@
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _size(value):
+	return '-' if value is None else f'{value:,}'
+
+
+class Command(BaseCommand):
+	help = "Show the bytes saved per static asset by the last collectstatic (minified, gzip, brotli)."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--all', action='store_true', help="Include assets that were neither minified nor compressed.")
+		parser.add_argument('--limit', type=int, default=0, help="Only show the N assets with the largest savings.")
+
+	def handle(self, *args, **options):
+		load_report = getattr(staticfiles_storage, 'load_report', None)
+		report = load_report() if load_report else {}
+		if not report:
+			raise CommandError("No static report found; run collectstatic first.")
+		rows = []
+		for name, entry in report.items():
+			smallest = min(value for key, value in entry.items() if key in ('source', 'minified', 'gzip', 'br'))
+			if smallest == entry['source'] and not options['all']:
+				continue
+			rows.append((entry['source'] - smallest, name, entry))
+		rows.sort(key=lambda row: (-row[0], row[1]))
+		if options['limit']:
+			rows = rows[:options['limit']]
+		self.stdout.write(f"{'asset':<48} {'source':>10} {'minified':>10} {'gzip':>10} {'brotli':>10} {'saved':>7}")
+		totals = {'source': 0, 'best': 0}
+		for saved, name, entry in rows:
+			totals['source'] += entry['source']
+			totals['best'] += entry['source'] - saved
+			share = saved / entry['source'] if entry['source'] else 0
+			self.stdout.write(
+				f"{name:<48} {_size(entry['source']):>10} {_size(entry.get('minified')):>10} "
+				f"{_size(entry.get('gzip')):>10} {_size(entry.get('br')):>10} {share:>7.1%}"
+			)
+		saved = totals['source'] - totals['best']
+		share = saved / totals['source'] if totals['source'] else 0
+		self.stdout.write(self.style.SUCCESS(
+			f"{len(rows)} assets: {totals['source']:,} bytes -> {totals['best']:,} bytes over the wire ({share:.1%} saved)"
+		))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from app.portfolio import metrics
+from app.portfolio.api import throttling
+from app.portfolio.api.urls import router
+
+
+class Command(BaseCommand):
+	help = "Show how often the API throttle allowed and rejected requests, per endpoint and budget."
+
+	def add_arguments(self, parser):
+		parser.add_argument('--reset', action='store_true', help="Reset the counters after printing.")
+
+	def handle(self, *args, **options):
+		if not metrics.is_shared():
+			self.stderr.write(self.style.WARNING(
+				"The default cache is per process, so these are this command's own counters. "
+				f"See {reverse('portfolio_metrics')} for the server's."
+			))
+		basenames = [basename for _, _, basename in router.registry]
+		for row in throttling.throttle_stats(basenames):
+			rate = f"{row['throttled_rate']:.1%}" if row['throttled_rate'] is not None else "-"
+			self.stdout.write(
+				f"{row['label']:<25} allowed={row['allowed']:<8} throttled={row['throttled']:<8} throttled rate={rate}"
+			)
+		if options['reset']:
+			metrics.reset(throttling.metric_names(basenames))
+			self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,140 @@
+"""Markdown rendering of long-form content, done once on save.
+
+``Project.description``, ``BlogPost.content`` and ``NewsItem.content`` are
+Markdown. :func:`render` turns one into sanitized HTML, with fenced code
+blocks highlighted by Pygments (``codehilite``, CSS classes only). It also
+returns the word count, the reading time and a plain-text excerpt. Models
+store all four (see ``models.RenderedMarkupModel``), so templates never
+touch the raw body and list pages can defer it.
+
+Raw HTML in the source is passed through Markdown and then cleaned by
+``nh3`` against :data:`ALLOWED_TAGS`/:data:`ALLOWED_ATTRIBUTES`.
+
+Bump :data:`RENDERER_VERSION` whenever the output of :func:`render` changes
+(extensions, allowlists, excerpt length). ``manage.py render_markup`` then
+re-renders every row stored with an older version.
+"""
+import html
+import math
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import markdown
+import nh3
+from django.db import connections
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+from . import caching
+
+RENDERER_VERSION = 1
+
+WORDS_PER_MINUTE = 200
+EXCERPT_WORDS = 40
+# Matches the ``plain_excerpt`` column.
+EXCERPT_MAX_LENGTH = 300
+
+EXTENSIONS = ['fenced_code', 'codehilite', 'tables', 'sane_lists', 'smarty']
+EXTENSION_CONFIGS = {
+	'codehilite': {'css_class': 'highlight', 'guess_lang': False},
+}
+
+ALLOWED_TAGS = {
+	'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'dd', 'del', 'div', 'dl', 'dt', 'em', 'figcaption',
+	'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'ins', 'kbd', 'li', 'mark', 'ol',
+	'p', 'pre', 'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td',
+	'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+	'*': {'class'},
+	'a': {'href', 'title'},
+	'abbr': {'title'},
+	'img': {'src', 'alt', 'title', 'width', 'height', 'loading'},
+	'ol': {'start'},
+	'td': {'align'},
+	'th': {'align'},
+}
+
+_local = threading.local()
+
+
+def _converter():
+	# Building a Markdown instance loads its extensions; reuse one per thread.
+	converter = getattr(_local, 'converter', None)
+	if converter is None:
+		converter = _local.converter = markdown.Markdown(
+			extensions=EXTENSIONS, extension_configs=EXTENSION_CONFIGS,
+		)
+	return converter.reset()
+
+
+def to_html(source):
+	"""Sanitized HTML of the Markdown ``source``."""
+	raw = _converter().convert(source or '')
+	return nh3.clean(
+		raw, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+		url_schemes={'http', 'https', 'mailto'}, link_rel='noopener noreferrer',
+	)
+
+
+def to_text(rendered):
+	"""Plain text of rendered HTML, whitespace collapsed."""
+	return re.sub(r'\s+', ' ', html.unescape(strip_tags(rendered))).strip()
+
+
+def render(source):
+	"""``{'html', 'word_count', 'reading_time', 'excerpt'}`` for the Markdown ``source``.
+
+	Reading time is in whole minutes, at least 1 for any non-empty text.
+	"""
+	rendered = to_html(source)
+	text = to_text(rendered)
+	word_count = len(text.split())
+	return {
+		'html': rendered,
+		'word_count': word_count,
+		'reading_time': math.ceil(word_count / WORDS_PER_MINUTE),
+		'excerpt': Truncator(text).words(EXCERPT_WORDS)[:EXCERPT_MAX_LENGTH],
+	}
+
+
+def rerender(models, jobs=1, batch_size=500, force=False):
+	"""Re-render rows of ``models`` stored with an older renderer; returns ``{label: rows}``.
+
+	``force`` re-renders every row. With ``jobs > 1`` the Markdown is
+	rendered in a process pool; this process reads and writes the rows.
+	Re-rendered rows get a new ``updated_at``: detail ETags and the static
+	export's snapshot are keyed on it.
+	"""
+	pool = None
+	if jobs > 1:
+		# Workers only render; forked copies of our connections must not be used.
+		connections.close_all()
+		pool = ProcessPoolExecutor(max_workers=jobs)
+	counts = {}
+	try:
+		for model in models:
+			manager = model._base_manager
+			queryset = manager.all() if force else manager.exclude(render_version=RENDERER_VERSION)
+			pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+			for start in range(0, len(pks), batch_size):
+				rows = list(manager.filter(pk__in=pks[start:start + batch_size]).only('pk', model.markup_field))
+				sources = [getattr(obj, model.markup_field) for obj in rows]
+				if pool is None:
+					results = map(render, sources)
+				else:
+					results = pool.map(render, sources, chunksize=max(1, len(sources) // (jobs * 4)))
+				now = timezone.now()
+				for obj, result in zip(rows, results):
+					obj.apply_rendered(result)
+					obj.updated_at = now
+				manager.bulk_update(rows, [*model.RENDERED_FIELDS, 'updated_at'])
+			if pks:
+				caching.bump_model_version(model)
+			counts[model._meta.label] = len(pks)
+	finally:
+		if pool is not None:
+			pool.shutdown()
+	return counts
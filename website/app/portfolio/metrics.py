@@ -0,0 +1,41 @@
+"""Lightweight counters kept in the default cache.
+
+Counters are shared by every process using the same cache backend, which is
+what makes them useful in production. With the local-memory backend they are
+per process: a management command only sees its own (empty) counters, so the
+server's are shown in the admin under ``admin/metrics/`` instead.
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+KEY_PREFIX = 'portfolio:metrics:'
+
+
+def incr(name, delta=1):
+	key = KEY_PREFIX + name
+	try:
+		return cache.incr(key, delta)
+	except ValueError:
+		if cache.add(key, delta, None):
+			return delta
+		return cache.incr(key, delta)
+
+
+def get_counts(names):
+	values = cache.get_many([KEY_PREFIX + name for name in names])
+	return {name: values.get(KEY_PREFIX + name, 0) for name in names}
+
+
+def reset(names):
+	cache.delete_many([KEY_PREFIX + name for name in names])
+
+
+def is_shared():
+	"""Whether other processes (management commands included) see the same counters."""
+	return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def ratio(part, other):
+	total = part + other
+	return part / total if total else None
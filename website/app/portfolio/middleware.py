@@ -0,0 +1,278 @@
+"""Request middleware for the portfolio site.
+
+Besides the site's own middleware, this module wraps the Django middleware
+in ``MIDDLEWARE`` so that under ASGI their hooks run on the event loop;
+``PORTFOLIO_ASGI_MIDDLEWARE`` swaps them in for the ASGI handler only.
+``MiddlewareMixin`` otherwise moves every ``process_request``,
+``process_view`` and ``process_response`` call to the sync thread, several
+hops per request even for a page served from the cache. The wrapped hooks
+only read headers and cookies; the few that may write the session keep
+their thread hop for exactly the requests that need it.
+"""
+import logging
+import mimetypes
+import os
+import time
+from urllib.parse import unquote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse
+from django.middleware import clickjacking, common, csrf, security
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from . import timing
+from .assets import ENCODINGS
+from .throttling import client_ip
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+DEFAULT_STATIC_MAX_AGE = 60 * 60
+DEFAULT_SLOW_REQUEST_MS = 500
+
+logger = logging.getLogger(__name__)
+
+
+def _accepted_encodings(request):
+	accepted = set()
+	for part in request.headers.get('Accept-Encoding', '').split(','):
+		coding, _, params = part.partition(';')
+		name, _, value = params.strip().partition('=')
+		try:
+			if name.strip() == 'q' and float(value) == 0:
+				continue
+		except ValueError:
+			continue
+		accepted.add(coding.strip().lower())
+	return accepted
+
+
+class PrecompressedStaticMiddleware:
+	"""Serve files from ``STATIC_ROOT``, preferring their ``.br``/``.gz`` siblings.
+
+	Content-hashed names (those listed in the staticfiles manifest) are sent
+	with a one-year ``immutable`` lifetime; anything else gets
+	``PORTFOLIO_STATIC_MAX_AGE``. Requests for files that were never
+	collected fall through to the URLconf. When a web server or CDN serves
+	``STATIC_URL`` in front of Django, this never sees a request.
+
+	Works natively in both sync and async chains, so it adds no thread hop
+	under ASGI.
+	"""
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		self.get_response = get_response
+		self.async_mode = iscoroutinefunction(get_response)
+		if self.async_mode:
+			markcoroutinefunction(self)
+		self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else None
+		self._hashed = (None, frozenset())
+
+	def __call__(self, request):
+		if self.async_mode:
+			return self.__acall__(request)
+		response = self.process_request(request)
+		return self.get_response(request) if response is None else response
+
+	async def __acall__(self, request):
+		response = self.process_request(request)
+		return await self.get_response(request) if response is None else response
+
+	def process_request(self, request):
+		if self.prefix and request.method in ('GET', 'HEAD') and request.path.startswith(self.prefix):
+			return self.serve(request, unquote(request.path[len(self.prefix):]))
+		return None
+
+	def serve(self, request, name):
+		if not name or settings.STATIC_ROOT is None:
+			return None
+		try:
+			path = safe_join(settings.STATIC_ROOT, name)
+		except SuspiciousFileOperation:
+			return None
+		if not os.path.isfile(path):
+			return None
+		encoding = None
+		accepted = _accepted_encodings(request)
+		for extension, coding in ENCODINGS:
+			if coding in accepted and os.path.isfile(path + extension):
+				path, encoding = path + extension, coding
+				break
+		stat = os.stat(path)
+		etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+		response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+		if response is None:
+			content_type, _ = mimetypes.guess_type(name)
+			response = FileResponse(open(path, 'rb'), content_type=content_type or 'application/octet-stream')
+			response.headers['Last-Modified'] = http_date(stat.st_mtime)
+			if encoding:
+				response.headers['Content-Encoding'] = encoding
+		response.headers['ETag'] = etag
+		response.headers['Cache-Control'] = self.cache_control(name)
+		patch_vary_headers(response, ('Accept-Encoding',))
+		return response
+
+	def cache_control(self, name):
+		hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+		if self._hashed[0] is not hashed_files:
+			self._hashed = (hashed_files, frozenset(hashed_files.values()) - hashed_files.keys())
+		if name in self._hashed[1]:
+			return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+		max_age = getattr(settings, 'PORTFOLIO_STATIC_MAX_AGE', DEFAULT_STATIC_MAX_AGE)
+		return f'public, max-age={max_age}'
+
+
+class ServerTimingMiddleware:
+	"""Record query count, SQL, template and view time for every request.
+
+	Staff and clients in ``PORTFOLIO_SERVER_TIMING_IPS`` (``INTERNAL_IPS`` by
+	default) get the numbers in a ``Server-Timing`` header. Requests slower
+	than ``PORTFOLIO_SLOW_REQUEST_MS`` are logged with their most repeated SQL
+	statements. Place it last in ``MIDDLEWARE`` so its view time covers just
+	the view; with ``PORTFOLIO_SERVER_TIMING`` off it removes itself.
+	"""
+	sync_capable = True
+	async_capable = True
+
+	def __init__(self, get_response):
+		if not getattr(settings, 'PORTFOLIO_SERVER_TIMING', False):
+			raise MiddlewareNotUsed
+		timing.install()
+		self.get_response = get_response
+		self.async_mode = iscoroutinefunction(get_response)
+		if self.async_mode:
+			markcoroutinefunction(self)
+		self.allowed_ips = frozenset(getattr(settings, 'PORTFOLIO_SERVER_TIMING_IPS', settings.INTERNAL_IPS))
+		self.slow_seconds = getattr(settings, 'PORTFOLIO_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS) / 1000
+
+	def __call__(self, request):
+		if self.async_mode:
+			return self.__acall__(request)
+		recorder = timing.Recorder()
+		token = recorder.start()
+		start = time.perf_counter()
+		try:
+			response = self.get_response(request)
+		finally:
+			recorder.view_time = time.perf_counter() - start
+			recorder.stop(token)
+		visible = self.ip_allowed(request)
+		if not visible:
+			user = getattr(request, 'user', None)
+			visible = user is not None and user.is_staff
+		self.finish(request, response, recorder, visible)
+		return response
+
+	async def __acall__(self, request):
+		recorder = timing.Recorder()
+		token = recorder.start()
+		start = time.perf_counter()
+		try:
+			response = await self.get_response(request)
+		finally:
+			recorder.view_time = time.perf_counter() - start
+			recorder.stop(token)
+		visible = self.ip_allowed(request)
+		if not visible and hasattr(request, 'auser'):
+			visible = (await request.auser()).is_staff
+		self.finish(request, response, recorder, visible)
+		return response
+
+	def ip_allowed(self, request):
+		return client_ip(request) in self.allowed_ips
+
+	def finish(self, request, response, recorder, visible):
+		if visible:
+			response.headers['Server-Timing'] = recorder.header()
+		if recorder.view_time >= self.slow_seconds:
+			repeated = ''.join(f'\n  {count}x {sql}' for count, sql in recorder.repeated_queries())
+			logger.warning(
+				"Slow request %s %s: %.0fms (sql %.0fms in %s queries, template %.0fms)%s",
+				request.method, request.get_full_path(), recorder.view_time * 1000, recorder.sql_time * 1000,
+				recorder.query_count, recorder.template_time * 1000,
+				f"; repeated statements:{repeated}" if repeated else '',
+			)
+
+
+class InlineMiddlewareMixin:
+	"""Run a ``MiddlewareMixin`` subclass's hooks inline in async mode.
+
+	Only for hooks that do no blocking I/O. ``response_needs_thread`` lets a
+	subclass send ``process_response`` to the sync thread when it would, and
+	``can_inline`` turns the behaviour off altogether.
+	"""
+
+	def __init__(self, get_response):
+		super().__init__(get_response)
+		self.inline = self.async_mode and self.can_inline()
+		if self.inline and hasattr(self, 'process_view'):
+			sync_process_view = self.process_view
+
+			async def process_view(request, view_func, view_args, view_kwargs):
+				return sync_process_view(request, view_func, view_args, view_kwargs)
+
+			self.process_view = process_view
+
+	def can_inline(self):
+		return True
+
+	def response_needs_thread(self, request, response):
+		return False
+
+	async def __acall__(self, request):
+		if not self.inline:
+			return await super().__acall__(request)
+		response = None
+		if hasattr(self, 'process_request'):
+			response = self.process_request(request)
+		if response is None:
+			response = await self.get_response(request)
+		if hasattr(self, 'process_response'):
+			if self.response_needs_thread(request, response):
+				response = await sync_to_async(self.process_response)(request, response)
+			else:
+				response = self.process_response(request, response)
+		return response
+
+
+class SecurityMiddleware(InlineMiddlewareMixin, security.SecurityMiddleware):
+	pass
+
+
+class CommonMiddleware(InlineMiddlewareMixin, common.CommonMiddleware):
+	pass
+
+
+class CsrfViewMiddleware(InlineMiddlewareMixin, csrf.CsrfViewMiddleware):
+	"""Inline unless ``CSRF_USE_SESSIONS`` makes the token a session read."""
+
+	def can_inline(self):
+		return not settings.CSRF_USE_SESSIONS
+
+
+class AuthenticationMiddleware(InlineMiddlewareMixin, auth_middleware.AuthenticationMiddleware):
+	# Only installs the lazy ``request.user``; the session is read on first use.
+	pass
+
+
+class SessionMiddleware(InlineMiddlewareMixin, sessions_middleware.SessionMiddleware):
+	def response_needs_thread(self, request, response):
+		return request.session.modified or settings.SESSION_SAVE_EVERY_REQUEST
+
+
+class MessageMiddleware(InlineMiddlewareMixin, messages_middleware.MessageMiddleware):
+	def response_needs_thread(self, request, response):
+		storage = getattr(request, '_messages', None)
+		return storage is not None and (storage.used or storage.added_new)
+
+
+class XFrameOptionsMiddleware(InlineMiddlewareMixin, clickjacking.XFrameOptionsMiddleware):
+	pass
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+SEARCH_TABLES = {
+    'portfolio_project_fts': ('title', 'summary', 'description'),
+    'portfolio_blogpost_fts': ('title', 'excerpt', 'content'),
+    'portfolio_newsitem_fts': ('title', 'summary', 'content'),
+}
+
+
+def create_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns in SEARCH_TABLES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} "
+            f"USING fts5({', '.join(columns)}, tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Index rows that existed before the table was created.
+        source = table[:-len('_fts')]
+        values = ', '.join("COALESCE(%s, '')" % column for column in columns)
+        schema_editor.execute(
+            f"INSERT INTO {table} (rowid, {', '.join(columns)}) SELECT id, {values} FROM {source}"
+        )
+
+
+def drop_search_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in SEARCH_TABLES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0003_historicalnewsitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_tables, drop_search_tables),
+    ]
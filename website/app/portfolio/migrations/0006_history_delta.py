@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalblogpost',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalcontactmessage',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicaleducation',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalexperience',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalmediaasset',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalnewsitem',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalproject',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalsitesetting',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalskill',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalsociallink',
+            name='history_delta',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_history_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the digest email including this message was sent', null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalcontactmessage',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the digest email including this message was sent', null=True),
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-17 08:47
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Deliberately the live renderer rather than a frozen copy: the rendered
+# columns are a cache of the Markdown source, stamped with the
+# RENDERER_VERSION that produced them, so whatever version is current when
+# this runs is correct. markup.render() must stay a pure function of the
+# source; if it ever can't run here, make this a no-op and run
+# `manage.py render_markup` after migrating.
+from app.portfolio import markup
+
+MARKUP_FIELDS = {
+    'Project': 'description',
+    'BlogPost': 'content',
+    'NewsItem': 'content',
+}
+
+
+def render_existing(apps, schema_editor):
+    # A new updated_at moves detail ETags and the static export snapshot.
+    now = timezone.now()
+    db_alias = schema_editor.connection.alias
+    for model_name, source in MARKUP_FIELDS.items():
+        model = apps.get_model('portfolio', model_name)
+        changed = []
+        for obj in model.objects.using(db_alias).only('pk', source).iterator(chunk_size=500):
+            result = markup.render(getattr(obj, source))
+            obj.rendered_html = result['html']
+            obj.word_count = result['word_count']
+            obj.reading_time = result['reading_time']
+            obj.plain_excerpt = result['excerpt']
+            obj.render_version = markup.RENDERER_VERSION
+            obj.updated_at = now
+            changed.append(obj)
+        model.objects.using(db_alias).bulk_update(
+            changed, ['rendered_html', 'word_count', 'reading_time', 'plain_excerpt', 'render_version', 'updated_at'],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_contactmessage_notified_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='plain_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='newsitem',
+            name='plain_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='newsitem',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='newsitem',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='newsitem',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='newsitem',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='plain_excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Minutes'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='rendered_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,9 @@ from django.contrib.auth import get_user_model
 from simple_history.models import HistoricalRecords
 from taggit.managers import TaggableManager
 
+from . import markup
+from .history import CompactableHistory, CompactingHistoricalQuerySet
+
 User = get_user_model()
 
 
@@ -17,6 +20,23 @@ class TimeStampedModel(models.Model):
 		abstract = True
 
 
+class PublishableQuerySet(models.QuerySet):
+	def publish(self, user=None, **kwargs):
+		"""Publish every row with set-based updates; returns the number changed."""
+		from .publishing import bulk_set_status
+		return bulk_set_status(self, PublishableModel.PUBLISHED, user=user, **kwargs)
+
+	def unpublish(self, user=None, **kwargs):
+		"""Move every row back to draft; returns the number changed."""
+		from .publishing import bulk_set_status
+		return bulk_set_status(self, PublishableModel.DRAFT, user=user, **kwargs)
+
+	def bulk_set(self, user=None, **values):
+		"""Set field ``values`` on every row the way ``publish()`` does; returns the number changed."""
+		from .publishing import bulk_set
+		return bulk_set(self, values, user=user)
+
+
 class PublishableModel(TimeStampedModel):
 	"""Adds draft/published status and publication date for preview workflow."""
 	DRAFT = 'draft'
@@ -28,6 +48,8 @@ class PublishableModel(TimeStampedModel):
 	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=DRAFT, db_index=True)
 	published_at = models.DateTimeField(null=True, blank=True, help_text="Auto-set when status changes to Published if empty")
 
+	objects = PublishableQuerySet.as_manager()
+
 	class Meta:
 		abstract = True
 
@@ -38,6 +60,44 @@ class PublishableModel(TimeStampedModel):
 		self.save()
 
 
+class RenderedMarkupModel(models.Model):
+	"""Stores the rendered Markdown of ``markup_field`` next to it (see ``markup.py``).
+
+	Rendering happens in ``save()``; set-based writes call ``render_markup()``
+	themselves. The rendered columns are left out of history.
+	"""
+	markup_field = None
+
+	rendered_html = models.TextField(blank=True, editable=False)
+	word_count = models.PositiveIntegerField(default=0, editable=False)
+	reading_time = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Minutes")
+	plain_excerpt = models.CharField(max_length=markup.EXCERPT_MAX_LENGTH, blank=True, editable=False)
+	render_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+	RENDERED_FIELDS = ['rendered_html', 'word_count', 'reading_time', 'plain_excerpt', 'render_version']
+
+	class Meta:
+		abstract = True
+
+	def apply_rendered(self, result):
+		self.rendered_html = result['html']
+		self.word_count = result['word_count']
+		self.reading_time = result['reading_time']
+		self.plain_excerpt = result['excerpt']
+		self.render_version = markup.RENDERER_VERSION
+
+	def render_markup(self):
+		self.apply_rendered(markup.render(getattr(self, self.markup_field)))
+
+	def save(self, *args, **kwargs):
+		update_fields = kwargs.get('update_fields')
+		if update_fields is None or self.markup_field in update_fields:
+			self.render_markup()
+			if update_fields is not None:
+				kwargs['update_fields'] = {*update_fields, *self.RENDERED_FIELDS}
+		super().save(*args, **kwargs)
+
+
 class Category(models.Model):
 	name = models.CharField(max_length=100, unique=True)
 	slug = models.SlugField(max_length=120, unique=True, blank=True)
@@ -60,7 +120,7 @@ class Skill(TimeStampedModel):
 	proficiency = models.PositiveSmallIntegerField(default=0, help_text="Percentage 0-100")
 	category = models.CharField(max_length=100, blank=True)
 	order = models.PositiveIntegerField(default=0, help_text="Ordering priority")
-	history = HistoricalRecords()
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	class Meta:
 		ordering = ['order', 'name']
@@ -79,7 +139,7 @@ class Experience(TimeStampedModel):
 	is_current = models.BooleanField(default=False)
 	description = models.TextField(blank=True)
 	order = models.PositiveIntegerField(default=0)
-	history = HistoricalRecords()
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	class Meta:
 		ordering = ['-is_current', '-start_date']
@@ -96,7 +156,7 @@ class Education(TimeStampedModel):
 	end_year = models.PositiveIntegerField(null=True, blank=True)
 	description = models.TextField(blank=True)
 	order = models.PositiveIntegerField(default=0)
-	history = HistoricalRecords()
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	class Meta:
 		ordering = ['-start_year']
@@ -105,7 +165,7 @@ class Education(TimeStampedModel):
 		return f"{self.degree} - {self.institution}"
 
 
-class Project(PublishableModel):
+class Project(RenderedMarkupModel, PublishableModel):
 	title = models.CharField(max_length=200)
 	slug = models.SlugField(max_length=220, unique=True, blank=True)
 	summary = models.CharField(max_length=300, blank=True)
@@ -120,7 +180,12 @@ class Project(PublishableModel):
 	author = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
 	seo_title = models.CharField(max_length=70, blank=True)
 	seo_description = models.CharField(max_length=160, blank=True)
-	history = HistoricalRecords()
+	history = HistoricalRecords(
+		bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet,
+		excluded_fields=RenderedMarkupModel.RENDERED_FIELDS,
+	)
+
+	markup_field = 'description'
 
 	class Meta:
 		ordering = ['order', '-published_at', 'title']
@@ -153,7 +218,7 @@ class ProjectImage(TimeStampedModel):
 		return f"Image for {self.project.title}"
 
 
-class BlogPost(PublishableModel):
+class BlogPost(RenderedMarkupModel, PublishableModel):
 	title = models.CharField(max_length=200)
 	slug = models.SlugField(max_length=220, unique=True, blank=True)
 	excerpt = models.CharField(max_length=300, blank=True)
@@ -164,7 +229,12 @@ class BlogPost(PublishableModel):
 	author = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
 	seo_title = models.CharField(max_length=70, blank=True)
 	seo_description = models.CharField(max_length=160, blank=True)
-	history = HistoricalRecords()
+	history = HistoricalRecords(
+		bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet,
+		excluded_fields=RenderedMarkupModel.RENDERED_FIELDS,
+	)
+
+	markup_field = 'content'
 
 	class Meta:
 		ordering = ['-published_at', 'title']
@@ -184,7 +254,7 @@ class BlogPost(PublishableModel):
 		return reverse('portfolio:blog_detail', args=[self.slug])
 
 
-class NewsItem(PublishableModel):
+class NewsItem(RenderedMarkupModel, PublishableModel):
 	"""Short news / update items."""
 	title = models.CharField(max_length=200)
 	slug = models.SlugField(max_length=220, unique=True, blank=True)
@@ -194,7 +264,12 @@ class NewsItem(PublishableModel):
 	link = models.URLField(blank=True)
 	important = models.BooleanField(default=False, help_text="Mark to highlight on home page")
 	author = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
-	history = HistoricalRecords()
+	history = HistoricalRecords(
+		bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet,
+		excluded_fields=RenderedMarkupModel.RENDERED_FIELDS,
+	)
+
+	markup_field = 'content'
 
 	class Meta:
 		ordering = ['-published_at', '-created_at']
@@ -226,7 +301,7 @@ class MediaAsset(TimeStampedModel):
 	title = models.CharField(max_length=200, blank=True)
 	alt_text = models.CharField(max_length=200, blank=True)
 	description = models.TextField(blank=True)
-	history = HistoricalRecords()
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	def __str__(self):
 		return self.title or self.file.name
@@ -237,7 +312,7 @@ class SocialLink(TimeStampedModel):
 	url = models.URLField()
 	icon = models.CharField(max_length=50, blank=True, help_text="CSS class or icon key")
 	order = models.PositiveIntegerField(default=0)
-	history = HistoricalRecords()
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	class Meta:
 		ordering = ['order']
@@ -256,7 +331,7 @@ class SiteSetting(models.Model):
 	meta_description = models.CharField(max_length=160, blank=True)
 	google_analytics_id = models.CharField(max_length=30, blank=True)
 	contact_email = models.EmailField(blank=True)
-	history = HistoricalRecords()
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	class Meta:
 		verbose_name = 'Site Setting'
@@ -272,7 +347,8 @@ class ContactMessage(TimeStampedModel):
 	subject = models.CharField(max_length=200)
 	message = models.TextField()
 	is_read = models.BooleanField(default=False)
-	history = HistoricalRecords()
+	notified_at = models.DateTimeField(null=True, blank=True, editable=False, help_text="When the digest email including this message was sent")
+	history = HistoricalRecords(bases=[CompactableHistory], historical_queryset=CompactingHistoricalQuerySet)
 
 	class Meta:
 		ordering = ['-created_at']
@@ -280,3 +356,40 @@ class ContactMessage(TimeStampedModel):
 	def __str__(self):
 		return f"Message from {self.name}: {self.subject}"
 
+
+class Task(models.Model):
+	"""A unit of background work stored in the database and run by ``manage.py run_worker``."""
+	QUEUED = 'queued'
+	RUNNING = 'running'
+	SUCCEEDED = 'succeeded'
+	FAILED = 'failed'
+	STATUS_CHOICES = [
+		(QUEUED, 'Queued'),
+		(RUNNING, 'Running'),
+		(SUCCEEDED, 'Succeeded'),
+		(FAILED, 'Failed'),
+	]
+	name = models.CharField(max_length=200, db_index=True)
+	payload = models.JSONField(default=dict, blank=True)
+	key = models.CharField(max_length=200, blank=True, help_text="Optional de-duplication key for pending tasks")
+	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+	priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+	run_at = models.DateTimeField(default=timezone.now)
+	attempts = models.PositiveSmallIntegerField(default=0)
+	max_attempts = models.PositiveSmallIntegerField(default=5)
+	locked_by = models.CharField(max_length=100, blank=True)
+	locked_at = models.DateTimeField(null=True, blank=True)
+	last_error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	started_at = models.DateTimeField(null=True, blank=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['status', 'run_at'], name='portfolio_task_due_idx'),
+			models.Index(fields=['name', 'key', 'status'], name='portfolio_task_key_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.name} ({self.status})"
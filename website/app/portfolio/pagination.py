@@ -0,0 +1,180 @@
+"""Keyset (cursor) pagination shared by the HTML list views and the API.
+
+Pages are selected with a ``WHERE`` on the ordering columns of the last row
+seen instead of ``OFFSET``, so every page costs the same as the first and no
+``COUNT(*)`` is needed. The primary key is appended to the ordering to make
+positions unique. Querysets ordered by something other than plain model
+fields (e.g. search rank) fall back to offset cursors.
+"""
+import base64
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+class InvalidCursor(ValueError):
+	pass
+
+
+class KeysetPage:
+	def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+		self.object_list = object_list
+		self.next_cursor = next_cursor
+		self.previous_cursor = previous_cursor
+
+	@property
+	def has_next(self):
+		return self.next_cursor is not None
+
+	@property
+	def has_previous(self):
+		return self.previous_cursor is not None
+
+	@property
+	def has_other_pages(self):
+		return self.has_next or self.has_previous
+
+	def __iter__(self):
+		return iter(self.object_list)
+
+	def __len__(self):
+		return len(self.object_list)
+
+
+class CursorEncoder(DjangoJSONEncoder):
+	"""Keeps full microsecond precision, which ``DjangoJSONEncoder`` truncates."""
+
+	def default(self, o):
+		if isinstance(o, (datetime.datetime, datetime.time)):
+			return o.isoformat()
+		return super().default(o)
+
+
+def encode_cursor(data):
+	raw = json.dumps(data, cls=CursorEncoder, separators=(',', ':'))
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+	try:
+		padded = cursor + '=' * (-len(cursor) % 4)
+		data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+	except (ValueError, TypeError) as exc:
+		raise InvalidCursor(cursor) from exc
+	if not isinstance(data, dict):
+		raise InvalidCursor(cursor)
+	return data
+
+
+class KeysetPaginator:
+	"""Paginate ``queryset`` by its ordering (or the model's ``Meta.ordering``)."""
+
+	def __init__(self, queryset, page_size):
+		self.queryset = queryset
+		self.page_size = page_size
+		self.model = queryset.model
+		self.ordering = self._resolve_ordering()
+
+	def _resolve_ordering(self):
+		"""Return ``[(field, descending), ...]`` or ``None`` if not keyset-able."""
+		opts = self.model._meta
+		terms = list(self.queryset.query.order_by) or list(opts.ordering)
+		ordering = []
+		for term in terms:
+			if not isinstance(term, str):
+				return None
+			name = term.lstrip('-')
+			try:
+				field = opts.pk if name == 'pk' else opts.get_field(name)
+			except FieldDoesNotExist:
+				return None
+			if not field.concrete or field.is_relation:
+				return None
+			ordering.append((field, term.startswith('-')))
+		if not any(field.primary_key for field, _ in ordering):
+			ordering.append((opts.pk, False))
+		return ordering
+
+	def page(self, cursor=None):
+		data = decode_cursor(cursor) if cursor else {}
+		if self.ordering is None:
+			return self._offset_page(data)
+		position = data.get('p')
+		reverse = bool(data.get('r'))
+		if cursor and (not isinstance(position, list) or len(position) != len(self.ordering)):
+			raise InvalidCursor(cursor)
+		if position is not None:
+			try:
+				position = [field.to_python(value) for (field, _), value in zip(self.ordering, position)]
+			except Exception as exc:
+				raise InvalidCursor(cursor) from exc
+
+		queryset = self.queryset.order_by(*self._order_by(reverse))
+		if position is not None:
+			queryset = queryset.filter(self._seek(position, reverse))
+		rows = list(queryset[:self.page_size + 1])
+		has_more = len(rows) > self.page_size
+		rows = rows[:self.page_size]
+		if reverse:
+			rows.reverse()
+			has_next, has_previous = True, has_more
+		else:
+			has_next, has_previous = has_more, position is not None
+		if not rows:
+			return KeysetPage(rows)
+		return KeysetPage(
+			rows,
+			next_cursor=encode_cursor({'p': self._position(rows[-1])}) if has_next else None,
+			previous_cursor=encode_cursor({'p': self._position(rows[0]), 'r': 1}) if has_previous else None,
+		)
+
+	def _position(self, obj):
+		if isinstance(obj, dict):
+			# ``.values()`` rows from the API's read path.
+			return [obj[field.attname] for field, _ in self.ordering]
+		return [getattr(obj, field.attname) for field, _ in self.ordering]
+
+	def _order_by(self, reverse):
+		# NULLs always sort after values when paging forward.
+		order_by = []
+		for field, descending in self.ordering:
+			expression = F(field.attname)
+			nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+			if descending != reverse:
+				order_by.append(expression.desc(**nulls))
+			else:
+				order_by.append(expression.asc(**nulls))
+		return order_by
+
+	def _seek(self, position, reverse):
+		"""Rows strictly after (or, when ``reverse``, before) ``position``."""
+		condition = None
+		for (field, descending), value in reversed(list(zip(self.ordering, position))):
+			name = field.attname
+			if value is None:
+				# Nothing sorts after a NULL; everything non-NULL sorts before it.
+				beyond = Q(**{f'{name}__isnull': False}) if reverse else Q(pk__in=[])
+				equal = Q(**{f'{name}__isnull': True})
+			else:
+				lookup = 'lt' if descending != reverse else 'gt'
+				beyond = Q(**{f'{name}__{lookup}': value})
+				if not reverse and field.null:
+					beyond |= Q(**{f'{name}__isnull': True})
+				equal = Q(**{name: value})
+			condition = beyond if condition is None else beyond | (equal & condition)
+		return condition
+
+	def _offset_page(self, data):
+		offset = data.get('o', 0)
+		if not isinstance(offset, int) or offset < 0:
+			raise InvalidCursor(data)
+		rows = list(self.queryset[offset:offset + self.page_size + 1])
+		has_next = len(rows) > self.page_size
+		return KeysetPage(
+			rows[:self.page_size],
+			next_cursor=encode_cursor({'o': offset + self.page_size}) if has_next else None,
+			previous_cursor=encode_cursor({'o': max(offset - self.page_size, 0)}) if offset else None,
+		)
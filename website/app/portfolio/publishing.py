@@ -0,0 +1,54 @@
+"""Set-based publish/unpublish and flag changes for large selections of content.
+
+Rows are changed with a couple of ``UPDATE`` statements per batch instead of
+one ``save()`` each, the matching ``simple_history`` rows are written with
+``bulk_create``, and ``content_bulk_changed`` is sent once after commit so
+caches and the search index are refreshed once per batch.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .signals import content_bulk_changed
+
+
+def bulk_set_status(queryset, status, user=None, **kwargs):
+	"""Move every row of ``queryset`` to ``status``; returns the number changed."""
+	model = queryset.model
+
+	def fill_published_at(chunk, now):
+		if status == model.PUBLISHED:
+			chunk.filter(published_at__isnull=True).update(published_at=now)
+
+	return bulk_set(queryset, {'status': status}, user=user, prepare=fill_published_at, **kwargs)
+
+
+def bulk_set(queryset, values, user=None, batch_size=500, change_reason='', prepare=None):
+	"""Set ``values`` on every row of ``queryset`` that differs; returns the number changed.
+
+	Like a ``save()`` per row it moves ``updated_at``, writes history and
+	refreshes caches. ``prepare(chunk, now)`` runs before each batch's update.
+	"""
+	model = queryset.model
+	manager = model._default_manager
+	differs = Q()
+	for field, value in values.items():
+		differs |= ~Q(**{field: value})
+	pks = list(queryset.filter(differs).values_list('pk', flat=True))
+	if not pks:
+		return 0
+	history = getattr(model, 'history', None)
+	with transaction.atomic():
+		now = timezone.now()
+		for start in range(0, len(pks), batch_size):
+			chunk = manager.filter(pk__in=pks[start:start + batch_size])
+			if prepare is not None:
+				prepare(chunk, now)
+			chunk.update(**values, updated_at=now)
+			if history is not None:
+				history.bulk_history_create(
+					list(chunk), batch_size=batch_size, update=True,
+					default_user=user, default_date=now, default_change_reason=change_reason,
+				)
+		transaction.on_commit(lambda: content_bulk_changed.send(sender=model, pks=pks))
+	return len(pks)
@@ -0,0 +1,169 @@
+"""Full-text search index for published content.
+
+On SQLite every indexed model gets an FTS5 virtual table whose ``rowid`` is
+the model's primary key. Rows are kept in sync by the receivers in
+``signals.py`` and can be rebuilt with ``manage.py rebuild_search_index``.
+Other database backends fall back to ``icontains`` lookups.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Markers wrapped around matched terms by snippet(); swapped for <mark> tags
+# only after the snippet text has been HTML-escaped.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_TOKENS = 16
+
+
+class SearchIndex:
+	"""Describes which fields of a model are indexed and how they are weighted."""
+
+	def __init__(self, model_label, fields, weights):
+		self.model_label = model_label
+		self.fields = fields
+		self.weights = weights
+
+	@property
+	def model(self):
+		from django.apps import apps
+		return apps.get_model(self.model_label)
+
+	@property
+	def table(self):
+		return f'{self.model._meta.db_table}_fts'
+
+
+INDEXES = [
+	SearchIndex('portfolio.Project', ['title', 'summary', 'description'], [10.0, 4.0, 1.0]),
+	SearchIndex('portfolio.BlogPost', ['title', 'excerpt', 'content'], [10.0, 4.0, 1.0]),
+	SearchIndex('portfolio.NewsItem', ['title', 'summary', 'content'], [10.0, 4.0, 1.0]),
+]
+
+
+def get_index(model):
+	label = model._meta.label
+	for index in INDEXES:
+		if index.model_label == label:
+			return index
+	return None
+
+
+def is_available(using=None):
+	"""FTS5 tables only exist on SQLite."""
+	return (using or connection).vendor == 'sqlite'
+
+
+def _delete_rows(cursor, index, pks):
+	pks = list(pks)
+	for start in range(0, len(pks), 500):
+		chunk = pks[start:start + 500]
+		placeholders = ', '.join(['%s'] * len(chunk))
+		cursor.execute(f'DELETE FROM {index.table} WHERE rowid IN ({placeholders})', chunk)
+
+
+def _insert_rows(cursor, index, rows):
+	columns = ', '.join(['rowid'] + index.fields)
+	placeholders = ', '.join(['%s'] * (len(index.fields) + 1))
+	cursor.executemany(
+		f'INSERT INTO {index.table} ({columns}) VALUES ({placeholders})',
+		[[value or '' for value in row] for row in rows],
+	)
+
+
+def update_index(model, pks):
+	"""Re-index the given primary keys, dropping rows that no longer exist."""
+	index = get_index(model)
+	if index is None or not is_available():
+		return
+	pks = list(pks)
+	rows = list(model._default_manager.filter(pk__in=pks).values_list('pk', *index.fields))
+	with transaction.atomic(), connection.cursor() as cursor:
+		_delete_rows(cursor, index, pks)
+		_insert_rows(cursor, index, rows)
+
+
+def remove_from_index(model, pks):
+	index = get_index(model)
+	if index is None or not is_available():
+		return
+	with connection.cursor() as cursor:
+		_delete_rows(cursor, index, pks)
+
+
+def rebuild(models=None, batch_size=1000):
+	"""Rebuild the index from scratch; returns ``{label: rows_indexed}``."""
+	if not is_available():
+		return {}
+	counts = {}
+	for index in INDEXES:
+		if models and index.model not in models:
+			continue
+		queryset = index.model._default_manager.order_by('pk').values_list('pk', *index.fields)
+		total = 0
+		with transaction.atomic(), connection.cursor() as cursor:
+			cursor.execute(f'DELETE FROM {index.table}')
+			batch = []
+			for row in queryset.iterator(chunk_size=batch_size):
+				batch.append(row)
+				if len(batch) >= batch_size:
+					_insert_rows(cursor, index, batch)
+					total += len(batch)
+					batch = []
+			if batch:
+				_insert_rows(cursor, index, batch)
+				total += len(batch)
+			cursor.execute(f"INSERT INTO {index.table}({index.table}) VALUES ('optimize')")
+		counts[index.model_label] = total
+	return counts
+
+
+def build_match_query(text):
+	"""Turn free text into a safe FTS5 query: every term is a quoted prefix match."""
+	terms = re.findall(r'\w+', text or '')
+	return ' '.join('"%s"*' % term for term in terms)
+
+
+def search(queryset, text):
+	"""Filter ``queryset`` to rows matching ``text``, best matches first.
+
+	Each result is annotated with ``search_rank`` (lower is better) and
+	``search_snippet``; render the latter with :func:`highlight`.
+	"""
+	model = queryset.model
+	index = get_index(model)
+	if index is None or not is_available(connection):
+		return _fallback_search(queryset, text, index)
+	match = build_match_query(text)
+	if not match:
+		return queryset.none()
+	table = index.table
+	pk_column = f'{model._meta.db_table}.{model._meta.pk.column}'
+	weights = ', '.join(str(weight) for weight in index.weights)
+	return queryset.extra(
+		select={
+			'search_rank': f'bm25({table}, {weights})',
+			'search_snippet': f"snippet({table}, -1, %s, %s, '…', {SNIPPET_TOKENS})",
+		},
+		select_params=(HIGHLIGHT_START, HIGHLIGHT_END),
+		tables=[table],
+		where=[f'{table}.rowid = {pk_column}', f'{table} MATCH %s'],
+		params=[match],
+	).order_by('search_rank')
+
+
+def _fallback_search(queryset, text, index):
+	fields = index.fields if index else ['title']
+	condition = Q()
+	for field in fields:
+		condition |= Q(**{f'{field}__icontains': text})
+	return queryset.filter(condition).annotate(search_rank=Value(0.0), search_snippet=Value(''))
+
+
+def highlight(snippet):
+	"""Escape a snippet and wrap matched terms in ``<mark>`` tags."""
+	html = escape(snippet or '')
+	return mark_safe(html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
@@ -0,0 +1,66 @@
+"""Precache manifest and cache version for the service worker at ``/sw.js``.
+
+The manifest lists the static assets every page needs (by their hashed
+URLs once ``collectstatic`` has run) and the key pages, as configured in
+``PORTFOLIO_PRECACHE_STATIC``/``PORTFOLIO_PRECACHE_PAGES``. The cache version
+is a digest of the manifest and of the static files' content, so it only
+changes, and browsers only reinstall the worker, when something it
+precaches has changed. Hashed names already carry their content hash; any
+other file is hashed from disk.
+
+At runtime the worker only caches the public pages and the API, never the
+admin, staff ``?preview``/``?all`` views or :data:`UNCACHED_PAGES`.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.urls import reverse
+
+# Public pages with a CSRF token in a form; the worker never stores them.
+UNCACHED_PAGES = ('portfolio:contact',)
+
+# Images kept by the worker's cache-first image cache before the oldest are evicted.
+DEFAULT_MAX_IMAGES = 100
+
+
+def _content_marker(name):
+	"""The hashed name under manifest storage, else a digest of the file found on disk."""
+	if hasattr(staticfiles_storage, 'stored_name'):
+		return staticfiles_storage.stored_name(name)
+	path = finders.find(name)
+	if not path:
+		return name
+	with open(path, 'rb') as handle:
+		return hashlib.md5(handle.read(), usedforsecurity=False).hexdigest()
+
+
+def precache_manifest():
+	"""``{'static': [...], 'pages': [...], 'version': str}`` for the worker template."""
+	static_names = settings.PORTFOLIO_PRECACHE_STATIC
+	static_urls = [staticfiles_storage.url(name) for name in static_names]
+	pages = [reverse(name) for name in settings.PORTFOLIO_PRECACHE_PAGES]
+	digest = hashlib.sha256()
+	for part in [*static_urls, *pages, *(_content_marker(name) for name in static_names)]:
+		digest.update(part.encode())
+		digest.update(b'\0')
+	return {'static': static_urls, 'pages': pages, 'version': digest.hexdigest()[:12]}
+
+
+def worker_context():
+	"""Template context for ``sw.js``."""
+	manifest = precache_manifest()
+	return {
+		'version': manifest['version'],
+		'static_json': json.dumps(manifest['static']),
+		'pages_json': json.dumps(manifest['pages']),
+		'api_prefix': reverse('portfolio:api-root'),
+		'static_prefix': settings.STATIC_URL,
+		'landing_page': reverse('portfolio_landing'),
+		'page_prefix': reverse('portfolio:index'),
+		'admin_prefix': reverse('admin:index'),
+		'uncached_json': json.dumps([reverse(name) for name in UNCACHED_PAGES]),
+		'max_images': int(getattr(settings, 'PORTFOLIO_SW_MAX_IMAGES', DEFAULT_MAX_IMAGES)),
+	}
@@ -0,0 +1,109 @@
+"""Model signal receivers keeping derived data in sync with content."""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from taggit.models import TaggedItem
+
+from . import caching, context_processors, images, models, search, syndication, tasks
+
+# Sent once after a set-based change (bulk publish, bulk upsert) with the
+# changed primary keys, standing in for the per-row post_save signals.
+content_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=models.Project)
+@receiver(post_save, sender=models.BlogPost)
+@receiver(post_save, sender=models.NewsItem)
+@receiver(post_save, sender=models.Skill)
+@receiver(post_save, sender=models.Experience)
+@receiver(post_save, sender=models.Category)
+@receiver(post_save, sender=models.ProjectImage)
+@receiver(post_delete, sender=models.Project)
+@receiver(post_delete, sender=models.BlogPost)
+@receiver(post_delete, sender=models.NewsItem)
+@receiver(post_delete, sender=models.Skill)
+@receiver(post_delete, sender=models.Experience)
+@receiver(post_delete, sender=models.Category)
+@receiver(post_delete, sender=models.ProjectImage)
+def bump_content_version(sender, **kwargs):
+	caching.bump_model_version(sender)
+
+
+@receiver(post_save, sender=models.SiteSetting)
+@receiver(post_save, sender=models.SocialLink)
+@receiver(post_delete, sender=models.SiteSetting)
+@receiver(post_delete, sender=models.SocialLink)
+def invalidate_site_context(sender, **kwargs):
+	# After commit, so no process can cache the rows as they were before it.
+	transaction.on_commit(context_processors.invalidate)
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def bump_tagged_content_version(sender, instance, action, **kwargs):
+	# Tags are written after the owning row is saved (admin save_related,
+	# serializer create/update) or without saving it at all (``tags.add()``),
+	# so bump the version and move ``updated_at`` here; the collection
+	# validators rely on the latter.
+	if action in ('post_add', 'post_remove', 'post_clear'):
+		model = type(instance)
+		if isinstance(instance, models.TimeStampedModel):
+			model._default_manager.filter(pk=instance.pk).update(updated_at=timezone.now())
+		caching.bump_model_version(model)
+
+
+@receiver(post_save, sender=models.Project)
+@receiver(post_save, sender=models.BlogPost)
+@receiver(post_save, sender=models.NewsItem)
+def update_search_index(sender, instance, raw=False, **kwargs):
+	if raw:
+		return
+	search.update_index(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=models.Project)
+@receiver(post_delete, sender=models.BlogPost)
+@receiver(post_delete, sender=models.NewsItem)
+def remove_search_index(sender, instance, **kwargs):
+	search.remove_from_index(sender, [instance.pk])
+
+
+@receiver(post_save, sender=models.Project)
+@receiver(post_save, sender=models.BlogPost)
+@receiver(post_save, sender=models.ProjectImage)
+@receiver(post_save, sender=models.SiteSetting)
+def generate_image_derivatives(sender, instance, raw=False, **kwargs):
+	if raw:
+		return
+	for label, field_name in images.IMAGE_FIELDS:
+		if label == sender._meta.label:
+			field_file = getattr(instance, field_name)
+			if field_file and not images.has_derivatives(field_file.name, field_file.storage):
+				tasks.generate_image_derivatives.enqueue({'name': field_file.name}, key=field_file.name)
+
+
+@receiver(post_save, sender=models.Project)
+@receiver(post_save, sender=models.BlogPost)
+@receiver(post_save, sender=models.NewsItem)
+@receiver(post_delete, sender=models.Project)
+@receiver(post_delete, sender=models.BlogPost)
+@receiver(post_delete, sender=models.NewsItem)
+def regenerate_syndication(sender, instance, raw=False, **kwargs):
+	if raw:
+		return
+	_queue_syndication(sender, [instance.pk])
+
+
+def _queue_syndication(model, pks):
+	label = model._meta.label
+	for shard in sorted({syndication.shard_for(pk) for pk in pks}):
+		tasks.regenerate_syndication.enqueue({'label': label, 'shards': [shard]}, key=f'{label}:{shard}')
+
+
+@receiver(content_bulk_changed)
+def refresh_after_bulk_change(sender, pks, **kwargs):
+	caching.bump_model_version(sender)
+	if sender._meta.label in syndication.SECTIONS.values():
+		_queue_syndication(sender, pks)
+	if search.get_index(sender) is not None:
+		search.update_index(sender, pks)
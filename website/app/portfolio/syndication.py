@@ -0,0 +1,220 @@
+"""Precomputed sitemap and RSS/Atom feed files.
+
+Published content is split into sitemap shards by primary key range
+(``pk // PORTFOLIO_SITEMAP_SHARD_SIZE``), so a saved or deleted object only
+invalidates the shard it falls in. ``sitemap.xml`` is a sitemap index over
+the non-empty shards. Feeds carry the newest ``FEED_ITEMS`` entries of a
+model. Files live under ``PORTFOLIO_SYNDICATION_ROOT`` and are replaced
+atomically; the signal receivers queue ``portfolio.regenerate_syndication``
+for the affected shards, and the serving views build a missing file on
+first request.
+"""
+import os
+import tempfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F, Max
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+
+DEFAULT_SHARD_SIZE = 5000
+FEED_ITEMS = 20
+
+# Sitemap section -> model label.
+SECTIONS = {
+	'projects': 'portfolio.Project',
+	'blog': 'portfolio.BlogPost',
+	'news': 'portfolio.NewsItem',
+}
+
+# Feed name -> (model label, title, list view, description field).
+FEEDS = {
+	'blog': ('portfolio.BlogPost', 'Blog', 'portfolio:blog_list', 'excerpt'),
+	'news': ('portfolio.NewsItem', 'News', 'portfolio:news', 'summary'),
+}
+
+FEED_FORMATS = {
+	'rss': Rss201rev2Feed,
+	'atom': Atom1Feed,
+}
+
+STATIC_PAGES = (
+	'portfolio:index', 'portfolio:project_list', 'portfolio:blog_list',
+	'portfolio:news', 'portfolio:experience', 'portfolio:contact',
+)
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def get_root():
+	return Path(getattr(settings, 'PORTFOLIO_SYNDICATION_ROOT', Path(settings.BASE_DIR) / 'var' / 'syndication'))
+
+
+def get_shard_size():
+	return getattr(settings, 'PORTFOLIO_SITEMAP_SHARD_SIZE', DEFAULT_SHARD_SIZE)
+
+
+def absolute(path):
+	return getattr(settings, 'PORTFOLIO_SITE_URL', 'http://localhost:8000').rstrip('/') + path
+
+
+def _write(name, content):
+	path = get_root() / name
+	path.parent.mkdir(parents=True, exist_ok=True)
+	handle, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+	with os.fdopen(handle, 'wb') as stream:
+		stream.write(content.encode())
+	os.replace(tmp, path)
+	return path
+
+
+def _remove(name):
+	try:
+		(get_root() / name).unlink()
+	except FileNotFoundError:
+		pass
+
+
+def _lastmod(value):
+	return value.isoformat(timespec='seconds') if value else None
+
+
+def _urlset(entries):
+	lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{SITEMAP_NS}">']
+	for location, lastmod in entries:
+		lines.append(f'<url><loc>{escape(location)}</loc>' + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '') + '</url>')
+	lines.append('</urlset>')
+	return '\n'.join(lines) + '\n'
+
+
+def shard_name(section, shard):
+	return f'sitemap-{section}-{shard}.xml'
+
+
+def shard_for(pk):
+	return pk // get_shard_size()
+
+
+def _published(model):
+	return model._default_manager.filter(status=model.PUBLISHED)
+
+
+def write_static_sitemap():
+	return _write(shard_name('pages', 0), _urlset((absolute(reverse(name)), None) for name in STATIC_PAGES))
+
+
+def write_shard(section, shard):
+	"""Write one shard, or remove it when it no longer holds published rows."""
+	model = apps.get_model(SECTIONS[section])
+	size = get_shard_size()
+	objects = (
+		_published(model).filter(pk__gte=shard * size, pk__lt=(shard + 1) * size)
+		.only('pk', 'slug', 'updated_at').order_by('pk')
+	)
+	entries = [(absolute(obj.get_absolute_url()), _lastmod(obj.updated_at)) for obj in objects]
+	if not entries:
+		_remove(shard_name(section, shard))
+		return None
+	return _write(shard_name(section, shard), _urlset(entries))
+
+
+def shard_stats(section):
+	"""``{shard: latest updated_at}`` for every non-empty shard of ``section``."""
+	model = apps.get_model(SECTIONS[section])
+	rows = (
+		_published(model).annotate(shard=F('pk') / get_shard_size())
+		.order_by().values_list('shard').annotate(latest=Max('updated_at'))
+	)
+	return dict(rows)
+
+
+def write_index():
+	lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{SITEMAP_NS}">']
+	shards = [(shard_name('pages', 0), None)]
+	for section in SECTIONS:
+		shards += [(shard_name(section, shard), latest) for shard, latest in sorted(shard_stats(section).items())]
+	for name, latest in shards:
+		location = escape(absolute(reverse('sitemap_section', args=[name])))
+		lastmod = f'<lastmod>{_lastmod(latest)}</lastmod>' if latest else ''
+		lines.append(f'<sitemap><loc>{location}</loc>{lastmod}</sitemap>')
+	lines.append('</sitemapindex>')
+	return _write('sitemap.xml', '\n'.join(lines) + '\n')
+
+
+def feed_name(name, kind):
+	return f'feeds/{name}.{kind}'
+
+
+def write_feed(name, kind):
+	label, title, list_view, description_field = FEEDS[name]
+	model = apps.get_model(label)
+	site_setting = apps.get_model('portfolio.SiteSetting').objects.first()
+	site_name = site_setting.site_name if site_setting else 'Portfolio'
+	link = absolute(reverse(list_view))
+	feed = FEED_FORMATS[kind](
+		title=f'{site_name} — {title}', link=link, description=f'Latest {title.lower()} from {site_name}',
+		feed_url=absolute(reverse(f'portfolio:{name}_feed_{kind}')), language=settings.LANGUAGE_CODE,
+	)
+	items = _published(model).select_related('author').order_by('-published_at', '-pk')[:FEED_ITEMS]
+	for item in items:
+		url = absolute(item.get_absolute_url())
+		author = getattr(item, 'author', None)
+		feed.add_item(
+			title=item.title, link=url, unique_id=url,
+			description=getattr(item, description_field) or '',
+			pubdate=item.published_at, updateddate=item.updated_at,
+			author_name=(author.get_full_name() or author.get_username()) if author else None,
+		)
+	return _write(feed_name(name, kind), feed.writeString('utf-8'))
+
+
+def regenerate(label, shards=()):
+	"""Rewrite the given shards of ``label``'s section, the index and its feeds."""
+	for section, section_label in SECTIONS.items():
+		if section_label == label:
+			for shard in shards:
+				write_shard(section, shard)
+	write_index()
+	for name, (feed_label, *_) in FEEDS.items():
+		if feed_label == label:
+			for kind in FEED_FORMATS:
+				write_feed(name, kind)
+
+
+def rebuild():
+	"""Write every file from scratch, removing shards that no longer exist."""
+	root = get_root()
+	if root.exists():
+		for path in root.glob('sitemap-*.xml'):
+			path.unlink()
+	write_static_sitemap()
+	for section in SECTIONS:
+		for shard in shard_stats(section):
+			write_shard(section, shard)
+	write_index()
+	for name in FEEDS:
+		for kind in FEED_FORMATS:
+			write_feed(name, kind)
+
+
+def ensure(name):
+	"""Path to the file ``name``, building it first if it has never been written."""
+	path = get_root() / name
+	if path.exists():
+		return path
+	if name == 'sitemap.xml':
+		return write_index()
+	if name == shard_name('pages', 0):
+		return write_static_sitemap()
+	for section in SECTIONS:
+		prefix = f'sitemap-{section}-'
+		if name.startswith(prefix) and name.endswith('.xml') and name[len(prefix):-4].isdigit():
+			return write_shard(section, int(name[len(prefix):-4]))
+	for feed in FEEDS:
+		for kind in FEED_FORMATS:
+			if name == feed_name(feed, kind):
+				return write_feed(feed, kind)
+	return None
@@ -0,0 +1,231 @@
+"""Database-backed background task queue.
+
+Tasks are rows in ``portfolio.Task``. Workers (``manage.py run_worker``)
+claim due rows with a conditional ``UPDATE ... WHERE status = 'queued'``,
+so any number of worker processes can share one database, SQLite included,
+without an external broker. Failed tasks are retried with exponential
+backoff until ``max_attempts`` is reached.
+
+Register work with the :func:`task` decorator and queue it with
+``my_task.enqueue({'arg': value})``. With ``PORTFOLIO_TASKS_EAGER`` enabled tasks
+run in-process once the current transaction commits instead; a failure is
+logged and stored as a failed row rather than raised.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import caching, contact, history, images, search, sqlite, syndication
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=5):
+	"""Register ``func`` as a task under ``name`` and give it an ``enqueue`` helper."""
+	def decorator(func):
+		_registry[name] = func
+		func.task_name = name
+		func.enqueue = partial(enqueue, name, max_attempts=max_attempts)
+		return func
+	return decorator
+
+
+def get_task(name):
+	return _registry[name]
+
+
+def is_eager():
+	return getattr(settings, 'PORTFOLIO_TASKS_EAGER', False)
+
+
+def enqueue(name, payload=None, *, key='', delay=None, run_at=None, priority=0, max_attempts=5):
+	"""Queue task ``name``; returns the ``Task`` row (``None`` when run eagerly).
+
+	A non-empty ``key`` coalesces work: if a queued task with the same name
+	and key already exists it is returned instead of creating another.
+	"""
+	if name not in _registry:
+		raise KeyError(f'Unknown task {name!r}')
+	payload = payload or {}
+	if is_eager():
+		transaction.on_commit(lambda: run_eager(name, payload, max_attempts))
+		return None
+	if run_at is None:
+		run_at = timezone.now() + (delay or timedelta(0))
+	if key:
+		pending = Task.objects.filter(name=name, key=key, status=Task.QUEUED).first()
+		if pending is not None:
+			return pending
+	return Task.objects.create(
+		name=name, payload=payload, key=key, run_at=run_at,
+		priority=priority, max_attempts=max_attempts,
+	)
+
+
+def default_worker_id():
+	return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker_id, limit=1):
+	"""Atomically take up to ``limit`` due tasks for ``worker_id``."""
+	now = timezone.now()
+	candidates = list(
+		Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+		.order_by('-priority', 'run_at', 'pk')
+		.values_list('pk', flat=True)[:limit * 4]
+	)
+	claimed = []
+	for pk in candidates:
+		# Only one worker's UPDATE can match while the row is still queued.
+		updated = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+			status=Task.RUNNING, locked_by=worker_id, locked_at=now,
+			started_at=now, attempts=F('attempts') + 1,
+		)
+		if updated:
+			claimed.append(pk)
+			if len(claimed) >= limit:
+				break
+	return list(Task.objects.filter(pk__in=claimed).order_by('-priority', 'run_at', 'pk'))
+
+
+def retry_delay(attempts):
+	base = getattr(settings, 'PORTFOLIO_TASKS_RETRY_BASE', 10)
+	cap = getattr(settings, 'PORTFOLIO_TASKS_RETRY_MAX', 60 * 60)
+	return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def run(task_row):
+	"""Execute a claimed task and record the outcome; returns True on success."""
+	try:
+		func = get_task(task_row.name)
+		func(**task_row.payload)
+	except Exception:
+		error = traceback.format_exc()
+		logger.warning("Task %s #%s failed (attempt %s)", task_row.name, task_row.pk, task_row.attempts)
+		now = timezone.now()
+		if task_row.attempts < task_row.max_attempts:
+			changes = {'status': Task.QUEUED, 'run_at': now + retry_delay(task_row.attempts)}
+		else:
+			changes = {'status': Task.FAILED, 'finished_at': now}
+		Task.objects.filter(pk=task_row.pk).update(last_error=error, locked_by='', locked_at=None, **changes)
+		return False
+	Task.objects.filter(pk=task_row.pk).update(
+		status=Task.SUCCEEDED, finished_at=timezone.now(), locked_by='', locked_at=None,
+	)
+	return True
+
+
+def run_eager(name, payload, max_attempts=5):
+	"""Run task ``name`` in-process; a failure is logged and stored as a failed ``Task`` row.
+
+	Like a queued task, a failing eager task never raises into the request
+	or admin save that enqueued it.
+	"""
+	try:
+		get_task(name)(**payload)
+	except Exception:
+		logger.warning("Eager task %s failed", name, exc_info=True)
+		now = timezone.now()
+		Task.objects.create(
+			name=name, payload=payload, status=Task.FAILED, run_at=now, started_at=now,
+			finished_at=now, attempts=1, max_attempts=max_attempts, last_error=traceback.format_exc(),
+		)
+		return False
+	return True
+
+
+def requeue_stale(timeout):
+	"""Return tasks locked longer than ``timeout`` (a dead worker) to the queue."""
+	cutoff = timezone.now() - timeout
+	return Task.objects.filter(status=Task.RUNNING, locked_at__lt=cutoff).update(
+		status=Task.QUEUED, locked_by='', locked_at=None,
+	)
+
+
+def queue_stats(sample=200):
+	"""Queue depth per status plus wait/run latency over the most recent finished tasks."""
+	now = timezone.now()
+	counts = {status: 0 for status, _ in Task.STATUS_CHOICES}
+	for row in Task.objects.order_by().values('status').annotate(total=Count('pk')):
+		counts[row['status']] = row['total']
+	oldest = (
+		Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+		.order_by('run_at').values_list('run_at', flat=True).first()
+	)
+	finished = list(
+		Task.objects.filter(status=Task.SUCCEEDED)
+		.order_by('-finished_at').values_list('run_at', 'started_at', 'finished_at')[:sample]
+	)
+	waits = [(started - run_at).total_seconds() for run_at, started, _ in finished if started]
+	runs = [(done - started).total_seconds() for _, started, done in finished if started and done]
+	return {
+		'counts': counts,
+		'oldest_due_age': (now - oldest).total_seconds() if oldest else 0.0,
+		'avg_wait': sum(waits) / len(waits) if waits else None,
+		'avg_runtime': sum(runs) / len(runs) if runs else None,
+		'sample': len(finished),
+	}
+
+
+# Registered tasks
+
+@task('portfolio.generate_image_derivatives', max_attempts=3)
+def generate_image_derivatives(name):
+	if not images.generate_derivatives(name):
+		return
+	# Cached pages rendered the original meanwhile; re-render them with the derivatives.
+	for label, field_name in images.IMAGE_FIELDS:
+		model = apps.get_model(label)
+		if model._base_manager.filter(**{field_name: name}).exists():
+			caching.bump_model_version(model)
+
+
+@task('portfolio.rebuild_search_index')
+def rebuild_search_index():
+	search.rebuild()
+
+
+@task('portfolio.compact_history')
+def compact_history():
+	total = 0
+	for model, _ in history.history_models():
+		compacted = sum(history.compact(model))
+		logger.info("Compacted %s history version(s) of %s", compacted, model._meta.label)
+		total += compacted
+	return total
+
+
+@task('portfolio.regenerate_syndication')
+def regenerate_syndication(label, shards):
+	syndication.regenerate(label, shards)
+
+
+@task('portfolio.send_contact_digest')
+def send_contact_digest():
+	contact.send_digest()
+
+
+@task('portfolio.sqlite_maintenance')
+def sqlite_maintenance():
+	sqlite.maintenance()
+	schedule_sqlite_maintenance()
+
+
+def schedule_sqlite_maintenance():
+	"""Queue the next WAL checkpoint unless one is already queued (WAL databases only)."""
+	if is_eager() or not sqlite.uses_wal():
+		return None
+	interval = getattr(settings, 'PORTFOLIO_SQLITE_MAINTENANCE_INTERVAL', sqlite.DEFAULT_MAINTENANCE_INTERVAL)
+	return sqlite_maintenance.enqueue(key='periodic', delay=timedelta(seconds=interval))
@@ -0,0 +1,33 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from app.portfolio import images
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 768px) 100vw, 33vw'
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes=DEFAULT_SIZES, width=640, lazy=True, style=''):
+	"""Render ``<picture>`` with WebP and JPEG derivative sources for ``image``.
+
+	Until the derivatives exist this is a plain ``<img>`` of the original.
+	"""
+	if not image:
+		return ''
+	attrs = flatatt({
+		'alt': alt, 'class': css_class or None, 'style': style or None,
+		'loading': 'lazy' if lazy else 'eager', 'decoding': 'async',
+	})
+	if not images.is_ready(image):
+		return format_html('<img src="{}"{}>', image.url, attrs)
+	return format_html(
+		'<picture>'
+		'<source type="image/webp" srcset="{}" sizes="{}">'
+		'<img src="{}" srcset="{}" sizes="{}"{}>'
+		'</picture>',
+		images.srcset(image, 'webp'), sizes,
+		images.fallback_url(image, width), images.srcset(image, 'jpg'), sizes, attrs,
+	)
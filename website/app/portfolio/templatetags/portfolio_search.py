@@ -0,0 +1,11 @@
+from django import template
+
+from app.portfolio import search
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+	"""Render a search snippet with matched terms wrapped in ``<mark>``."""
+	return search.highlight(snippet)
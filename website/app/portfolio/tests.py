@@ -1,3 +1,1650 @@
-from django.test import TestCase
+import gzip
+import json
+import shutil
+import tempfile
+from collections import Counter
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import OperationalError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.db import models as django_models
+from django.db.models import F
+from django.core.handlers.wsgi import WSGIHandler
+from django.http import HttpResponse
+from django.urls import resolve, reverse
+from django.template import Context, Template, engines
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.contrib.staticfiles.storage import staticfiles_storage
+from PIL import Image
+from asgiref.sync import async_to_sync, sync_to_async
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from taggit.models import Tag
+
+from . import (
+	assets, caching, contact, context_processors, export, history, images, markup, metrics, search, serviceworker, sqlite, syndication, tasks, throttling,
+	timing,
+)
+from .api import throttling as api_throttling
+from .api.filters import FullTextSearchFilter
+from .api.serializers import ProjectSerializer
+from . import views
+from .middleware import ServerTimingMiddleware
+from .aio import PortfolioASGIHandler
+from .api.views import ProjectViewSet
+from .management.commands import benchmark_serializers, seed_scale, sqlite_loadtest
+from .pagination import KeysetPaginator
+from .models import (
+	BlogPost, Category, ContactMessage, Experience, NewsItem, Project, ProjectImage, SiteSetting, Skill, SocialLink, Task,
+)
+
+
+class IsolatedStateMixin:
+	"""Starts every test with an empty cache and its own syndication directory."""
+
+	def setUp(self):
+		super().setUp()
+		cache.clear()
+		context_processors.clear_local()
+		syndication_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, syndication_root, ignore_errors=True)
+		self.enterContext(override_settings(PORTFOLIO_SYNDICATION_ROOT=syndication_root))
+
+
+class PortfolioTestCase(IsolatedStateMixin, TestCase):
+	pass
+
+
+def make_content(count, published=True):
+	"""Create ``count`` projects, posts and news items with categories and tags."""
+	author = get_user_model().objects.create_user(username=f'author{count}')
+	status = Project.PUBLISHED if published else Project.DRAFT
+	for i in range(count):
+		category = Category.objects.create(name=f'Category {count}-{i}')
+		project = Project.objects.create(
+			title=f'Project {i}', status=status, featured=True,
+			category=category, author=author,
+		)
+		project.tags.add(*[f'tag-{j}' for j in range(i % 8)])
+		post = BlogPost.objects.create(
+			title=f'Post {i}', content='Body ' * 50, status=status,
+			category=category, author=author,
+		)
+		post.tags.add(*[f'tag-{j}' for j in range(i % 6)])
+		NewsItem.objects.create(
+			title=f'News {i}', summary='Summary', content='Details',
+			status=status, category=category, author=author,
+		)
+
+
+class ListViewQueryBudgetTests(PortfolioTestCase):
+	"""List pages must run a fixed number of queries regardless of row count."""
+
+	budgets = {
+		'portfolio:index': 4,
+		'portfolio:project_list': 2,
+		'portfolio:blog_list': 2,
+		'portfolio:news': 1,
+	}
+
+	def assertBudget(self, url_name):
+		context_processors.load()
+		with self.assertNumQueries(self.budgets[url_name]):
+			response = self.client.get(reverse(url_name))
+		self.assertEqual(response.status_code, 200)
+		return response
+
+	def test_budget_with_single_row(self):
+		make_content(1)
+		for url_name in self.budgets:
+			with self.subTest(url_name=url_name):
+				self.assertBudget(url_name)
+
+	def test_budget_with_many_rows(self):
+		make_content(25)
+		for url_name in self.budgets:
+			with self.subTest(url_name=url_name):
+				self.assertBudget(url_name)
+
+	def test_tag_summary_collapses_extra_tags(self):
+		make_content(8)
+		response = self.assertBudget('portfolio:project_list')
+		project = next(p for p in response.context['projects'] if p.title == 'Project 7')
+		self.assertEqual(project.tag_count, 7)
+		self.assertEqual(len(project.visible_tags), 5)
+		self.assertEqual(project.hidden_tag_count, 2)
+		self.assertContains(response, '+2 more')
+
+
+class FullTextSearchTests(PortfolioTestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.match = NewsItem.objects.create(
+			title='Transformers release', summary='Attention is all you need',
+			content='A long article about <b>transformer</b> models.', status=NewsItem.PUBLISHED,
+		)
+		self.other = NewsItem.objects.create(
+			title='Gardening', content='Nothing about models here either.', status=NewsItem.PUBLISHED,
+		)
+
+	def test_index_follows_saves_and_deletes(self):
+		qs = NewsItem.objects.all()
+		self.assertEqual([n.pk for n in search.search(qs, 'transformer')], [self.match.pk])
+		self.match.title = 'Renamed'
+		self.match.content = 'Nothing relevant'
+		self.match.summary = ''
+		self.match.save()
+		self.assertFalse(search.search(qs, 'transformer').exists())
+		self.other.delete()
+		self.assertFalse(search.search(qs, 'gardening').exists())
+
+	def test_title_matches_rank_first(self):
+		in_body = NewsItem.objects.create(
+			title='Weekly notes', content='Some gardening tips.', status=NewsItem.PUBLISHED,
+		)
+		results = [n.pk for n in search.search(NewsItem.objects.all(), 'gardening')]
+		self.assertEqual(results, [self.other.pk, in_body.pk])
+
+	def test_query_syntax_is_escaped(self):
+		self.assertFalse(search.search(NewsItem.objects.all(), '"AND (OR').exists())
+
+	def test_news_view_highlights_escaped_snippet(self):
+		response = self.client.get(reverse('portfolio:news'), {'q': 'article'})
+		self.assertEqual(list(response.context['news_list']), [self.match])
+		html = response.content.decode()
+		self.assertIn('<mark>article</mark> about &lt;b&gt;transformer&lt;/b&gt;', html)
+
+	def test_api_search_uses_index(self):
+		response = self.client.get('/portfolio/api/news/', {'search': 'attention'})
+		results = response.json()['results']
+		self.assertEqual([r['id'] for r in results], [self.match.pk])
+		self.assertIn('<mark>Attention</mark>', results[0]['search_snippet'])
+
+	def test_rebuild_command(self):
+		call_command('rebuild_search_index', stdout=StringIO())
+		self.assertTrue(search.search(NewsItem.objects.all(), 'transformers').exists())
+
+
+class KeysetPaginationTests(PortfolioTestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Duplicate timestamps and NULLs exercise the tie-breaker and NULL handling.
+		stamp = timezone.now()
+		for i in range(7):
+			BlogPost.objects.create(title=f'Post {i}', content='x', status=BlogPost.PUBLISHED)
+		BlogPost.objects.filter(title__in=['Post 1', 'Post 2', 'Post 3']).update(published_at=stamp)
+		BlogPost.objects.create(title='Draft A', content='x')
+		BlogPost.objects.create(title='Draft B', content='x')
+
+	def walk(self, queryset, page_size):
+		paginator = KeysetPaginator(queryset, page_size)
+		pages, page = [], paginator.page()
+		pages.append(page)
+		while page.has_next:
+			page = paginator.page(page.next_cursor)
+			pages.append(page)
+		return paginator, pages
+
+	def test_forward_and_backward_walks_match_offset_order(self):
+		queryset = BlogPost.objects.all()
+		expected = [p.pk for p in queryset.order_by(
+			F('published_at').desc(nulls_last=True), 'title', 'pk',
+		)]
+		paginator, pages = self.walk(queryset, 2)
+		self.assertEqual([p.pk for page in pages for p in page], expected)
+		backward = []
+		page = pages[-1]
+		while page.has_previous:
+			page = paginator.page(page.previous_cursor)
+			backward = [p.pk for p in page] + backward
+		self.assertEqual(backward, expected[:len(backward)])
+		self.assertEqual(len(backward) + len(pages[-1]), len(expected))
+
+	def test_deep_pages_cost_one_query(self):
+		paginator, pages = self.walk(BlogPost.objects.all(), 2)
+		with self.assertNumQueries(1):
+			paginator.page(pages[-2].next_cursor)
+
+	@override_settings(PORTFOLIO_PAGE_SIZE=3)
+	def test_html_list_links(self):
+		response = self.client.get(reverse('portfolio:blog_list'))
+		page = response.context['page']
+		self.assertEqual(len(page), 3)
+		self.assertContains(response, 'rel="next"')
+		response = self.client.get(reverse('portfolio:blog_list') + page.next_url)
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.context['page'].has_previous)
+		self.assertEqual(self.client.get(reverse('portfolio:blog_list'), {'cursor': 'bogus'}).status_code, 404)
+
+	def test_api_cursor_links(self):
+		seen = []
+		url = '/portfolio/api/blog-posts/?page_size=4'
+		while url:
+			data = self.client.get(url).json()
+			self.assertNotIn('count', data)
+			seen.extend(r['id'] for r in data['results'])
+			url = data['next']
+		self.assertEqual(len(seen), len(set(seen)))
+		self.assertEqual(len(seen), BlogPost.objects.count())
+
+
+class PageCacheTests(PortfolioTestCase):
+
+	def setUp(self):
+		super().setUp()
+		make_content(3)
+		Skill.objects.create(name='Python', proficiency=90)
+		Experience.objects.create(role='Engineer', company='Acme', start_date=timezone.now().date())
+
+	def test_repeat_anonymous_hits_skip_the_database(self):
+		first = self.client.get(reverse('portfolio:index'))
+		with self.assertNumQueries(0):
+			second = self.client.get(reverse('portfolio:index'))
+		self.assertEqual(first.content, second.content)
+		counts = metrics.get_counts(['page_cache.index.hit', 'page_cache.index.miss'])
+		self.assertEqual(counts, {'page_cache.index.hit': 1, 'page_cache.index.miss': 1})
+
+	def test_admin_shows_counters_of_the_server_process(self):
+		self.client.get(reverse('portfolio:index'))
+		self.client.get(reverse('portfolio:index'))
+		admin = get_user_model().objects.create_superuser('admin', 'a@example.com', 'pw')
+		self.client.force_login(admin)
+		response = self.client.get(reverse('portfolio_metrics'))
+		row = next(row for row in response.context['cache_stats'] if row['label'] == 'index')
+		self.assertEqual((row['hits'], row['misses'], row['hit_rate']), (1, 1, 0.5))
+		self.assertContains(response, '50%')
+		err = StringIO()
+		call_command('cache_stats', stdout=StringIO(), stderr=err)
+		self.assertIn(reverse('portfolio_metrics'), err.getvalue())
+
+	def test_save_only_invalidates_dependent_pages(self):
+		for name in ('portfolio:project_list', 'portfolio:experience'):
+			self.client.get(reverse(name))
+		project = Project.objects.first()
+		project.title = 'Renamed project'
+		project.save()
+		with self.assertNumQueries(0):
+			self.client.get(reverse('portfolio:experience'))
+		self.assertContains(self.client.get(reverse('portfolio:project_list')), 'Renamed project')
+
+	def test_delete_invalidates(self):
+		self.client.get(reverse('portfolio:news'))
+		NewsItem.objects.all().delete()
+		self.assertNotContains(self.client.get(reverse('portfolio:news')), 'News 0')
+
+	def test_staff_and_preview_requests_bypass_cache(self):
+		staff = get_user_model().objects.create_user('staff', password='pw', is_staff=True)
+		self.client.get(reverse('portfolio:project_list'))
+		Project.objects.filter(pk=Project.objects.first().pk).update(status=Project.DRAFT)
+		self.client.force_login(staff)
+		response = self.client.get(reverse('portfolio:project_list'), {'all': '1'})
+		self.assertEqual(len(response.context['projects']), 3)
+		self.assertEqual(metrics.get_counts(caching.page_metric_names())['page_cache.project_list.hit'], 0)
+
+
+class ConditionalGetTests(PortfolioTestCase):
+
+	def setUp(self):
+		super().setUp()
+		make_content(2)
+		self.project = Project.objects.get(title='Project 1')
+		self.url = self.project.get_absolute_url()
+
+	def test_detail_returns_304_without_loading_content(self):
+		response = self.client.get(self.url)
+		self.assertIn('ETag', response)
+		self.assertIn('Last-Modified', response)
+		with CaptureQueriesContext(connection) as queries:
+			again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+		self.assertEqual(again.status_code, 304)
+		self.assertFalse(any('description' in q['sql'] for q in queries))
+
+	def test_tag_change_changes_etag(self):
+		etag = self.client.get(self.url)['ETag']
+		self.project.tags.add('brand-new-tag')
+		response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response['ETag'], etag)
+
+	def test_tag_change_changes_collection_etag(self):
+		etag = self.client.get('/portfolio/api/projects/')['ETag']
+		self.project.tags.add('brand-new-tag')
+		response = self.client.get('/portfolio/api/projects/', HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response['ETag'], etag)
+
+	def test_drafts_stay_404(self):
+		Project.objects.filter(pk=self.project.pk).update(status=Project.DRAFT)
+		self.assertEqual(self.client.get(self.url).status_code, 404)
+
+	def test_api_list_and_detail_validators(self):
+		for url in ('/portfolio/api/news/', f'/portfolio/api/projects/{self.project.pk}/'):
+			with self.subTest(url=url):
+				response = self.client.get(url)
+				self.assertEqual(response.status_code, 200)
+				again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+				self.assertEqual(again.status_code, 304)
+		etag = self.client.get('/portfolio/api/news/')['ETag']
+		NewsItem.objects.first().delete()
+		self.assertEqual(self.client.get('/portfolio/api/news/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+		searched = self.client.get('/portfolio/api/news/', {'search': 'news'})
+		self.assertEqual(searched.status_code, 200)
+		self.assertNotEqual(searched['ETag'], etag)
+
+
+class ImageDerivativeTests(PortfolioTestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.media_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.media_root)
+		override = override_settings(MEDIA_ROOT=self.media_root, PORTFOLIO_IMAGE_WIDTHS=(320, 640, 1280))
+		override.enable()
+		self.addCleanup(override.disable)
+
+	def upload(self, size=(1000, 500), mode='RGB'):
+		buffer = BytesIO()
+		Image.new(mode, size, 'red').save(buffer, 'PNG')
+		return SimpleUploadedFile('hero.png', buffer.getvalue(), content_type='image/png')
+
+	def test_upload_generates_every_width_and_format(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			project = Project.objects.create(title='Pictured', hero_image=self.upload())
+		name = project.hero_image.name
+		for width, expected in ((320, 320), (640, 640), (1280, 1000)):
+			for extension in ('webp', 'jpg'):
+				with default_storage.open(images.derivative_name(name, width, extension)) as f:
+					self.assertEqual(Image.open(f).width, expected)
+
+	def test_transparent_gallery_image(self):
+		project = Project.objects.create(title='Gallery')
+		with self.captureOnCommitCallbacks(execute=True):
+			image = ProjectImage.objects.create(project=project, image=self.upload(mode='RGBA'))
+		self.assertTrue(images.has_derivatives(image.image.name))
+
+	def render_tag(self, project):
+		return Template(
+			'{% load portfolio_images %}{% responsive_image project.hero_image alt="A" css_class="c" %}'
+		).render(Context({'project': project}))
+
+	def test_names_are_stable_and_tag_renders_srcset(self):
+		self.assertEqual(
+			images.derivative_name('projects/hero/a.png', 320, 'webp'),
+			images.derivative_name('projects/hero/a.png', 320, 'webp'),
+		)
+		with self.captureOnCommitCallbacks(execute=True):
+			project = Project.objects.create(title='x', hero_image=self.upload())
+		html = self.render_tag(project)
+		self.assertIn('type="image/webp"', html)
+		self.assertIn('-1280w.jpg 1280w', html)
+		self.assertIn('class="c"', html)
+
+	def test_tag_falls_back_to_original_until_derivatives_exist(self):
+		with override_settings(PORTFOLIO_TASKS_EAGER=False):
+			project = Project.objects.create(title='x', hero_image=self.upload())
+		html = self.render_tag(project)
+		self.assertNotIn('srcset', html)
+		self.assertIn(f'src="{project.hero_image.url}"', html)
+		self.assertIn('class="c"', html)
+
+	def test_detail_page_uses_the_same_fallback(self):
+		with override_settings(PORTFOLIO_TASKS_EAGER=False):
+			project = Project.objects.create(title='x', hero_image=self.upload(), status=Project.PUBLISHED)
+		response = self.client.get(project.get_absolute_url())
+		self.assertContains(response, f'src="{project.hero_image.url}"')
+		self.assertNotContains(response, 'srcset=""')
+
+	def test_existing_derivatives_are_never_rewritten(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			project = Project.objects.create(title='x', hero_image=self.upload())
+		name = project.hero_image.name
+		self.assertEqual(images.generate_derivatives(name, force=True), [])
+		default_storage.delete(images.derivative_name(name, 320, 'webp'))
+		self.assertEqual(
+			images.generate_derivatives(name, force=True), [images.derivative_name(name, 320, 'webp')],
+		)
+		current = images.derivative_name(name, 320, 'webp')
+		with mock.patch.object(images, 'DERIVATIVE_VERSION', images.DERIVATIVE_VERSION + 1):
+			self.assertNotEqual(images.derivative_name(name, 320, 'webp'), current)
+
+
+CALLS = []
+
+
+@tasks.task('tests.record')
+def record_call(value):
+	CALLS.append(value)
+
+
+@tasks.task('tests.explode', max_attempts=2)
+def explode():
+	raise RuntimeError('boom')
+
+
+@override_settings(PORTFOLIO_TASKS_EAGER=False)
+class TaskQueueTests(PortfolioTestCase):
+
+	def setUp(self):
+		super().setUp()
+		CALLS.clear()
+
+	def test_enqueue_claim_and_run(self):
+		row = record_call.enqueue({'value': 1})
+		self.assertEqual(row.status, Task.QUEUED)
+		claimed = tasks.claim('worker-a')
+		self.assertEqual([t.pk for t in claimed], [row.pk])
+		self.assertEqual(tasks.claim('worker-b'), [])
+		self.assertTrue(tasks.run(claimed[0]))
+		row.refresh_from_db()
+		self.assertEqual((row.status, row.attempts, CALLS), (Task.SUCCEEDED, 1, [1]))
+
+	def test_future_tasks_are_not_claimed(self):
+		record_call.enqueue({'value': 1}, delay=timedelta(minutes=5))
+		self.assertEqual(tasks.claim('worker'), [])
+
+	def test_key_coalesces_pending_tasks(self):
+		first = record_call.enqueue({'value': 1}, key='same')
+		second = record_call.enqueue({'value': 2}, key='same')
+		self.assertEqual(first.pk, second.pk)
+
+	def test_retry_with_backoff_then_fail(self):
+		row = explode.enqueue()
+		with self.assertLogs('app.portfolio.tasks', 'WARNING'):
+			self.assertFalse(tasks.run(tasks.claim('w')[0]))
+		row.refresh_from_db()
+		self.assertEqual(row.status, Task.QUEUED)
+		self.assertGreater(row.run_at, timezone.now())
+		self.assertIn('RuntimeError: boom', row.last_error)
+		Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+		with self.assertLogs('app.portfolio.tasks', 'WARNING'):
+			self.assertFalse(tasks.run(tasks.claim('w')[0]))
+		row.refresh_from_db()
+		self.assertEqual(row.status, Task.FAILED)
+
+	@override_settings(PORTFOLIO_TASKS_EAGER=True)
+	def test_failing_eager_task_is_recorded_not_raised(self):
+		with self.assertLogs('app.portfolio.tasks', 'WARNING'):
+			with self.captureOnCommitCallbacks(execute=True):
+				self.assertIsNone(explode.enqueue())
+		row = Task.objects.get(name='tests.explode')
+		self.assertEqual(row.status, Task.FAILED)
+		self.assertIn('RuntimeError: boom', row.last_error)
+
+	def test_stale_tasks_are_requeued(self):
+		row = record_call.enqueue({'value': 1})
+		tasks.claim('dead-worker')
+		Task.objects.filter(pk=row.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+		self.assertEqual(tasks.requeue_stale(timedelta(minutes=15)), 1)
+
+	def test_worker_command_drains_queue(self):
+		for value in range(3):
+			record_call.enqueue({'value': value})
+		call_command('run_worker', '--burst', stdout=StringIO())
+		self.assertEqual(sorted(CALLS), [0, 1, 2])
+		self.assertFalse(Task.objects.exclude(status=Task.SUCCEEDED).exists())
+
+	def test_admin_shows_queue_stats(self):
+		admin = get_user_model().objects.create_superuser('admin', 'a@example.com', 'pw')
+		self.client.force_login(admin)
+		record_call.enqueue({'value': 1})
+		response = self.client.get(reverse('admin:portfolio_task_changelist'))
+		self.assertEqual(response.context['queue_stats']['counts']['queued'], 1)
+
+
+class BulkPublishTests(PortfolioTestCase):
+	def test_publish_runs_constant_queries(self):
+		make_content(33, published=False)
+		few = list(Project.objects.order_by('pk').values_list('pk', flat=True)[:3])
+		with CaptureQueriesContext(connection) as small:
+			with self.captureOnCommitCallbacks(execute=True):
+				Project.objects.filter(pk__in=few).publish()
+		with CaptureQueriesContext(connection) as large:
+			with self.captureOnCommitCallbacks(execute=True):
+				self.assertEqual(Project.objects.all().publish(), 30)
+		self.assertEqual(len(small), len(large))
+		self.assertFalse(Project.objects.exclude(status=Project.PUBLISHED).exists())
+		self.assertFalse(Project.objects.filter(published_at__isnull=True).exists())
+
+	def test_publish_keeps_existing_dates_and_writes_history(self):
+		make_content(2, published=False)
+		user = get_user_model().objects.create_user(username='editor')
+		earlier = timezone.now() - timedelta(days=30)
+		first = Project.objects.order_by('pk').first()
+		Project.objects.filter(pk=first.pk).update(published_at=earlier)
+		with self.captureOnCommitCallbacks(execute=True):
+			Project.objects.all().publish(user=user)
+		first.refresh_from_db()
+		self.assertEqual(first.published_at, earlier)
+		latest = first.history.first()
+		self.assertEqual(latest.history_type, '~')
+		self.assertEqual(latest.status, Project.PUBLISHED)
+		self.assertEqual(latest.history_user, user)
+
+	def test_unpublish_skips_rows_already_in_draft(self):
+		make_content(2)
+		Project.objects.filter(pk=Project.objects.order_by('pk').first().pk).update(status=Project.DRAFT)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.assertEqual(Project.objects.all().unpublish(), 1)
+		self.assertEqual(Project.objects.filter(status=Project.DRAFT).count(), 2)
+
+	@override_settings(PORTFOLIO_TASKS_EAGER=False)
+	def test_invalidates_cache_once_per_batch(self):
+		make_content(3, published=False)
+		before = caching.get_versions(['portfolio.Project'])
+		with self.captureOnCommitCallbacks(execute=True) as callbacks:
+			BlogPost.objects.all().publish()
+			Project.objects.all().publish()
+		self.assertEqual(len(callbacks), 2)
+		self.assertNotEqual(caching.get_versions(['portfolio.Project']), before)
+
+	def test_feature_action_refreshes_cached_index(self):
+		make_content(2)
+		Project.objects.update(featured=False)
+		Project.objects.filter(slug='project-1').update(title='Spotlight')
+		self.assertNotContains(self.client.get(reverse('portfolio:index')), 'Spotlight')
+		admin = get_user_model().objects.create_superuser('admin', 'a@example.com', 'pw')
+		self.client.force_login(admin)
+		pk = Project.objects.get(slug='project-1').pk
+		before = Project.objects.get(pk=pk).updated_at
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('admin:portfolio_project_changelist'), {
+				'action': 'mark_featured', '_selected_action': [pk],
+			})
+		self.client.logout()
+		self.assertContains(self.client.get(reverse('portfolio:index')), 'Spotlight')
+		project = Project.objects.get(pk=pk)
+		self.assertTrue(project.featured)
+		self.assertGreater(project.updated_at, before)
+		self.assertEqual(project.history.first().featured, True)
+
+
+@override_settings(PORTFOLIO_HISTORY_RETENTION={'default': {'keep': 2, 'days': 0}})
+class HistoryCompactionTests(PortfolioTestCase):
+	def make_versions(self, count):
+		paragraphs = [f'Paragraph {i} ' + 'lorem ipsum ' * 20 + '\n' for i in range(30)]
+		post = BlogPost.objects.create(title='Versioned', content=''.join(paragraphs))
+		contents = [post.content]
+		for i in range(1, count):
+			paragraphs[i % 30] = f'Edited paragraph {i}\n'
+			post.content = ''.join(paragraphs)
+			post.save()
+			contents.append(post.content)
+		return post, contents
+
+	def test_delta_round_trip(self):
+		old = 'one\ntwo\nthree\n'
+		new = 'one\n2\nthree\nfour'
+		self.assertEqual(history.apply_delta(history.encode_delta(old, new), new), old)
+		self.assertEqual(history.apply_delta(history.encode_delta('', new), new), '')
+
+	def test_compacts_outside_retention_and_reconstructs(self):
+		post, contents = self.make_versions(6)
+		self.assertEqual(sum(history.compact(BlogPost, batch_size=1)), 4)
+		raw = list(django_models.QuerySet(BlogPost.history.model).filter(id=post.pk).order_by('history_date').values_list('content', 'history_delta'))
+		self.assertEqual([bool(delta) for _, delta in raw], [True] * 4 + [False] * 2)
+		self.assertEqual(raw[0][0], '')
+		self.assertEqual([record.content for record in post.history.order_by('history_date')], contents)
+		self.assertEqual(post.history.earliest('history_date').instance.content, contents[0])
+		# Running again finds nothing new to compact.
+		self.assertEqual(sum(history.compact(BlogPost)), 0)
+
+	def test_iterator_and_values_see_compacted_versions(self):
+		post, contents = self.make_versions(6)
+		sum(history.compact(BlogPost))
+		ordered = post.history.order_by('history_date')
+		self.assertEqual([record.content for record in ordered.iterator(chunk_size=2)], contents)
+		self.assertEqual(list(ordered.values_list('content', flat=True)), contents)
+		self.assertEqual([row['content'] for row in ordered.values('title', 'content')], contents)
+		self.assertEqual(ordered.values_list('history_id', 'content', named=True)[0].content, contents[0])
+		self.assertEqual(post.history.most_recent().content, contents[-1])
+		with self.assertRaises(TypeError):
+			ordered.values('content', 'history_user__username')
+
+	def test_admin_history_pages_show_compacted_versions(self):
+		post, contents = self.make_versions(4)
+		sum(history.compact(BlogPost))
+		admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+		self.client.force_login(admin)
+		oldest = post.history.earliest('history_date')
+		response = self.client.get(reverse('admin:portfolio_blogpost_simple_history', args=[post.pk, oldest.pk]))
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, 'Paragraph 1 lorem')
+		self.assertEqual(self.client.get(reverse('admin:portfolio_blogpost_history', args=[post.pk])).status_code, 200)
+
+	def test_command_reports_counts(self):
+		self.make_versions(5)
+		out = StringIO()
+		call_command('compact_history', 'portfolio.BlogPost', stdout=out)
+		self.assertIn('portfolio.blogpost: 3 version(s) compacted', out.getvalue())
+
+
+class ApiResponseCacheTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		make_content(3)
+		self.project = Project.objects.order_by('pk').first()
+		self.url = '/portfolio/api/projects/'
+
+	def test_hit_skips_the_database(self):
+		first = self.client.get(self.url)
+		with self.assertNumQueries(0):
+			second = self.client.get(self.url)
+		self.assertEqual(second.content, first.content)
+		self.assertEqual(second['ETag'], first['ETag'])
+		with self.assertNumQueries(0):
+			self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+		counts = metrics.get_counts(caching.api_metric_names(['project']))
+		self.assertEqual((counts['api_cache.project.hit'], counts['api_cache.project.miss']), (2, 1))
+
+	def test_query_params_are_part_of_the_key(self):
+		self.client.get(self.url)
+		response = self.client.get(self.url, {'ordering': 'title'})
+		self.assertEqual([row['title'] for row in response.json()['results']], ['Project 0', 'Project 1', 'Project 2'])
+
+	def test_saves_and_tag_changes_invalidate(self):
+		detail = f'{self.url}{self.project.pk}/'
+		self.client.get(detail)
+		self.project.title = 'Renamed'
+		self.project.save()
+		self.assertEqual(self.client.get(detail).json()['title'], 'Renamed')
+		self.project.tags.add('fresh-tag')
+		self.assertIn('fresh-tag', self.client.get(detail).json()['tags'])
+
+	def test_api_writes_invalidate(self):
+		staff = get_user_model().objects.create_user('staff', password='pw', is_staff=True)
+		self.client.get(self.url)
+		self.client.force_login(staff)
+		response = self.client.patch(
+			f'{self.url}{self.project.pk}/', {'tags': ['api-tag']}, content_type='application/json',
+		)
+		self.assertEqual(response.status_code, 200)
+		self.client.logout()
+		listed = {row['id']: row for row in self.client.get(self.url).json()['results']}
+		self.assertEqual(listed[self.project.pk]['tags'], ['api-tag'])
+
+
+class ValuesSerializationTests(PortfolioTestCase):
+	endpoints = ('projects', 'blog-posts', 'news', 'experience', 'skills')
+
+	def setUp(self):
+		super().setUp()
+		make_content(25)
+		for i in range(5):
+			Experience.objects.create(role=f'Role {i}', company='Acme', start_date=date(2020, 1, i + 1), description='Did things')
+			Skill.objects.create(name=f'Skill {i}', category='Backend', proficiency=50 + i, order=i)
+		project = Project.objects.order_by('pk').first()
+		for order in (2, 1, 1):
+			ProjectImage.objects.create(project=project, image=f'projects/gallery/{order}.jpg', caption='Shot', order=order)
+		Project.objects.filter(pk=project.pk).update(hero_image='projects/hero.jpg')
+
+	def test_output_is_byte_identical(self):
+		renderer = JSONRenderer()
+		request = Request(RequestFactory().get('/portfolio/api/'))
+		for endpoint, viewset in benchmark_serializers.VIEWSETS.items():
+			with self.subTest(endpoint=endpoint):
+				queryset = viewset.queryset.order_by(*viewset.ordering, 'pk')
+				serializer_class = viewset.serializer_class
+				instances = serializer_class(queryset, many=True, context={'request': request}).data
+				values = serializer_class.serialize_rows(serializer_class.values_queryset(queryset), {'request': request})
+				self.assertEqual(renderer.render(values), renderer.render(instances))
+
+	def test_tags_inserted_out_of_order_match(self):
+		project = Project.objects.order_by('pk').first()
+		project.tags.clear()
+		for name in ('zeta', 'mid', 'alpha'):
+			project.tags.add(name)
+		queryset = ProjectViewSet.queryset.filter(pk=project.pk)
+		request = Request(RequestFactory().get('/portfolio/api/'))
+		instances = ProjectSerializer(queryset, many=True, context={'request': request}).data
+		values = ProjectSerializer.serialize_rows(ProjectSerializer.values_queryset(queryset), {'request': request})
+		self.assertEqual(values[0]['tags'], ['alpha', 'mid', 'zeta'])
+		self.assertEqual(json.dumps(values), json.dumps(instances))
+
+	def test_list_endpoints_use_values_path(self):
+		request = Request(RequestFactory().get('/portfolio/api/projects/', {'search': 'project'}))
+		queryset = FullTextSearchFilter().filter_queryset(request, Project.objects.all(), ProjectViewSet())
+		rows = ProjectSerializer.values_queryset(queryset)
+		self.assertTrue(all(isinstance(row, dict) for row in rows))
+		data = ProjectSerializer.serialize_rows(rows, {'request': request})
+		self.assertEqual(data, ProjectSerializer(queryset, many=True, context={'request': request}).data)
+		# Validators, rows, tags and images: constant however many rows are listed.
+		with self.assertNumQueries(4):
+			response = self.client.get('/portfolio/api/projects/', {'page_size': 100})
+		self.assertEqual(len(response.json()['results']), 25)
+
+	def test_benchmark_command(self):
+		out = StringIO()
+		call_command('benchmark_serializers', sizes='5,50', repeat=1, endpoint=['projects'], stdout=out)
+		self.assertIn('size=50', out.getvalue())
+
+
+class BulkUpsertTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		self.staff = get_user_model().objects.create_user('sync', password='pw', is_staff=True)
+		self.client.force_login(self.staff)
+		self.category = Category.objects.create(name='Web')
+
+	def post(self, path, items):
+		return self.client.post(f'/portfolio/api/{path}/bulk/', items, content_type='application/json')
+
+	def project_items(self, count, **extra):
+		return [
+			{'title': f'Synced {i}', 'summary': 'From sync', 'category': self.category.pk,
+				'status': 'published', 'tags': [f'tag-{i % 3}', 'synced'], **extra}
+			for i in range(count)
+		]
+
+	def test_creates_then_updates_by_slug(self):
+		response = self.post('projects', self.project_items(5))
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual((response.json()['created'], response.json()['updated']), (5, 0))
+		project = Project.objects.get(slug='synced-1')
+		self.assertIsNotNone(project.published_at)
+		self.assertEqual(list(project.tags.values_list('name', flat=True)), ['tag-1', 'synced'])
+		self.assertEqual(project.history.count(), 1)
+
+		items = [{'slug': 'synced-1', 'summary': 'Changed', 'tags': ['synced', 'new-tag']}]
+		response = self.post('projects', items)
+		self.assertEqual(response.json()['results'], [{'index': 0, 'status': 'updated', 'id': project.pk}])
+		project.refresh_from_db()
+		self.assertEqual((project.summary, project.title), ('Changed', 'Synced 1'))
+		self.assertEqual(list(project.tags.values_list('name', flat=True)), ['synced', 'new-tag'])
+		self.assertEqual(project.history.count(), 2)
+
+	def test_query_count_does_not_grow_with_batch(self):
+		# Creates the tags, which is the only per-name work.
+		self.post('projects', self.project_items(3))
+		Project.objects.all().delete()
+		with CaptureQueriesContext(connection) as small:
+			self.post('projects', self.project_items(3))
+		Project.objects.all().delete()
+		# Stays within one SQLite insert batch so only per-item work would show.
+		with CaptureQueriesContext(connection) as large:
+			self.post('projects', self.project_items(30))
+		self.assertEqual(len(small), len(large))
+
+	def test_reports_item_errors_without_aborting(self):
+		items = self.project_items(2) + [{'summary': 'No title'}, {'title': 'Synced 0'}, {'title': 'Bad', 'category': 999}]
+		response = self.post('projects', items)
+		self.assertEqual(response.status_code, 200)
+		body = response.json()
+		self.assertEqual([result['status'] for result in body['results']], ['created', 'created', 'error', 'error', 'error'])
+		self.assertIn('title', body['results'][2]['errors'])
+		self.assertIn('category', body['results'][4]['errors'])
+		self.assertEqual(Project.objects.count(), 2)
+		self.assertEqual(self.post('projects', [{'summary': 'x'}]).status_code, 400)
+		self.assertEqual(self.post('projects', {'title': 'not a list'}).status_code, 400)
+
+	def test_skills_and_experience_use_their_natural_keys(self):
+		Skill.objects.create(name='Django', category='Backend', proficiency=50)
+		response = self.post('skills', [
+			{'name': 'Django', 'category': 'Backend', 'proficiency': 90},
+			{'name': 'Django', 'category': 'Tools', 'proficiency': 40},
+		])
+		self.assertEqual([r['status'] for r in response.json()['results']], ['updated', 'created'])
+		self.assertEqual(Skill.objects.get(category='Backend').proficiency, 90)
+		experience = {'role': 'Engineer', 'company': 'Acme', 'start_date': '2021-03-01'}
+		self.post('experience', [experience])
+		response = self.post('experience', [{**experience, 'description': 'Built things'}])
+		self.assertEqual(response.json()['updated'], 1)
+		self.assertEqual(Experience.objects.get().description, 'Built things')
+
+	def test_requires_staff(self):
+		self.client.logout()
+		self.assertEqual(self.post('skills', [{'name': 'Go'}]).status_code, 403)
+
+
+@override_settings(PORTFOLIO_SITEMAP_SHARD_SIZE=10, PORTFOLIO_SITE_URL='https://example.com')
+class SyndicationTests(PortfolioTestCase):
+	def run_queued(self):
+		for task_row in tasks.claim('test', limit=100):
+			tasks.run(task_row)
+
+	def test_sitemap_index_and_shards(self):
+		make_content(25)
+		syndication.rebuild()
+		index = self.client.get('/sitemap.xml')
+		self.assertEqual(index.status_code, 200)
+		self.assertEqual(index['Content-Type'], 'application/xml')
+		content = b''.join(index.streaming_content).decode()
+		self.assertIn('https://example.com/sitemap-pages-0.xml', content)
+		self.assertIn('https://example.com/sitemap-projects-2.xml', content)
+		self.assertNotIn('sitemap-projects-3.xml', content)
+		shard = b''.join(self.client.get('/sitemap-blog-1.xml').streaming_content).decode()
+		self.assertEqual(shard.count('<url>'), 10)
+		self.assertIn('<loc>https://example.com/portfolio/blog/', shard)
+		self.assertEqual(self.client.get('/sitemap-blog-9.xml').status_code, 404)
+
+	def test_conditional_get(self):
+		make_content(2)
+		response = self.client.get('/portfolio/blog/feed.xml')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(self.client.get('/portfolio/blog/feed.xml', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+		self.assertEqual(self.client.get('/sitemap.xml').status_code, 200)
+		with self.assertNumQueries(0):
+			modified = self.client.get('/sitemap.xml')['Last-Modified']
+			self.assertEqual(self.client.get('/sitemap.xml', HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+
+	def test_feeds(self):
+		make_content(3)
+		rss = b''.join(self.client.get('/portfolio/blog/feed.xml').streaming_content).decode()
+		self.assertIn('<rss', rss)
+		self.assertEqual(rss.count('<item>'), 3)
+		atom = b''.join(self.client.get('/portfolio/news/atom.xml').streaming_content).decode()
+		self.assertIn('http://www.w3.org/2005/Atom', atom)
+		self.assertIn('https://example.com/portfolio/news/', atom)
+
+	@override_settings(PORTFOLIO_TASKS_EAGER=False)
+	def test_changes_regenerate_only_affected_shard(self):
+		make_content(25)
+		syndication.rebuild()
+		root = syndication.get_root()
+		before = {path.name: path.stat().st_mtime_ns for path in root.glob('sitemap-*.xml')}
+		Task.objects.all().delete()
+		project = Project.objects.get(pk=15)
+		project.status = Project.DRAFT
+		project.save()
+		self.assertEqual(list(Task.objects.values_list('key', flat=True)), ['portfolio.Project:1'])
+		self.run_queued()
+		after = {path.name: path.stat().st_mtime_ns for path in root.glob('sitemap-*.xml')}
+		self.assertEqual([name for name in before if before[name] != after[name]], ['sitemap-projects-1.xml'])
+		self.assertNotIn('/portfolio/projects/project-14/', (root / 'sitemap-projects-1.xml').read_text())
+
+	def test_command(self):
+		make_content(1)
+		out = StringIO()
+		call_command('build_syndication', stdout=out)
+		self.assertIn('feeds/blog.atom', out.getvalue())
+
+
+class StaticPipelineTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		static_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, static_root, ignore_errors=True)
+		self.enterContext(override_settings(
+			STATIC_ROOT=static_root,
+			STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+			STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'app.portfolio.assets.CompressedManifestStaticFilesStorage'}},
+		))
+		call_command('collectstatic', interactive=False, verbosity=0)
+
+	def get(self, name, **headers):
+		return self.client.get(f'/static/{name}', headers=headers)
+
+	def test_minifiers_keep_literals(self):
+		js = "var a = b / 2; // note\nvar r = /a\\/b[/]/g; /* gone */\n\n    const s = '// kept', t = `/* ${a} */`;\n"
+		self.assertEqual(
+			assets.minify_js(js),
+			"var a = b / 2;\nvar r = /a\\/b[/]/g;\nconst s = '// kept', t = `/* ${a} */`;\n",
+		)
+		css = "/* c */ a > b , c { color: red ; content: ' x  y ' ; }\n/*! license */\n@media (max-width: 600px) { .x { margin: 0 auto; } }"
+		self.assertEqual(
+			assets.minify_css(css),
+			"a>b,c{color:red;content:' x  y '}/*! license */ @media (max-width:600px){.x{margin:0 auto}}\n",
+		)
+
+	def test_minifiers_leave_multiline_literals_alone(self):
+		self.assertEqual(assets.minify_js("const t = `x\n\n  y`;\n\n  go(t);\n"), "const t = `x\n\n  y`;\ngo(t);\n")
+		self.assertEqual(assets.minify_css('a { content: "; }"; }'), 'a{content:"; }"}\n')
+
+	def test_collected_assets_are_minified_hashed_and_compressed(self):
+		url = staticfiles_storage.url('css/site.css')
+		self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+		hashed = url[len('/static/'):]
+		with staticfiles_storage.open(hashed) as handle:
+			content = handle.read()
+		source = (settings.BASE_DIR / 'static' / 'css' / 'site.css').read_bytes()
+		self.assertLess(len(content), len(source))
+		self.assertEqual(content, assets.minify_css(source.decode()).encode())
+		with staticfiles_storage.open(hashed + '.gz') as handle:
+			self.assertEqual(gzip.decompress(handle.read()), content)
+		entry = staticfiles_storage.load_report()['css/site.css']
+		self.assertEqual(entry['hashed'], hashed)
+		self.assertEqual(entry['source'], len(source))
+		self.assertEqual(entry['minified'], len(content))
+
+	def test_serves_precompressed_variant(self):
+		hashed = staticfiles_storage.stored_name('js/site.js')
+		with staticfiles_storage.open(hashed) as handle:
+			content = handle.read()
+		response = self.get(hashed, accept_encoding='gzip, deflate')
+		self.assertEqual(response['Content-Encoding'], 'gzip')
+		self.assertEqual(response['Content-Type'], 'text/javascript')
+		self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+		self.assertEqual(response['Vary'], 'Accept-Encoding')
+		self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), content)
+		if assets.brotli is not None:
+			self.assertEqual(self.get(hashed, accept_encoding='gzip, br')['Content-Encoding'], 'br')
+		self.assertEqual(self.get(hashed, accept_encoding='gzip;q=0, br;q=0').get('Content-Encoding'), None)
+		self.assertEqual(self.get(hashed, if_none_match=response['ETag'], accept_encoding='gzip').status_code, 304)
+
+	def test_unhashed_and_missing_names(self):
+		response = self.get('js/site.js')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+		self.assertEqual(self.get('js/missing.js').status_code, 404)
+		self.assertEqual(self.get('../settings.py').status_code, 404)
+
+	def test_report_command(self):
+		out = StringIO()
+		call_command('static_report', stdout=out)
+		self.assertIn('css/site.css', out.getvalue())
+		self.assertIn('saved', out.getvalue())
+
+	def test_public_pages_skip_admin_theme(self):
+		response = self.client.get('/')
+		self.assertContains(response, staticfiles_storage.url('css/site.css'))
+		self.assertNotContains(response, 'admin_theme')
+
+
+class ServiceWorkerTests(PortfolioTestCase):
+	def test_renders_precache_manifest(self):
+		response = self.client.get('/sw.js')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response['Content-Type'], 'application/javascript')
+		self.assertEqual(response['Cache-Control'], 'no-cache')
+		manifest = serviceworker.precache_manifest()
+		self.assertContains(response, f"const CACHE_VERSION = '{manifest['version']}';")
+		self.assertContains(response, '"/static/css/site.css"')
+		self.assertContains(response, '"/portfolio/projects/"')
+		self.assertContains(response, "const API_PREFIX = '/portfolio/api/';")
+		self.assertContains(response, "const ADMIN_PREFIX = '/admin/';")
+		self.assertContains(response, 'const UNCACHED_PAGES = ["/portfolio/contact/"];')
+		self.assertNotIn('/portfolio/contact/', manifest['pages'])
+		self.assertEqual(self.client.get('/sw.js', headers={'if-none-match': response['ETag']}).status_code, 304)
+
+	def test_version_follows_precached_content(self):
+		version = serviceworker.precache_manifest()['version']
+		self.assertEqual(serviceworker.precache_manifest()['version'], version)
+		with override_settings(PORTFOLIO_PRECACHE_PAGES=('portfolio:index',)):
+			self.assertNotEqual(serviceworker.precache_manifest()['version'], version)
+		static_dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, static_dir, ignore_errors=True)
+		with open(f'{static_dir}/extra.css', 'w') as handle:
+			handle.write('a{color:red}')
+		with override_settings(STATICFILES_DIRS=[static_dir], PORTFOLIO_PRECACHE_STATIC=('extra.css',)):
+			before = serviceworker.precache_manifest()['version']
+			with open(f'{static_dir}/extra.css', 'w') as handle:
+				handle.write('a{color:blue}')
+			self.assertNotEqual(serviceworker.precache_manifest()['version'], before)
+
+
+ASYNC_PAGES = ['/', '/portfolio/projects/', '/portfolio/blog/', '/portfolio/news/', '/portfolio/news/?q=news', '/portfolio/experience/']
+
+
+def render_pages(client, paths):
+	cache.clear()
+	return {path: client.get(path).content for path in paths}
+
+
+@override_settings(PORTFOLIO_ASYNC_CONCURRENT_QUERIES=False)
+class AsyncViewTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		make_content(15)
+		Experience.objects.create(company='Acme', role='Engineer', start_date=date(2020, 1, 1))
+		Skill.objects.create(name='Python', category='language')
+
+	def test_async_views_match_sync_views(self):
+		expected = render_pages(self.client, ASYNC_PAGES)
+		with override_settings(ROOT_URLCONF='professional_website.urls_asgi'):
+			self.assertEqual(render_pages(self.client, ASYNC_PAGES), expected)
+
+	def test_async_urlconf_swaps_only_pages_with_variants(self):
+		self.assertIs(resolve('/', 'professional_website.urls_asgi').func, views.index_async)
+		self.assertIs(resolve('/portfolio/projects/', 'professional_website.urls_asgi').func, views.project_list_async)
+		self.assertIs(resolve('/portfolio/contact/', 'professional_website.urls_asgi').func, views.contact)
+
+	def test_inline_middleware_is_loaded_only_under_asgi(self):
+		cases = (
+			(WSGIHandler, 'django.core.handlers.base', 'django.middleware.csrf'),
+			(PortfolioASGIHandler, 'app.portfolio.aio', 'app.portfolio.middleware'),
+		)
+		for handler_class, loader, expected in cases:
+			with mock.patch(f'{loader}.import_string', wraps=import_string) as loaded:
+				handler_class()
+			paths = [call.args[0] for call in loaded.call_args_list]
+			self.assertIn(f'{expected}.CsrfViewMiddleware', paths)
+
+	@override_settings(ROOT_URLCONF='professional_website.urls_asgi')
+	def test_cached_page_served_without_queries(self):
+		get = async_to_sync(self.async_client.get)
+		first = get('/portfolio/projects/')
+		self.assertEqual(first.status_code, 200)
+		with self.assertNumQueries(0):
+			second = get('/portfolio/projects/')
+		self.assertEqual(second.content, first.content)
+		self.assertEqual(second['X-Frame-Options'], 'DENY')
+		self.assertEqual(second['X-Content-Type-Options'], 'nosniff')
+
+	async def test_session_writes_still_saved_in_async_chain(self):
+		await sync_to_async(get_user_model().objects.create_user)(username='staff', password='pw')
+		page = await self.async_client.get('/accounts/login/')
+		response = await self.async_client.post('/accounts/login/', {
+			'username': 'staff', 'password': 'pw', 'csrfmiddlewaretoken': page.cookies['csrftoken'].value,
+		})
+		self.assertEqual(response.status_code, 302)
+		self.assertIn('sessionid', response.cookies)
+		session = await self.async_client.asession()
+		self.assertTrue(await sync_to_async(session.get)('_auth_user_id'))
+
+
+class ConcurrentQueryTests(IsolatedStateMixin, TransactionTestCase):
+	"""Concurrent section queries use worker-thread connections, so the data must be committed."""
+
+	def setUp(self):
+		super().setUp()
+		make_content(5)
+
+	def test_concurrent_sections_match_sync_views(self):
+		paths = ['/', '/portfolio/experience/', '/portfolio/blog/']
+		expected = render_pages(self.client, paths)
+		with override_settings(ROOT_URLCONF='professional_website.urls_asgi', PORTFOLIO_ASYNC_CONCURRENT_QUERIES=True):
+			self.assertEqual(render_pages(self.client, paths), expected)
+
+	def test_benchmark_command(self):
+		out = StringIO()
+		call_command('benchmark_asgi', requests=4, concurrency=2, path=['/portfolio/'], cache='warm', stdout=out)
+		self.assertIn('asgi/wsgi', out.getvalue())
+
+
+class SQLiteProfileTests(PortfolioTestCase):
+	def test_production_profile_configures_connections(self):
+		directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+		handler = ConnectionHandler({'default': sqlite.production_database(f'{directory}/db.sqlite3')})
+		database = handler['default']
+		self.addCleanup(database.close)
+		self.assertEqual(database.settings_dict['CONN_MAX_AGE'], 600)
+		with database.cursor() as cursor:
+			pragmas = {}
+			for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'temp_store'):
+				cursor.execute(f'PRAGMA {name}')
+				pragmas[name] = cursor.fetchone()[0]
+		self.assertEqual(pragmas, {
+			'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'cache_size': -64000, 'temp_store': 2,
+		})
+		self.assertEqual(database.transaction_mode, 'IMMEDIATE')
+
+	def test_maintenance(self):
+		out = StringIO()
+		call_command('sqlite_maintenance', stdout=out)
+		self.assertIn('wal_frames=', out.getvalue())
+
+	@override_settings(PORTFOLIO_TASKS_EAGER=False)
+	def test_maintenance_is_rescheduled_only_for_wal_databases(self):
+		self.assertIsNone(tasks.schedule_sqlite_maintenance())
+		with mock.patch.object(sqlite, 'uses_wal', return_value=True):
+			first = tasks.schedule_sqlite_maintenance()
+			self.assertEqual(tasks.schedule_sqlite_maintenance().pk, first.pk)
+			self.assertGreater(first.run_at, timezone.now() + timedelta(minutes=59))
+			Task.objects.filter(pk=first.pk).update(run_at=timezone.now())
+			tasks.run(tasks.claim('test')[0])
+		queued = Task.objects.filter(name='portfolio.sqlite_maintenance', status=Task.QUEUED)
+		self.assertEqual(queued.count(), 1)
+		self.assertNotEqual(queued.get().pk, first.pk)
+
+	def test_loadtest_command(self):
+		out = StringIO()
+		# The command registers its own database; let this test open it.
+		with mock.patch.object(type(self), 'databases', {'default', sqlite_loadtest.ALIAS}):
+			call_command(
+				'sqlite_loadtest', duration=0.3, readers=2, writers=2, rows=50, content_size=100,
+				profile='production', stdout=out,
+			)
+		self.assertRegex(out.getvalue(), r'production +reads=.*read_errors=0 write_errors=0')
+		self.assertNotIn(sqlite_loadtest.ALIAS, connections)
+
+
+class LoadTestHarnessTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		Project.objects.create(title='Harness', status=Project.PUBLISHED)
+		BlogPost.objects.create(title='Harness post', content='x', status=BlogPost.PUBLISHED)
+		NewsItem.objects.create(title='Harness news', status=NewsItem.PUBLISHED)
+		Experience.objects.create(role='Dev', company='Acme', start_date=date(2020, 1, 1))
+		Skill.objects.create(name='Python', proficiency=90)
+		directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+		self.output = f'{directory}/run.json'
+
+	def loadtest(self, **options):
+		out = StringIO()
+		call_command('loadtest', requests=3, concurrency=1, warmup=0, cold=True, stdout=out, **options)
+		return out.getvalue()
+
+	def test_covers_every_readable_route(self):
+		self.loadtest(output=self.output)
+		with open(self.output) as handle:
+			report = json.load(handle)
+		routes = report['routes']
+		self.assertEqual(routes['portfolio:project_detail']['path'], '/portfolio/projects/harness/')
+		self.assertEqual(routes['portfolio:skill-detail']['path'], f'/portfolio/api/skills/{Skill.objects.get().pk}/')
+		self.assertIn('service_worker', routes)
+		self.assertIn('portfolio:api-root', routes)
+		self.assertNotIn('portfolio:skill-bulk-upsert', routes)
+		for name, result in routes.items():
+			self.assertEqual(result['errors'], 0, name)
+			self.assertEqual(set(result['latency_ms']), {'p50', 'p95', 'p99', 'mean'})
+		self.assertGreater(routes['portfolio:project_detail']['queries']['mean'], 0)
+		self.assertGreater(routes['portfolio:index']['bytes'], 0)
+
+	def test_compare_flags_query_regressions(self):
+		self.loadtest(output=self.output, route=['project_list'])
+		with open(self.output) as handle:
+			baseline = json.load(handle)
+		baseline['routes']['portfolio:project_list']['queries']['mean'] = 0
+		with open(self.output, 'w') as handle:
+			json.dump(baseline, handle)
+		with self.assertRaisesMessage(CommandError, 'portfolio:project_list'):
+			self.loadtest(compare=self.output, route=['project_list'], fail_on_regression=True)
+
+
+class SeedScaleTests(PortfolioTestCase):
+	def seed(self, **options):
+		out = StringIO()
+		defaults = {
+			'projects': 4, 'posts': 7, 'news': 5, 'skills': 3, 'experience': 2, 'categories': 3, 'tags': 5,
+			'images_per_project': 2, 'history': 3, 'seed': 7, 'batch_size': 3, 'post_size': 400, 'stdout': out,
+		}
+		call_command('seed_scale', **{**defaults, **options})
+		return out.getvalue()
+
+	def test_generates_related_rows_in_batches(self):
+		self.seed()
+		self.assertEqual(Project.objects.count(), 4)
+		self.assertEqual(BlogPost.objects.count(), 7)
+		self.assertEqual(NewsItem.objects.count(), 5)
+		self.assertEqual(ProjectImage.objects.count(), 8)
+		self.assertEqual(Category.objects.count(), 3)
+		self.assertEqual((Skill.objects.count(), Experience.objects.count()), (3, 2))
+		self.assertEqual(BlogPost.history.count(), 21)
+		self.assertEqual(Skill.history.count(), 3)
+		post = BlogPost.objects.order_by('pk').last()
+		versions = list(post.history.order_by('history_date'))
+		self.assertEqual([version.history_type for version in versions], ['+', '~', '~'])
+		self.assertEqual(versions[-1].content, post.content)
+		self.assertLess(len(versions[0].content), len(post.content))
+		self.assertIn(post, search.search(BlogPost.objects.all(), post.title))
+
+	def test_tag_distribution_and_reruns(self):
+		self.seed(posts=60, projects=0, news=0, tags=10, tags_per_item=3, tag_skew=2.0)
+		counts = Counter(
+			BlogPost.tags.through.objects.values_list('tag__name', flat=True)
+		).most_common()
+		self.assertEqual(counts[0][0], 'async')
+		self.assertGreater(counts[0][1], counts[-1][1] * 3)
+		self.seed(posts=5, projects=0, news=0, tags=10)
+		self.assertEqual(BlogPost.objects.count(), 65)
+		self.assertEqual(BlogPost.objects.values('slug').distinct().count(), 65)
+		self.assertEqual(Tag.objects.count(), 10)
+
+	def test_steep_skew_still_draws_every_tag(self):
+		generator = seed_scale.Generator(seed=1, tag_count=10, tag_skew=8.0)
+		picks = [generator.tag_indexes(5) for _ in range(50)]
+		self.assertIn(set(range(10)), picks)
+		self.assertEqual(Counter(index for picked in picks for index in picked).most_common(1)[0][0], 0)
+
+
+class ServerTimingTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		make_content(3)
+
+	def timings(self, response):
+		metrics = {}
+		for part in response['Server-Timing'].split(', '):
+			name, *params = part.split(';')
+			metrics[name] = dict(param.split('=', 1) for param in params)
+		return metrics
+
+	def test_header_reports_queries_and_template_time(self):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(reverse('portfolio:blog_list'))
+		metrics = self.timings(response)
+		self.assertEqual(set(metrics), {'view', 'sql', 'tpl'})
+		self.assertEqual(metrics['sql']['desc'], f'"{len(queries)} queries"')
+		self.assertGreater(float(metrics['tpl']['dur']), 0)
+		self.assertGreaterEqual(float(metrics['view']['dur']), float(metrics['tpl']['dur']))
+
+	def test_header_only_for_allowlisted_clients_and_staff(self):
+		url = reverse('portfolio:index')
+		self.assertNotIn('Server-Timing', self.client.get(url, REMOTE_ADDR='203.0.113.9'))
+		staff = get_user_model().objects.create_user(username='staff', password='pw', is_staff=True)
+		self.client.force_login(staff)
+		self.assertIn('Server-Timing', self.client.get(url, REMOTE_ADDR='203.0.113.9'))
+
+	@override_settings(
+		PORTFOLIO_SERVER_TIMING_IPS=(), ROOT_URLCONF='professional_website.urls_asgi',
+		PORTFOLIO_ASYNC_CONCURRENT_QUERIES=False,
+	)
+	def test_async_chain_checks_staff(self):
+		get = async_to_sync(self.async_client.get)
+		self.assertNotIn('Server-Timing', get(reverse('portfolio:project_list')))
+		staff = get_user_model().objects.create_user(username='staff', password='pw', is_staff=True)
+		async_to_sync(self.async_client.aforce_login)(staff)
+		self.assertIn('sql;dur=', get(reverse('portfolio:project_list'))['Server-Timing'])
+
+	@override_settings(PORTFOLIO_SLOW_REQUEST_MS=0)
+	def test_slow_requests_log_repeated_statements(self):
+		def view(request):
+			for project in Project.objects.order_by('pk'):
+				Category.objects.filter(pk=project.category_id).first()
+			return HttpResponse()
+
+		with self.assertLogs('app.portfolio.middleware', 'WARNING') as logs:
+			ServerTimingMiddleware(view)(RequestFactory().get('/slow/'))
+		self.assertIn('Slow request GET /slow/', logs.output[0])
+		self.assertIn('3x SELECT', logs.output[0])
+		self.assertIn('portfolio_category', logs.output[0])
+
+	def test_templates_are_timed_only_inside_a_recorder(self):
+		template = engines['django'].from_string('{{ value }}')
+		self.assertIsInstance(template, timing.Template)
+		self.assertEqual(template.render({'value': 'x'}), 'x')
+		recorder = timing.Recorder()
+		token = recorder.start()
+		try:
+			template.render({'value': 'x'})
+		finally:
+			recorder.stop(token)
+		self.assertGreater(recorder.template_time, 0)
+
+	def test_disabled(self):
+		with override_settings(PORTFOLIO_SERVER_TIMING=False):
+			with self.assertRaises(MiddlewareNotUsed):
+				ServerTimingMiddleware(lambda request: HttpResponse())
+		self.assertIsNone(timing._current.get())
+
+
+@override_settings(PORTFOLIO_CONTACT_FLUSH_INTERVAL=0, PORTFOLIO_CONTACT_RATE='3/h')
+class ContactSubmissionTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		SiteSetting.objects.create(site_name='Portfolio', contact_email='owner@example.com')
+		self.url = reverse('portfolio:contact')
+
+	def post(self, headers=None, remote_addr='127.0.0.1', **fields):
+		data = {'name': 'Ada', 'email': 'ada@example.com', 'subject': 'project', 'message': 'Hello there', **fields}
+		return self.client.post(self.url, data, headers=headers, REMOTE_ADDR=remote_addr)
+
+	def test_valid_submission_is_stored_and_notified(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			response = self.post()
+		self.assertRedirects(response, f'{self.url}?sent=1')
+		message = ContactMessage.objects.get()
+		self.assertEqual((message.name, message.subject), ('Ada', 'project'))
+		self.assertEqual(message.history.count(), 1)
+		self.assertEqual(len(mail.outbox), 1)
+		self.assertEqual(mail.outbox[0].to, ['owner@example.com'])
+		self.assertEqual(mail.outbox[0].reply_to, ['ada@example.com'])
+		self.assertIsNotNone(ContactMessage.objects.get().notified_at)
+		self.assertContains(self.client.get(f'{self.url}?sent=1'), 'Thank you!')
+
+	def test_invalid_submission(self):
+		response = self.post(email='not-an-email', headers={'Accept': 'application/json'})
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('email', response.json()['errors'])
+		response = self.post(subject='spam')
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, 'Select a valid choice')
+		self.assertFalse(ContactMessage.objects.exists())
+
+	def test_throttled_per_client_without_touching_the_database(self):
+		for _ in range(3):
+			self.assertEqual(self.post(headers={'Accept': 'application/json'}).status_code, 202)
+		with self.assertNumQueries(0):
+			response = self.post(headers={'Accept': 'application/json'})
+		self.assertEqual(response.status_code, 429)
+		self.assertGreater(int(response['Retry-After']), 0)
+		self.assertEqual(self.client.post(self.url, {}, REMOTE_ADDR='198.51.100.7').status_code, 200)
+		self.assertEqual(ContactMessage.objects.count(), 3)
+		self.assertEqual(metrics.get_counts(['contact.throttled'])['contact.throttled'], 1)
+
+	@override_settings(PORTFOLIO_TRUSTED_PROXY_COUNT=1)
+	def test_client_address_behind_a_trusted_proxy(self):
+		request = RequestFactory().get('/', REMOTE_ADDR='127.0.0.1', HTTP_X_FORWARDED_FOR='10.9.9.9, 203.0.113.5')
+		self.assertEqual(throttling.client_ip(request), '203.0.113.5')
+		self.assertEqual(throttling.client_ip(RequestFactory().get('/', REMOTE_ADDR='198.51.100.7')), '198.51.100.7')
+		for _ in range(3):
+			self.assertEqual(self.post(headers={'X-Forwarded-For': '203.0.113.5'}).status_code, 302)
+		self.assertEqual(self.post(headers={'X-Forwarded-For': '203.0.113.5'}).status_code, 429)
+		self.assertEqual(self.post(headers={'X-Forwarded-For': '203.0.113.6'}).status_code, 302)
+
+	def test_token_bucket_refills(self):
+		bucket = throttling.TokenBucket('test', '2/m')
+		self.assertEqual([bucket.consume('ip', now=100)[0] for _ in range(3)], [True, True, False])
+		allowed, retry_after = bucket.consume('ip', now=100)
+		self.assertFalse(allowed)
+		self.assertAlmostEqual(retry_after, 30)
+		self.assertTrue(bucket.consume('ip', now=130)[0])
+		self.assertFalse(bucket.consume('ip', now=131)[0])
+
+	@override_settings(
+		PORTFOLIO_CONTACT_FLUSH_INTERVAL=3600, PORTFOLIO_CONTACT_BATCH_SIZE=50, PORTFOLIO_TASKS_EAGER=False,
+		PORTFOLIO_CONTACT_RATE='10/h',
+	)
+	def test_buffered_writes_and_coalesced_digest(self):
+		for i in range(4):
+			self.post(name=f'Sender {i}', remote_addr=f'203.0.113.{i}')
+		self.assertFalse(ContactMessage.objects.exists())
+		self.assertEqual(len(contact.buffer), 4)
+		with self.assertNumQueries(6):
+			# One INSERT each for the rows and their history, the digest lookup and
+			# its Task row, inside a savepoint.
+			contact.buffer.flush()
+		self.assertEqual(ContactMessage.objects.count(), 4)
+		digests = Task.objects.filter(name='portfolio.send_contact_digest')
+		self.assertEqual(digests.count(), 1)
+		contact.write([{'name': 'Late', 'email': 'l@example.com', 'subject': 'other', 'message': 'x'}])
+		self.assertEqual(digests.count(), 1)
+		self.assertEqual(contact.send_digest(), 5)
+		self.assertEqual(len(mail.outbox), 1)
+		self.assertIn('5 new contact messages', mail.outbox[0].subject)
+		self.assertIsNone(mail.outbox[0].reply_to or None)
+		self.assertEqual(contact.send_digest(), 0)
+
+	@override_settings(
+		PORTFOLIO_CONTACT_FLUSH_INTERVAL=3600, PORTFOLIO_CONTACT_WRITE_ATTEMPTS=2, PORTFOLIO_CONTACT_RATE='10/h',
+	)
+	def test_failed_writes_are_requeued_then_dropped(self):
+		self.post(name='First', remote_addr='203.0.113.1')
+		locked = OperationalError('database is locked')
+		with mock.patch.object(contact, 'write', side_effect=locked), self.assertRaises(OperationalError):
+			contact.buffer.flush()
+		self.post(name='Second', remote_addr='203.0.113.2')
+		self.assertEqual(len(contact.buffer), 2)
+		with self.assertLogs('app.portfolio.contact', 'ERROR'):
+			with mock.patch.object(contact, 'write', side_effect=locked), self.assertRaises(OperationalError):
+				contact.buffer.flush()
+		self.assertEqual(len(contact.buffer), 1)
+		contact.buffer.flush()
+		self.assertEqual(list(ContactMessage.objects.values_list('name', flat=True)), ['Second'])
+		self.assertEqual(metrics.get_counts(['contact.write_failed', 'contact.dropped']), {
+			'contact.write_failed': 2, 'contact.dropped': 1,
+		})
+
+
+@override_settings(REST_FRAMEWORK={
+	**settings.REST_FRAMEWORK,
+	'DEFAULT_THROTTLE_RATES': {'read': '3/m', 'query': '1/m', 'query.skill': None},
+})
+class ApiThrottleTests(PortfolioTestCase):
+	def test_search_and_ordering_use_a_separate_budget(self):
+		url = '/portfolio/api/projects/'
+		self.assertEqual(self.client.get(url, {'search': 'django'}).status_code, 200)
+		response = self.client.get(url, {'ordering': 'title'})
+		self.assertEqual(response.status_code, 429)
+		self.assertEqual(response['Retry-After'], '60')
+		self.assertEqual([self.client.get(url).status_code for _ in range(4)], [200, 200, 200, 429])
+		counts = metrics.get_counts(api_throttling.metric_names(['project']))
+		self.assertEqual(counts['api_throttle.project.query.allowed'], 1)
+		self.assertEqual(counts['api_throttle.project.query.throttled'], 1)
+		self.assertEqual(counts['api_throttle.project.read.throttled'], 1)
+
+	def test_budgets_are_per_client_and_endpoint(self):
+		url = '/portfolio/api/projects/'
+		self.client.get(url, {'search': 'django'})
+		self.assertEqual(self.client.get(url, {'search': 'django'}).status_code, 429)
+		self.assertEqual(self.client.get(url, {'search': 'django'}, REMOTE_ADDR='198.51.100.7').status_code, 200)
+		self.assertEqual(self.client.get('/portfolio/api/blog-posts/', {'search': 'django'}).status_code, 200)
+		for _ in range(3):
+			self.assertEqual(self.client.get('/portfolio/api/skills/', {'ordering': 'name'}).status_code, 200)
+
+	@override_settings(PORTFOLIO_TRUSTED_PROXY_COUNT=1)
+	def test_anonymous_clients_behind_a_proxy_get_their_own_budget(self):
+		url = '/portfolio/api/projects/'
+		proxied = {'REMOTE_ADDR': '127.0.0.1'}
+		self.client.get(url, {'search': 'django'}, HTTP_X_FORWARDED_FOR='203.0.113.5', **proxied)
+		self.assertEqual(
+			self.client.get(url, {'search': 'django'}, HTTP_X_FORWARDED_FOR='203.0.113.5', **proxied).status_code, 429,
+		)
+		self.assertEqual(
+			self.client.get(url, {'search': 'django'}, HTTP_X_FORWARDED_FOR='203.0.113.6', **proxied).status_code, 200,
+		)
+
+	def test_staff_are_exempt(self):
+		staff = get_user_model().objects.create_user('staff', password='pw', is_staff=True)
+		self.client.force_login(staff)
+		url = '/portfolio/api/projects/'
+		for _ in range(3):
+			self.assertEqual(self.client.get(url, {'search': 'django'}).status_code, 200)
+		out = StringIO()
+		call_command('throttle_stats', stdout=out, stderr=StringIO())
+		self.assertIn('api:project:query', out.getvalue())
+		self.assertIn('allowed=0', out.getvalue())
+
+
+class SiteContextTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		with self.captureOnCommitCallbacks(execute=True):
+			self.site = SiteSetting.objects.create(
+				site_name='Ada Lovelace', tagline='Analytical engines', google_analytics_id='G-TEST',
+			)
+			SocialLink.objects.create(platform='GitHub', url='https://github.com/ada', icon='fab fa-github', order=2)
+			SocialLink.objects.create(platform='Mastodon', url='https://example.social/@ada', order=1)
+
+	def test_pages_render_branding_and_links_without_queries_once_warm(self):
+		response = self.client.get(reverse('portfolio:contact'))
+		self.assertContains(response, '<title>')
+		self.assertContains(response, 'Ada Lovelace')
+		self.assertContains(response, 'href="https://github.com/ada"')
+		self.assertContains(response, 'G-TEST')
+		self.assertEqual(
+			[link.platform for link in response.context['social_links']], ['Mastodon', 'GitHub'],
+		)
+		json_ld = response.content.decode().split('<script type="application/ld+json">')[1].split('</script>')[0]
+		self.assertEqual(
+			json.loads(json_ld)['sameAs'], ['https://example.social/@ada', 'https://github.com/ada'],
+		)
+		with self.assertNumQueries(0):
+			self.assertEqual(context_processors.load()['site_settings'].site_name, 'Ada Lovelace')
+
+	@override_settings(PORTFOLIO_SITE_CONTEXT_TTL=0)
+	def test_shared_cache_serves_other_processes(self):
+		context_processors.load()
+		# Another process: nothing local yet, the shared copy is current.
+		context_processors.clear_local()
+		with self.assertNumQueries(0):
+			self.assertEqual(len(context_processors.load()['social_links']), 2)
+
+	def test_saving_invalidates_local_copy_and_cached_pages(self):
+		url = reverse('portfolio:experience')
+		self.assertContains(self.client.get(url), 'Ada Lovelace')
+		with self.captureOnCommitCallbacks(execute=True):
+			self.site.site_name = 'Countess of Lovelace'
+			self.site.save()
+		self.assertContains(self.client.get(url), 'Countess of Lovelace')
+		with self.captureOnCommitCallbacks(execute=True):
+			SocialLink.objects.filter(platform='GitHub').delete()
+		self.assertEqual(len(context_processors.load()['social_links']), 1)
+
+	def test_detail_etag_changes_with_site_settings(self):
+		make_content(1)
+		url = reverse('portfolio:blog_detail', kwargs={'slug': BlogPost.objects.get().slug})
+		etag = self.client.get(url)['ETag']
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.site.site_name = 'Countess of Lovelace'
+			self.site.save()
+		response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertContains(response, 'Countess of Lovelace')
+		self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(PORTFOLIO_PAGE_SIZE=10, PORTFOLIO_SITE_URL='https://example.com')
+class StaticExportTests(PortfolioTestCase):
+	def setUp(self):
+		super().setUp()
+		self.root = Path(tempfile.mkdtemp())
+		self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+	def build(self, **kwargs):
+		result = export.build(self.root, **kwargs)
+		self.assertEqual(result['errors'], {})
+		return result
+
+	def read(self, name):
+		return (self.root / name).read_text()
+
+	def test_full_build_writes_every_public_page(self):
+		make_content(12)
+		result = self.build()
+		self.assertEqual(result['mode'], 'full')
+		for name in (
+			'index.html', 'portfolio/index.html', 'portfolio/experience/index.html',
+			'portfolio/projects/project-0/index.html', 'portfolio/blog/post-11/index.html',
+			'portfolio/news/news-3/index.html', 'portfolio/blog/feed.xml', 'portfolio/news/atom.xml', 'sw.js',
+		):
+			with self.subTest(name=name):
+				self.assertTrue((self.root / name).is_file())
+		self.assertIn('https://example.com/portfolio/blog/post-0/', self.read('portfolio/blog/feed.xml'))
+		# The second page of each list is exported, with its cursor links rewritten.
+		second = self.read('portfolio/projects/page/2/index.html')
+		self.assertIn('href="/portfolio/projects/" class="btn btn-ghost" rel="prev"', second)
+		self.assertNotIn('?cursor=', self.read('portfolio/projects/index.html'))
+		self.assertFalse((self.root / 'portfolio/projects/page/3').exists())
+		manifest = json.loads(self.read(export.MANIFEST_NAME))
+		project = Project.objects.get(slug='project-0')
+		self.assertIn(f'portfolio.Category:{project.category_id}', manifest['pages']['/portfolio/projects/project-0/']['objects'])
+
+	def test_incremental_build_renders_only_affected_pages(self):
+		make_content(3)
+		self.build()
+		self.assertEqual(self.build()['rendered'], 1)  # sw.js only
+
+		project = Project.objects.get(slug='project-1')
+		Category.objects.filter(pk=project.category_id).update(name='Renamed')
+		result = self.build()
+		self.assertEqual(result['mode'], 'incremental')
+		# The category's project, post and news item, the five list pages and sw.js.
+		self.assertEqual(result['rendered'], 9)
+		self.assertIn('Renamed', self.read('portfolio/projects/project-1/index.html'))
+
+		before = (self.root / 'portfolio/blog/post-0/index.html').stat().st_mtime_ns
+		project.status = Project.DRAFT
+		project.save()
+		result = self.build()
+		self.assertEqual(result['removed'], 1)
+		self.assertFalse((self.root / 'portfolio/projects/project-1').exists())
+		self.assertEqual((self.root / 'portfolio/blog/post-0/index.html').stat().st_mtime_ns, before)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			BlogPost.objects.create(title='Fresh', content='New', status=BlogPost.PUBLISHED)
+		self.build()
+		self.assertIn('Fresh', self.read('portfolio/blog/fresh/index.html'))
+		self.assertIn('Fresh', self.read('portfolio/blog/feed.xml'))
+
+	def test_tag_and_site_changes_are_detected(self):
+		make_content(2)
+		self.build()
+		Project.objects.get(slug='project-1').tags.add('freshly-tagged')
+		result = self.build()
+		self.assertEqual(result['mode'], 'incremental')
+		self.assertIn('freshly-tagged', self.read('portfolio/projects/project-1/index.html'))
+		self.assertLess(result['rendered'], result['pages'])
+
+		with self.captureOnCommitCallbacks(execute=True):
+			SiteSetting.objects.create(site_name='Rebranded')
+		result = self.build()
+		self.assertEqual((result['mode'], result['rendered']), ('full', result['pages']))
+		self.assertIn('Rebranded', self.read('portfolio/blog/post-0/index.html'))
+
+	def test_command(self):
+		make_content(1)
+		out = StringIO()
+		call_command('export_static', output=str(self.root), jobs=1, stdout=out)
+		self.assertIn('full build', out.getvalue())
+		out = StringIO()
+		call_command('export_static', output=str(self.root), jobs=1, stdout=out)
+		self.assertIn('incremental build: rendered 1 of', out.getvalue())
+
+
+class MarkupRenderingTests(PortfolioTestCase):
+	source = (
+		"# Title\n\nSome *emphasis* and a [link](https://example.com).\n\n"
+		"<script>alert(1)</script> <a href=\"javascript:alert(1)\" onclick=\"x()\">bad</a>\n\n"
+		"```python\ndef answer():\n    return 42\n```\n"
+	)
+
+	def test_rendered_on_save(self):
+		post = BlogPost.objects.create(title='Markdown', content=self.source, status=BlogPost.PUBLISHED)
+		self.assertIn('<em>emphasis</em>', post.rendered_html)
+		self.assertIn('<div class="highlight">', post.rendered_html)
+		self.assertIn('<span class="k">def</span>', post.rendered_html)
+		self.assertNotIn('<script', post.rendered_html)
+		self.assertNotIn('javascript:', post.rendered_html)
+		self.assertNotIn('onclick', post.rendered_html)
+		self.assertEqual(post.word_count, len(post.plain_excerpt.split()))
+		self.assertEqual(post.reading_time, 1)
+		self.assertTrue(post.plain_excerpt.startswith('Title Some emphasis and a link.'))
+		self.assertEqual(post.render_version, markup.RENDERER_VERSION)
+		self.assertFalse(hasattr(post.history.first(), 'rendered_html'))
+
+		post.content = ' '.join(['word'] * 450)
+		post.save(update_fields=['content'])
+		post.refresh_from_db()
+		self.assertEqual((post.word_count, post.reading_time), (450, 3))
+		BlogPost.objects.filter(pk=post.pk).update(rendered_html='stale')
+		post.refresh_from_db()
+		post.title = 'Renamed'
+		post.save(update_fields=['title'])
+		post.refresh_from_db()
+		self.assertEqual(post.rendered_html, 'stale')
+
+	def test_pages_use_stored_html_and_list_skips_bodies(self):
+		post = BlogPost.objects.create(title='Markdown', content=self.source, status=BlogPost.PUBLISHED)
+		response = self.client.get(post.get_absolute_url())
+		self.assertContains(response, '<em>emphasis</em>', html=False)
+		self.assertContains(response, 'css/highlight')
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client.get(reverse('portfolio:blog_list'))
+		self.assertContains(response, '1 min read')
+		post_queries = [query['sql'] for query in queries if 'FROM "portfolio_blogpost"' in query['sql']]
+		self.assertTrue(post_queries)
+		for sql in post_queries:
+			self.assertNotIn('"portfolio_blogpost"."content"', sql)
+			self.assertNotIn('"portfolio_blogpost"."rendered_html"', sql)
+
+	def test_rerender_moves_detail_etag(self):
+		make_content(1)
+		url = reverse('portfolio:project_detail', kwargs={'slug': Project.objects.get().slug})
+		Project.objects.update(updated_at=timezone.now() - timedelta(days=1))
+		etag = self.client.get(url)['ETag']
+		markup.rerender([Project], force=True)
+		self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+	def test_command_rerenders_outdated_rows(self):
+		make_content(2)
+		Project.objects.create(title='Described', description='**bold**')
+		Project.objects.update(render_version=0, rendered_html='')
+		out = StringIO()
+		call_command('render_markup', jobs=1, stdout=out)
+		self.assertIn('portfolio.Project: 3 row(s)', out.getvalue())
+		self.assertIn('portfolio.BlogPost: 0 row(s)', out.getvalue())
+		self.assertEqual(Project.objects.get(title='Described').rendered_html, '<p><strong>bold</strong></p>')
+		self.assertFalse(Project.objects.exclude(render_version=markup.RENDERER_VERSION).exists())
+		out = StringIO()
+		call_command('render_markup', jobs=1, all=True, stdout=out)
+		self.assertIn('portfolio.BlogPost: 2 row(s)', out.getvalue())
@@ -0,0 +1,90 @@
+"""Token-bucket rate limits kept in the default cache.
+
+A bucket holds up to ``capacity`` tokens and refills continuously at
+``capacity / period`` tokens per second; each request takes one. Unlike a
+fixed window this allows a short burst up to ``capacity`` but never more
+than the configured rate over time, and there is no window edge at which a
+client can send twice the limit.
+
+Bucket state is a ``(tokens, timestamp)`` pair under one cache key, read and
+written without a lock, so concurrent requests from one client can
+occasionally both take the last token. That is fine for abuse control; it
+is not an exact quota.
+
+Clients are told apart by :func:`client_ip`. Behind a reverse proxy set
+``PORTFOLIO_TRUSTED_PROXY_COUNT``, or every visitor shares the proxy's bucket.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'portfolio:bucket:'
+
+LOOPBACK = ('127.0.0.1', '::1')
+_warned_proxy = False
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def parse_rate(rate):
+	"""``'5/m'``-style rates (DRF syntax) as ``(capacity, period_seconds)``."""
+	count, _, period = rate.partition('/')
+	return int(count), PERIODS[period.strip()[0].lower()]
+
+
+class TokenBucket:
+	def __init__(self, scope, rate):
+		self.scope = scope
+		self.capacity, self.period = parse_rate(rate) if isinstance(rate, str) else rate
+		self.refill_per_second = self.capacity / self.period
+
+	def key(self, ident):
+		return f'{KEY_PREFIX}{self.scope}:{ident}'
+
+	def consume(self, ident, now=None):
+		"""Take a token for ``ident``; returns ``(allowed, retry_after_seconds)``."""
+		now = time.time() if now is None else now
+		key = self.key(ident)
+		tokens, updated = cache.get(key) or (self.capacity, now)
+		tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+		allowed = tokens >= 1
+		if allowed:
+			tokens -= 1
+		# Keep the key until the bucket would be full again, then let it expire.
+		cache.set(key, (tokens, now), int((self.capacity - tokens) / self.refill_per_second) + 1)
+		retry_after = 0.0 if allowed else (1 - tokens) / self.refill_per_second
+		return allowed, retry_after
+
+
+def client_ip(request):
+	"""The client's address, as seen by the first of ``PORTFOLIO_TRUSTED_PROXY_COUNT`` proxies.
+
+	Each trusted proxy appends the address it received the request from to
+	``X-Forwarded-For``, so with ``n`` proxies the client is the ``n``-th entry
+	from the right; anything further left is whatever the client sent. With
+	no trusted proxies (the default) ``X-Forwarded-For`` is ignored.
+	"""
+	remote_addr = request.META.get('REMOTE_ADDR', '')
+	proxies = getattr(settings, 'PORTFOLIO_TRUSTED_PROXY_COUNT', 0)
+	forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+	if not proxies:
+		if forwarded and not settings.DEBUG and remote_addr in LOOPBACK:
+			_warn_untrusted_proxy()
+		return remote_addr
+	addresses = [address.strip() for address in forwarded.split(',') if address.strip()]
+	addresses.append(remote_addr)
+	return addresses[-min(proxies + 1, len(addresses))]
+
+
+def _warn_untrusted_proxy():
+	global _warned_proxy
+	if not _warned_proxy:
+		_warned_proxy = True
+		logger.warning(
+			"Requests arrive from a local proxy with X-Forwarded-For, but "
+			"PORTFOLIO_TRUSTED_PROXY_COUNT is 0: every client shares one rate limit."
+		)
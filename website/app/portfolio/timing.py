@@ -0,0 +1,129 @@
+"""Per-request SQL, template and view timings.
+
+:class:`~app.portfolio.middleware.ServerTimingMiddleware` starts a
+:class:`Recorder` for each request and makes it current with a context
+variable, so queries and template renders are attributed to the right
+request in both WSGI threads and ASGI tasks (``sync_to_async`` copies the
+context into its worker threads, so the concurrent queries of ``aio.gather``
+add to the same recorder, under its lock).
+
+Queries are timed by a connection execute wrapper, installed once by
+:func:`install` when ``PORTFOLIO_SERVER_TIMING`` is on. Templates are timed
+by the :class:`DjangoTemplates` backend configured in ``TEMPLATES``; nothing
+is patched. Both do nothing but a context variable lookup when no recorder
+is active, e.g. for templates rendered outside a request.
+"""
+import contextvars
+import threading
+import time
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+_current = contextvars.ContextVar('portfolio_timing', default=None)
+# Templates rendered from inside another render are not timed again.
+_rendering = contextvars.ContextVar('portfolio_timing_rendering', default=False)
+_installed = False
+
+
+class Recorder:
+	"""Timings of one request; durations are in seconds."""
+
+	def __init__(self):
+		self.queries = []
+		self.sql_time = 0.0
+		self.template_time = 0.0
+		self.view_time = 0.0
+		self._lock = threading.Lock()
+
+	@property
+	def query_count(self):
+		return len(self.queries)
+
+	def repeated_queries(self, limit=3):
+		"""``[(count, sql)]`` for statements run more than once, most frequent first.
+
+		Statements are compared before parameters are bound, so a query issued
+		once per row of a list (an N+1) shows up as one entry.
+		"""
+		return [(count, sql) for sql, count in Counter(self.queries).most_common(limit) if count > 1]
+
+	def header(self):
+		"""The ``Server-Timing`` header value; durations in milliseconds."""
+		return ', '.join((
+			f'view;dur={self.view_time * 1000:.1f}',
+			f'sql;dur={self.sql_time * 1000:.1f};desc="{self.query_count} queries"',
+			f'tpl;dur={self.template_time * 1000:.1f}',
+		))
+
+	def add_query(self, sql, duration):
+		with self._lock:
+			self.queries.append(sql)
+			self.sql_time += duration
+
+	def add_template(self, duration):
+		with self._lock:
+			self.template_time += duration
+
+	def start(self):
+		"""Make this the current recorder; returns a token for :meth:`stop`."""
+		# Connections are per thread (or per async context); hook any this one
+		# opened before install() ran. Later ones are hooked on connection_created.
+		for connection in connections.all(initialized_only=True):
+			_add_wrapper(connection)
+		return _current.set(self)
+
+	def stop(self, token):
+		_current.reset(token)
+
+
+def _record_query(execute, sql, params, many, context):
+	recorder = _current.get()
+	if recorder is None:
+		return execute(sql, params, many, context)
+	start = time.perf_counter()
+	try:
+		return execute(sql, params, many, context)
+	finally:
+		recorder.add_query(sql, time.perf_counter() - start)
+
+
+def _add_wrapper(connection, **kwargs):
+	if _record_query not in connection.execute_wrappers:
+		# First, so that execute_wrapper() blocks, which pop() on exit, remove their own.
+		connection.execute_wrappers.insert(0, _record_query)
+
+
+class Template(django_backend.Template):
+	def render(self, context=None, request=None):
+		recorder = _current.get()
+		if recorder is None or _rendering.get():
+			return super().render(context, request)
+		token = _rendering.set(True)
+		start = time.perf_counter()
+		try:
+			return super().render(context, request)
+		finally:
+			recorder.add_template(time.perf_counter() - start)
+			_rendering.reset(token)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+	"""The Django template backend, with renders timed for the current recorder."""
+
+	def from_string(self, template_code):
+		return Template(super().from_string(template_code).template, self)
+
+	def get_template(self, template_name):
+		return Template(super().get_template(template_name).template, self)
+
+
+def install():
+	"""Hook query execution on new connections. Idempotent."""
+	global _installed
+	if _installed:
+		return
+	_installed = True
+	connection_created.connect(_add_wrapper, dispatch_uid='portfolio_timing')
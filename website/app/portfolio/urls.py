@@ -8,10 +8,14 @@ urlpatterns = [
     path('projects/', views.project_list, name='project_list'),
     path('projects/<slug:slug>/', views.project_detail, name='project_detail'),
     path('blog/', views.blog_list, name='blog_list'),
+    path('blog/feed.xml', views.feed, {'name': 'blog', 'kind': 'rss'}, name='blog_feed_rss'),
+    path('blog/atom.xml', views.feed, {'name': 'blog', 'kind': 'atom'}, name='blog_feed_atom'),
     path('blog/<slug:slug>/', views.blog_detail, name='blog_detail'),
     path('news/<slug:slug>/', views.news_detail, name='news_detail'),
     path('experience/', views.experience, name='experience'),
     path('news/', views.news, name='news'),
+    path('news/feed.xml', views.feed, {'name': 'news', 'kind': 'rss'}, name='news_feed_rss'),
+    path('news/atom.xml', views.feed, {'name': 'news', 'kind': 'atom'}, name='news_feed_atom'),
     path('contact/', views.contact, name='contact'),
     path('api/', include('app.portfolio.api.urls')),
 ]
@@ -1,77 +1,338 @@
-from django.shortcuts import render, get_object_or_404
-from django.db.models import Q
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import redirect, render, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from . import aio, caching, contact as contact_intake, metrics, search as search_index, serviceworker, syndication
+from .caching import cache_public_page
+from .forms import ContactForm
+from .conditional import conditional_view, not_modified_response, object_validators, set_validators
+from .pagination import InvalidCursor, KeysetPaginator
 from .models import Project, BlogPost, NewsItem, Experience as ExperienceModel, Skill
 
-# Create your views here.
+# Number of tags shown on a card before collapsing the rest into "+N more".
+PROJECT_CARD_TAGS = 5
+POST_CARD_TAGS = 4
+FEATURED_CARD_TAGS = 4
 
-def index(request):
-    """Primary portfolio landing page with dynamic content sections."""
-    projects = Project.objects.filter(status=Project.PUBLISHED, featured=True)[:3]
-    posts = BlogPost.objects.filter(status=BlogPost.PUBLISHED)[:3]
-    news_items = NewsItem.objects.filter(status=NewsItem.PUBLISHED).order_by('-published_at')[:5]
-    return render(request, 'portfolio/index.html', {
-        'featured_projects': projects,
+# Cards show the precomputed excerpt and reading time; never load the bodies.
+CARD_DEFERRED = ('rendered_html',)
+
+
+def _with_tag_summary(objects, limit):
+    """Evaluate ``objects`` and precompute the tag data list templates need.
+
+    Expects ``tags`` to be prefetched so the whole list costs one extra query.
+    Each item gets ``visible_tags`` (first ``limit`` tags), ``tag_count`` and
+    ``hidden_tag_count`` so templates never touch ``tags.all`` again.
+    """
+    objects = list(objects)
+    for obj in objects:
+        tags = list(obj.tags.all())
+        obj.visible_tags = tags[:limit]
+        obj.tag_count = len(tags)
+        obj.hidden_tag_count = max(len(tags) - limit, 0)
+    return objects
+
+
+def _paginate(request, queryset):
+    """Return the keyset page selected by ``?cursor=`` with next/previous URLs."""
+    paginator = KeysetPaginator(queryset, getattr(settings, 'PORTFOLIO_PAGE_SIZE', 12))
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+    page.next_url = _cursor_url(request, page.next_cursor)
+    page.previous_url = _cursor_url(request, page.previous_cursor)
+    return page
+
+
+def _is_preview(request):
+    return request.user.is_staff and request.GET.get('preview') == '1'
+
+
+def _detail_validators(model, related=()):
+    """Validators for a detail view, using the same visibility rules as the view.
+
+    The page also shows ``SiteSetting`` and ``SocialLink`` (base.html), so
+    their content versions are part of the ETag.
+    """
+    def validators(request, slug):
+        qs = model.objects.filter(slug=slug)
+        if not _is_preview(request):
+            qs = qs.filter(status=model.PUBLISHED)
+        return object_validators(
+            qs, related=related, fields=('category__name',),
+            extra=(
+                request.user.is_authenticated, _is_preview(request),
+                *caching.get_versions(caching.SITE_DEPENDENCIES),
+            ),
+        )
+    return validators
+
+
+def _show_all(request):
+    """Staff may list drafts too with ``?all=1``."""
+    return request.user.is_staff and request.GET.get('all') == '1'
+
+
+async def _ashow_all(request):
+    """``_show_all`` for async views, which must not touch the lazy ``request.user``."""
+    if request.GET.get('all') != '1':
+        return False
+    return (await request.auser()).is_staff
+
+
+def _cursor_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'?{params.urlencode()}'
+
+
+def _index_sections():
+    """The independent querysets of the landing page: featured projects, posts, news."""
+    projects = (
+        Project.objects.filter(status=Project.PUBLISHED, featured=True)
+        .select_related('category')
+        .prefetch_related('tags')
+        .defer('description', *CARD_DEFERRED)[:3]
+    )
+    posts = (
+        BlogPost.objects.filter(status=BlogPost.PUBLISHED).select_related('category')
+        .defer('content', *CARD_DEFERRED)[:3]
+    )
+    news_items = (
+        NewsItem.objects.filter(status=NewsItem.PUBLISHED).order_by('-published_at')
+        .defer('content', *CARD_DEFERRED)[:5]
+    )
+    return projects, posts, news_items
+
+
+def _index_context(projects, posts, news_items):
+    return {
+        'featured_projects': _with_tag_summary(projects, FEATURED_CARD_TAGS),
         'recent_posts': posts,
         'latest_news': news_items,
-    })
+    }
+
 
+@cache_public_page('index')
+def index(request):
+    """Primary portfolio landing page with dynamic content sections."""
+    return render(request, 'portfolio/index.html', _index_context(*_index_sections()))
+
+
+def _project_list_context(request, show_all):
+    qs = Project.objects.all() if show_all else Project.objects.filter(status=Project.PUBLISHED)
+    qs = qs.select_related('category').prefetch_related('tags').defer('description', *CARD_DEFERRED)
+    page = _paginate(request, qs)
+    return {
+        'projects': _with_tag_summary(page.object_list, PROJECT_CARD_TAGS),
+        'page': page,
+    }
 
+
+@cache_public_page('project_list')
 def project_list(request):
-    qs = Project.objects.filter(status=Project.PUBLISHED)
-    if request.user.is_staff and request.GET.get('all') == '1':
-        qs = Project.objects.all()
-    return render(request, 'portfolio/project_list.html', {'projects': qs})
+    context = _project_list_context(request, _show_all(request))
+    return render(request, 'portfolio/project_list.html', context)
 
 
+@conditional_view(_detail_validators(Project, related=('images', 'tags')))
 def project_detail(request, slug):
-    if request.user.is_staff and request.GET.get('preview') == '1':
+    if _is_preview(request):
         project = get_object_or_404(Project, slug=slug)
     else:
         project = get_object_or_404(Project, slug=slug, status=Project.PUBLISHED)
     return render(request, 'portfolio/project_detail.html', {'project': project})
 
 
+def _blog_list_context(request, show_all):
+    qs = BlogPost.objects.all() if show_all else BlogPost.objects.filter(status=BlogPost.PUBLISHED)
+    qs = qs.select_related('category', 'author').prefetch_related('tags').defer('content', *CARD_DEFERRED)
+    page = _paginate(request, qs)
+    return {
+        'posts': _with_tag_summary(page.object_list, POST_CARD_TAGS),
+        'page': page,
+    }
+
+
+@cache_public_page('blog_list')
 def blog_list(request):
-    qs = BlogPost.objects.filter(status=BlogPost.PUBLISHED)
-    if request.user.is_staff and request.GET.get('all') == '1':
-        qs = BlogPost.objects.all()
-    return render(request, 'portfolio/blog_list.html', {'posts': qs})
+    context = _blog_list_context(request, _show_all(request))
+    return render(request, 'portfolio/blog_list.html', context)
 
 
+@conditional_view(_detail_validators(BlogPost, related=('tags',)))
 def blog_detail(request, slug):
-    if request.user.is_staff and request.GET.get('preview') == '1':
+    if _is_preview(request):
         post = get_object_or_404(BlogPost, slug=slug)
     else:
         post = get_object_or_404(BlogPost, slug=slug, status=BlogPost.PUBLISHED)
     return render(request, 'portfolio/blog_detail.html', {'post': post})
 
 
-def experience(request):
+def _experience_sections():
     experiences = ExperienceModel.objects.all().order_by('-is_current', '-start_date')
     skills = Skill.objects.all().order_by('order')
+    return experiences, skills
+
+
+@cache_public_page('experience')
+def experience(request):
+    experiences, skills = _experience_sections()
     return render(request, 'portfolio/experience.html', {'experiences': experiences, 'skills': skills})
 
 
-def news(request):
-    qs = NewsItem.objects.filter(status=NewsItem.PUBLISHED)
-    if request.user.is_staff and request.GET.get('all') == '1':
-        qs = NewsItem.objects.all()
+def _news_context(request, show_all):
+    qs = NewsItem.objects.all() if show_all else NewsItem.objects.filter(status=NewsItem.PUBLISHED)
     search = request.GET.get('q')
     if search:
-        qs = qs.filter(Q(title__icontains=search) | Q(summary__icontains=search) | Q(content__icontains=search))
-    return render(request, 'portfolio/news.html', {'news_list': qs, 'search_query': search})
+        qs = search_index.search(qs, search)
+    page = _paginate(request, qs.select_related('category').defer('content', *CARD_DEFERRED))
+    return {
+        'news_list': page.object_list,
+        'page': page,
+        'search_query': search,
+    }
 
 
+@cache_public_page('news')
+def news(request):
+    context = _news_context(request, _show_all(request))
+    return render(request, 'portfolio/news.html', context)
+
+
+@conditional_view(_detail_validators(NewsItem))
 def news_detail(request, slug):
-    if request.user.is_staff and request.GET.get('preview') == '1':
+    if _is_preview(request):
         item = get_object_or_404(NewsItem, slug=slug)
     else:
         item = get_object_or_404(NewsItem, slug=slug, status=NewsItem.PUBLISHED)
     return render(request, 'portfolio/news_detail.html', {'item': item})
 
 
+def _wants_json(request):
+    # Browsers send */* with form posts; only the page's fetch() asks for JSON alone.
+    return request.accepts('application/json') and not request.accepts('text/html')
+
+
 def contact(request):
-    """Contact page view."""
-    return render(request, 'portfolio/contact.html')
+    """Contact page; POSTs are throttled per client, validated and buffered for writing."""
+    form = ContactForm()
+    if request.method == 'POST':
+        allowed, retry_after = contact_intake.throttle(request)
+        if not allowed:
+            metrics.incr('contact.throttled')
+            detail = "Too many messages from your address. Please try again later."
+            if _wants_json(request):
+                response = JsonResponse({'detail': detail}, status=429)
+            else:
+                response = render(request, 'portfolio/contact.html', {'form': form, 'error': detail}, status=429)
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response
+        form = ContactForm(request.POST)
+        if form.is_valid():
+            contact_intake.submit(form.cleaned_data)
+            if _wants_json(request):
+                return JsonResponse({'detail': "Thank you! I'll respond within 24 hours."}, status=202)
+            return redirect(f"{reverse('portfolio:contact')}?sent=1")
+        metrics.incr('contact.invalid')
+        if _wants_json(request):
+            return JsonResponse({'errors': form.errors}, status=400)
+    return render(request, 'portfolio/contact.html', {'form': form, 'sent': request.GET.get('sent') == '1'})
+
+
+def _serve_generated(request, name, content_type):
+    """Serve a precomputed syndication file, answering 304 from its mtime and size."""
+    path = syndication.ensure(name)
+    if path is None:
+        raise Http404
+    stat = path.stat()
+    etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)
+    response = not_modified_response(request, etag, last_modified)
+    if response is None:
+        response = FileResponse(path.open('rb'), content_type=content_type)
+        set_validators(response, etag, last_modified)
+    response['Cache-Control'] = 'public, max-age=3600'
+    return response
+
+
+def sitemap(request):
+    return _serve_generated(request, 'sitemap.xml', 'application/xml')
+
+
+def sitemap_section(request, name):
+    return _serve_generated(request, name, 'application/xml')
+
+
+def feed(request, name, kind):
+    content_type = 'application/rss+xml' if kind == 'rss' else 'application/atom+xml'
+    return _serve_generated(request, syndication.feed_name(name, kind), f'{content_type}; charset=utf-8')
+
+
+def service_worker(request):
+    """The service worker, rendered with the current precache manifest.
+
+    Browsers revalidate it on every navigation, so it is sent with ``no-cache``
+    and an ETag; an unchanged worker costs a 304.
+    """
+    content = render_to_string('sw.js', serviceworker.worker_context())
+    etag = hashlib.md5(content.encode(), usedforsecurity=False).hexdigest()
+    response = not_modified_response(request, etag, None)
+    if response is None:
+        response = HttpResponse(content, content_type='application/javascript')
+        set_validators(response, etag, None)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Async variants, routed by PORTFOLIO_ASGI_URLCONF when served over ASGI.
+# Independent sections are queried concurrently (see aio.py); cached pages
+# are answered without leaving the event loop.
+
+@cache_public_page('index')
+async def index_async(request):
+    """``index`` with its three sections fetched concurrently."""
+    sections = await aio.gather(*_index_sections())
+    return await aio.render(request, 'portfolio/index.html', _index_context(*sections))
+
+
+@cache_public_page('experience')
+async def experience_async(request):
+    experiences, skills = await aio.gather(*_experience_sections())
+    return await aio.render(request, 'portfolio/experience.html', {'experiences': experiences, 'skills': skills})
+
+
+@cache_public_page('project_list')
+async def project_list_async(request):
+    context = await aio.run(_project_list_context, request, await _ashow_all(request))
+    return await aio.render(request, 'portfolio/project_list.html', context)
+
+
+@cache_public_page('blog_list')
+async def blog_list_async(request):
+    context = await aio.run(_blog_list_context, request, await _ashow_all(request))
+    return await aio.render(request, 'portfolio/blog_list.html', context)
+
+
+@cache_public_page('news')
+async def news_async(request):
+    context = await aio.run(_news_context, request, await _ashow_all(request))
+    return await aio.render(request, 'portfolio/news.html', context)
 
 
+# Sync view -> async variant, used to build the ASGI URLconf.
+ASYNC_VARIANTS = {
+    index: index_async,
+    experience: experience_async,
+    project_list: project_list_async,
+    blog_list: blog_list_async,
+    news: news_async,
+}
@@ -2,6 +2,8 @@
 ASGI config for professional_website project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are routed through ``PORTFOLIO_ASGI_URLCONF``, which serves the
+async variants of the landing and list pages.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +11,11 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from app.portfolio.aio import PortfolioASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'professional_website.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+application = PortfolioASGIHandler()
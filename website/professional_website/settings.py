@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 import sys # <-- Import the sys module
 
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.portfolio.middleware.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,13 +63,28 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'simple_history.middleware.HistoryRequestMiddleware',
+    'app.portfolio.middleware.ServerTimingMiddleware',
 ]
 
+# Under ASGI these replace the stock middleware above so their hooks run on
+# the event loop instead of hopping to a thread (see app/portfolio/middleware.py).
+PORTFOLIO_ASGI_MIDDLEWARE = {
+    'django.middleware.security.SecurityMiddleware': 'app.portfolio.middleware.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware': 'app.portfolio.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware': 'app.portfolio.middleware.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware': 'app.portfolio.middleware.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware': 'app.portfolio.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware': 'app.portfolio.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware': 'app.portfolio.middleware.XFrameOptionsMiddleware',
+}
+
 ROOT_URLCONF = 'professional_website.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The stock backend, with render time recorded for Server-Timing.
+        'BACKEND': 'app.portfolio.timing.DjangoTemplates',
+        'NAME': 'django',
     'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,6 +93,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.debug',
+                'app.portfolio.context_processors.site',
             ],
         },
     },
@@ -94,6 +112,28 @@ DATABASES = {
     }
 }
 
+# 'production' switches SQLite to WAL with tuned pragmas, immediate write
+# transactions and persistent connections (see app/portfolio/sqlite.py).
+PORTFOLIO_DB_PROFILE = os.environ.get('PORTFOLIO_DB_PROFILE', 'development')
+if PORTFOLIO_DB_PROFILE == 'production':
+    from app.portfolio.sqlite import production_database
+    DATABASES['default'] = production_database(BASE_DIR / 'db.sqlite3')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Content versions and page-cache invalidation live here; use a shared backend
+# (Redis/Memcached) when running more than one process. The hit/miss and
+# throttle counters live here too: with this per-process backend read them at
+# admin/metrics/, since `cache_stats`/`throttle_stats` only see their own.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'portfolio',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -133,6 +173,16 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# collectstatic minifies the project's CSS/JS, writes content-hashed names
+# and precompressed .gz/.br siblings (see app/portfolio/assets.py).
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'app.portfolio.assets.CompressedManifestStaticFilesStorage'},
+}
+if DEBUG or 'test' in sys.argv:
+    # Development and tests serve files straight from the finders, uncollected.
+    STORAGES['staticfiles'] = {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -150,6 +200,99 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'app.portfolio.api.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
+    # Token buckets per client and endpoint (app.portfolio.api.throttling).
+    # 'query' covers requests with ?search= or ?ordering=, 'read' the rest;
+    # '<budget>.<basename>' (e.g. 'query.project') overrides one endpoint.
+    # Staff are exempt.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'app.portfolio.api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': '300/m',
+        'query': '30/m',
+    },
+}
+
+# Portfolio
+# Items per page on the HTML list views (keyset paginated).
+PORTFOLIO_PAGE_SIZE = 12
+# Seconds a rendered anonymous page stays cached; saves invalidate it sooner.
+PORTFOLIO_PAGE_CACHE_TIMEOUT = 60 * 60
+# Seconds a rendered API response stays cached; writes invalidate it sooner.
+PORTFOLIO_API_CACHE_TIMEOUT = 60 * 60
+# Widths (px) of the resized WebP/JPEG derivatives generated for uploads.
+PORTFOLIO_IMAGE_WIDTHS = (320, 640, 960, 1280, 1920)
+# Run background tasks inline (after commit) instead of queueing them for
+# manage.py run_worker. Convenient in development; disable in production.
+PORTFOLIO_TASKS_EAGER = DEBUG
+# Historical versions kept whole: the newest ``keep`` per object and any newer
+# than ``days``. Older ones are delta-encoded by manage.py compact_history.
+# Per-model overrides use the model label, e.g. 'portfolio.BlogPost'.
+PORTFOLIO_HISTORY_RETENTION = {
+    'default': {'keep': 10, 'days': 30},
 }
+# Absolute base URL used in the sitemap and feeds (generated outside requests).
+PORTFOLIO_SITE_URL = 'http://localhost:8000'
+# Where the precomputed sitemap shards and feeds are written.
+PORTFOLIO_SYNDICATION_ROOT = BASE_DIR / 'var' / 'syndication'
+# Objects per sitemap shard (the protocol allows up to 50,000 URLs per file).
+PORTFOLIO_SITEMAP_SHARD_SIZE = 5000
+# Cache lifetime (seconds) for collected static files without a content hash;
+# hashed names are always served as immutable for a year.
+PORTFOLIO_STATIC_MAX_AGE = 60 * 60
+# Static files (names as passed to {% static %}) and pages (URL names) the
+# service worker precaches on install.
+PORTFOLIO_PRECACHE_STATIC = (
+    'css/site.css',
+    'js/site.js',
+    'site.webmanifest',
+    'media/images/ff359f387545394ba70c7f8049001d6e.jpg',
+)
+PORTFOLIO_PRECACHE_PAGES = (
+    'portfolio_landing',
+    'portfolio:index',
+    'portfolio:project_list',
+    'portfolio:blog_list',
+    'portfolio:news',
+    'portfolio:experience',
+)
+# Images the service worker keeps in its cache-first image cache.
+PORTFOLIO_SW_MAX_IMAGES = 100
+# URLConf used by professional_website.asgi; it swaps in the async views.
+PORTFOLIO_ASGI_URLCONF = 'professional_website.urls_asgi'
+# Let async views run independent queries in parallel worker threads, each
+# with its own database connection. Disable to run them one at a time.
+PORTFOLIO_ASYNC_CONCURRENT_QUERIES = True
+# Seconds between WAL checkpoints / PRAGMA optimize, queued by run_worker when
+# the database runs in WAL mode.
+PORTFOLIO_SQLITE_MAINTENANCE_INTERVAL = 60 * 60
+# Per-request SQL/template/view timings (app.portfolio.timing). Staff and
+# INTERNAL_IPS (or PORTFOLIO_SERVER_TIMING_IPS) get a Server-Timing header;
+# requests slower than PORTFOLIO_SLOW_REQUEST_MS are logged with their most
+# repeated SQL.
+PORTFOLIO_SERVER_TIMING = True
+PORTFOLIO_SLOW_REQUEST_MS = 500
+# Reverse proxies in front of the site that append to X-Forwarded-For. Rate
+# limits key on the client address they report (app.portfolio.throttling);
+# with 0 behind a proxy every visitor shares one bucket.
+PORTFOLIO_TRUSTED_PROXY_COUNT = 0
+# Contact form: per-client token bucket (DRF-style rate), buffered writes
+# (flushed every N seconds or every batch; 0 writes each message at once;
+# a failed batch is retried up to N times) and the delay that coalesces
+# notifications into one digest email.
+PORTFOLIO_CONTACT_RATE = '5/h'
+PORTFOLIO_CONTACT_FLUSH_INTERVAL = 2
+PORTFOLIO_CONTACT_BATCH_SIZE = 100
+PORTFOLIO_CONTACT_WRITE_ATTEMPTS = 5
+PORTFOLIO_CONTACT_DIGEST_DELAY = 5 * 60
+# Seconds a process serves SiteSetting/SocialLink from memory before checking
+# the shared cache for a newer version (app.portfolio.context_processors).
+PORTFOLIO_SITE_CONTEXT_TTL = 5
+# Output directory of `manage.py export_static` (app.portfolio.export).
+PORTFOLIO_EXPORT_ROOT = BASE_DIR / 'var' / 'export'
+if DEBUG:
+    # Behind a reverse proxy every client is loopback; only trusted in development.
+    INTERNAL_IPS = ['127.0.0.1', '::1']
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
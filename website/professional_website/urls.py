@@ -37,7 +37,8 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.generic import RedirectView, TemplateView
+from django.views.generic import RedirectView
+from app.portfolio import admin as portfolio_admin
 from app.portfolio import views as portfolio_views
 
 """Consolidated project URLConf.
@@ -46,7 +47,8 @@ Clean URL configuration for the professional portfolio website.
 """
 
 urlpatterns = [
-    # Admin
+    # Admin (cache/throttle counters first so the admin catch-all doesn't claim the path)
+    path('admin/metrics/', admin.site.admin_view(portfolio_admin.metrics_view), name='portfolio_metrics'),
     path('admin/', admin.site.urls),
 
     # Auth (login/logout/password reset views)
@@ -60,8 +62,12 @@ urlpatterns = [
     # Root path serves portfolio landing
     path('', portfolio_views.index, name='portfolio_landing'),
 
-    # Service worker (served as template so Django can deliver at root URL path)
-    path('sw.js', TemplateView.as_view(template_name='sw.js', content_type='application/javascript'), name='service_worker'),
+    # Precomputed sitemap index and its shards (see app/portfolio/syndication.py)
+    path('sitemap.xml', portfolio_views.sitemap, name='sitemap'),
+    re_path(r'^(?P<name>sitemap-[a-z]+-\d+\.xml)$', portfolio_views.sitemap_section, name='sitemap_section'),
+
+    # Service worker, rendered with the precache manifest (served at the root so its scope is the whole site)
+    path('sw.js', portfolio_views.service_worker, name='service_worker'),
 
     # Favicon root request redirect -> existing image (avoid 404 in dev). Swap to real favicon later.
     path('favicon.ico', RedirectView.as_view(url=settings.STATIC_URL + 'media/images/ff359f387545394ba70c7f8049001d6e.jpg', permanent=False)),
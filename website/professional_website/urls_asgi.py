@@ -0,0 +1,26 @@
+"""URLConf used under ASGI (see ``PORTFOLIO_ASGI_URLCONF``).
+
+The same routes as ``urls.py``, with the views that have async variants
+(``app.portfolio.views.ASYNC_VARIANTS``) swapped for them.
+"""
+from django.urls import URLPattern, URLResolver
+
+from app.portfolio.views import ASYNC_VARIANTS
+from .urls import urlpatterns as wsgi_urlpatterns
+
+
+def _with_async_views(patterns):
+    swapped = []
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = URLResolver(
+                pattern.pattern, _with_async_views(pattern.url_patterns), pattern.default_kwargs,
+                pattern.app_name, pattern.namespace,
+            )
+        elif isinstance(pattern, URLPattern) and pattern.callback in ASYNC_VARIANTS:
+            pattern = URLPattern(pattern.pattern, ASYNC_VARIANTS[pattern.callback], pattern.default_args, pattern.name)
+        swapped.append(pattern)
+    return swapped
+
+
+urlpatterns = _with_async_views(wsgi_urlpatterns)
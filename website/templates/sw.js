@@ -1,11 +1,139 @@
-// Simple development service worker placeholder to silence 404s.
-// Replace with real offline/PWA logic when ready.
+// Service worker rendered by app.portfolio.views.service_worker.
+// CACHE_VERSION is a digest of the precached static files and page list, so
+// a new worker is only installed when one of those changes. Pages, API
+// responses and unhashed static files are revalidated in the background.
+// Only public pages and the API are cached at runtime: never the admin,
+// staff ?preview/?all views, pages with CSRF tokens or private responses.
+const CACHE_VERSION = '{{ version }}';
+const CACHE_PREFIX = 'portfolio-';
+const PRECACHE = `${CACHE_PREFIX}precache-${CACHE_VERSION}`;
+const RUNTIME = `${CACHE_PREFIX}runtime-${CACHE_VERSION}`;
+const IMAGES = `${CACHE_PREFIX}images`;
+const CURRENT_CACHES = [PRECACHE, RUNTIME, IMAGES];
+
+const PRECACHE_STATIC = {{ static_json|safe }};
+const PRECACHE_PAGES = {{ pages_json|safe }};
+const API_PREFIX = '{{ api_prefix|escapejs }}';
+const STATIC_PREFIX = '{{ static_prefix|escapejs }}';
+const LANDING_PAGE = '{{ landing_page|escapejs }}';
+const PAGE_PREFIX = '{{ page_prefix|escapejs }}';
+const ADMIN_PREFIX = '{{ admin_prefix|escapejs }}';
+const UNCACHED_PAGES = {{ uncached_json|safe }};
+const STAFF_PARAMS = ['preview', 'all'];
+const MAX_IMAGES = {{ max_images }};
+
 self.addEventListener('install', event => {
-  self.skipWaiting();
+  event.waitUntil(
+    caches.open(PRECACHE)
+      .then(cache => cache.addAll([
+        ...PRECACHE_STATIC,
+        // Precache the anonymous version of each page, even for a signed-in user.
+        ...PRECACHE_PAGES.map(page => new Request(page, {credentials: 'omit'})),
+      ]))
+      .then(() => self.skipWaiting())
+  );
 });
+
 self.addEventListener('activate', event => {
-  // cleanup logic
+  event.waitUntil(
+    caches.keys()
+      .then(keys => Promise.all(
+        keys
+          .filter(key => key.startsWith(CACHE_PREFIX) && !CURRENT_CACHES.includes(key))
+          .map(key => caches.delete(key))
+      ))
+      .then(() => self.clients.claim())
+  );
 });
+
+function isCacheable(url) {
+  if (url.pathname.startsWith(ADMIN_PREFIX) || UNCACHED_PAGES.includes(url.pathname)) {
+    return false;
+  }
+  if (STAFF_PARAMS.some(param => url.searchParams.has(param))) {
+    return false;
+  }
+  return url.pathname === LANDING_PAGE || url.pathname.startsWith(PAGE_PREFIX);
+}
+
+function isStorable(response) {
+  const cacheControl = response.headers.get('Cache-Control') || '';
+  return response.ok && !/no-store|private/.test(cacheControl);
+}
+
+// Serve from cache when possible and refresh the cached copy in the background.
+function staleWhileRevalidate(event, cacheName) {
+  return caches.open(cacheName).then(cache =>
+    cache.match(event.request).then(cached => {
+      const network = fetch(event.request)
+        .then(response => {
+          if (isStorable(response)) {
+            cache.put(event.request, response.clone());
+          }
+          return response;
+        });
+      if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+      }
+      return network;
+    })
+  );
+}
+
+function trimCache(cacheName, maxEntries) {
+  return caches.open(cacheName).then(cache =>
+    cache.keys().then(keys => Promise.all(
+      keys.slice(0, Math.max(keys.length - maxEntries, 0)).map(key => cache.delete(key))
+    ))
+  );
+}
+
+// Images never change under the same URL (uploads and derivatives get new names).
+function cacheFirst(event, cacheName, maxEntries) {
+  return caches.open(cacheName).then(cache =>
+    cache.match(event.request).then(cached => {
+      if (cached) {
+        return cached;
+      }
+      return fetch(event.request).then(response => {
+        if (response.ok || response.type === 'opaque') {
+          cache.put(event.request, response.clone())
+            .then(() => trimCache(cacheName, maxEntries));
+        }
+        return response;
+      });
+    })
+  );
+}
+
 self.addEventListener('fetch', event => {
-  // Passthrough for now
+  const request = event.request;
+  if (request.method !== 'GET') {
+    return;
+  }
+  const url = new URL(request.url);
+  if (request.destination === 'image') {
+    event.respondWith(cacheFirst(event, IMAGES, MAX_IMAGES));
+    return;
+  }
+  if (url.origin !== self.location.origin) {
+    return;
+  }
+  if (url.pathname.startsWith(API_PREFIX)) {
+    if (isCacheable(url)) {
+      event.respondWith(staleWhileRevalidate(event, RUNTIME));
+    }
+    return;
+  }
+  if (url.pathname.startsWith(STATIC_PREFIX)) {
+    event.respondWith(
+      caches.match(request).then(cached => cached || staleWhileRevalidate(event, RUNTIME))
+    );
+    return;
+  }
+  if (request.mode === 'navigate' && isCacheable(url)) {
+    const cacheName = PRECACHE_PAGES.includes(url.pathname) ? PRECACHE : RUNTIME;
+    event.respondWith(staleWhileRevalidate(event, cacheName));
+  }
 });